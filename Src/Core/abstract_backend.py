@@ -0,0 +1,36 @@
+import abc
+
+
+# Абстрактный класс для постоянного хранилища репозитория.
+# Репозиторий передает в него каждое изменение своих коллекций
+class abstract_backend(abc.ABC):
+
+    # Сохранить (добавить или заменить) элемент коллекции
+    @abc.abstractmethod
+    def save(self, key: str, item):
+        pass
+
+    # Сохранить пачку элементов коллекции
+    def save_many(self, key: str, items: list):
+        for item in items:
+            self.save(key, item)
+
+    # Удалить элемент коллекции
+    @abc.abstractmethod
+    def delete(self, key: str, item):
+        pass
+
+    # Удалить все данные
+    @abc.abstractmethod
+    def clear(self):
+        pass
+
+    # Зафиксировать накопленные изменения
+    @abc.abstractmethod
+    def commit(self):
+        pass
+
+    # Загрузить данные в репозиторий. Возвращает True, если данные были
+    @abc.abstractmethod
+    def load(self, repo) -> bool:
+        pass
@@ -0,0 +1,45 @@
+import abc
+from Src.Core.validator import validator
+
+
+# Абстрактный класс для производных структур репозитория (индексы, колонки, агрегаты).
+# Репозиторий уведомляет их о каждом изменении своей коллекции
+class abstract_index(abc.ABC):
+
+    # Ключ коллекции репозитория, которую обслуживает индекс
+    @property
+    @abc.abstractmethod
+    def key(self) -> str:
+        pass
+
+    # Элемент добавлен в коллекцию
+    @abc.abstractmethod
+    def append(self, item):
+        pass
+
+    # В коллекцию добавлена пачка элементов (одно уведомление на пачку)
+    def extend(self, items: list):
+        for item in items:
+            self.append(item)
+
+    # Элемент удален из коллекции
+    @abc.abstractmethod
+    def remove(self, item):
+        pass
+
+    # Элемент коллекции заменен другим с тем же unique_code
+    def replace(self, old, item):
+        self.remove(old)
+        self.append(item)
+
+    # Коллекция очищена
+    @abc.abstractmethod
+    def clear(self):
+        pass
+
+    # Перестроить индекс по набору данных
+    def rebuild(self, items: list):
+        validator.validate(items, list)
+        self.clear()
+        for item in items:
+            self.append(item)
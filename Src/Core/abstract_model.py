@@ -1,17 +1,24 @@
 from abc import ABC
+import sys
 import uuid
 from Src.Core.validator import validator
 
 """
 Абстрактный класс для наследования моделей
-Содержит в себе только генерацию уникального кода
+Содержит в себе только генерацию уникального кода.
+Модели хранят поля в __slots__ (без словаря экземпляра). Уникальный код создается
+при первом обращении: загрузчик, который сразу задает код, не платит за uuid4.
+Коды интернируются - одинаковые коды из разных источников хранятся одной строкой
 """
 class abstact_model(ABC):
-    __unique_code:str
+    __slots__ = ("__unique_code",)
+
+    # Интернировать коды при установке (справочники: один код приходит из многих ссылок)
+    _intern_codes = True
 
     def __init__(self) -> None:
         super().__init__()
-        self.__unique_code = uuid.uuid4().hex
+        self.__unique_code = None
 
 
     """
@@ -19,12 +26,15 @@ class abstact_model(ABC):
     """
     @property
     def unique_code(self) -> str:
+        if self.__unique_code is None:
+            self.__unique_code = uuid.uuid4().hex
         return self.__unique_code
     
     @unique_code.setter
     def unique_code(self, value: str):
         validator.validate(value, str)
-        self.__unique_code = value.strip()
+        value = value.strip()
+        self.__unique_code = sys.intern(value) if self._intern_codes else value
     
 
     """
@@ -12,4 +12,9 @@ class abstract_response(abc.ABC):
         if len(data) == 0:
             raise operation_exception("Нет данных!")
 
-        return ""
\ No newline at end of file
+        return ""
+
+    # Сформировать ответ по частям (генератор строк).
+    # По умолчанию - одним куском через build
+    def stream(self, format: str, data: list):
+        yield self.build(format, data)
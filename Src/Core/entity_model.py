@@ -1,3 +1,4 @@
+import sys
 from Src.Core.abstract_model import abstact_model
 from Src.Core.validator import validator
 
@@ -6,7 +7,7 @@ from Src.Core.validator import validator
 Общий класс для наследования. Содержит стандартное определение: код, наименование
 """
 class entity_model(abstact_model):
-    __name:str = ""
+    __slots__ = ("__name",)
 
     def __init__(self, name: str = ""):
         super().__init__()
@@ -20,7 +21,7 @@ class entity_model(abstact_model):
     @name.setter
     def name(self, value:str):
         validator.validate(value, str)
-        self.__name = value.strip()
+        self.__name = sys.intern(value.strip())
 
 
     # Фабричный метод
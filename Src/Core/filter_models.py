@@ -5,3 +5,5 @@ class filter_model(Enum):
     GROUP = "group_model"
     RANGE = "range_model"
     RECEIPT = "receipt_model"
+    STORAGE = "storage_model"
+    TRANSACTION = "transaction_model"
@@ -4,3 +4,9 @@ from enum import Enum
 class filter_type(str, Enum):
     EQUALS = "EQUALS"
     LIKE = "LIKE"
+    GT = "GT"
+    GTE = "GTE"
+    LT = "LT"
+    LTE = "LTE"
+    BETWEEN = "BETWEEN"
+    IN = "IN"
@@ -0,0 +1,135 @@
+import json
+from Src.Core.validator import validator, operation_exception
+
+"""
+Потоковое чтение Json файла.
+Файл читается блоками, значения разбираются по одному, поэтому большие массивы
+можно обойти запись за записью, не загружая их целиком в память.
+
+Пример:
+    reader = json_stream(file)
+    for key in reader.members():
+        if key == "transaction":
+            for record in reader.items():
+                ...
+        else:
+            reader.skip()
+"""
+class json_stream:
+    __decoder = json.JSONDecoder()
+    __spaces = " \t\r\n"
+
+    def __init__(self, file_instance, chunk_size: int = 1 << 16):
+        validator.validate(chunk_size, int)
+        self.__file = file_instance
+        self.__chunk_size = chunk_size
+        self.__buffer = ""
+        self.__position = 0
+        self.__eof = False
+
+    """
+    Обойти ключи объекта. После получения ключа вызывающий обязан прочитать значение
+    (value, items, members или skip)
+    """
+    def members(self):
+        self.__expect("{")
+        if self.__peek() == "}":
+            self.__position += 1
+            return
+
+        while True:
+            key = self.value()
+            validator.validate(key, str)
+            self.__expect(":")
+            yield key
+
+            char = self.__next()
+            if char == "}":
+                return
+            if char != ",":
+                raise operation_exception(f"Ошибка разбора Json: ожидается ',' или '}}', получено '{char}'")
+
+    """
+    Обойти элементы массива, разбирая по одному
+    """
+    def items(self):
+        self.__expect("[")
+        if self.__peek() == "]":
+            self.__position += 1
+            return
+
+        while True:
+            yield self.value()
+
+            char = self.__next()
+            if char == "]":
+                return
+            if char != ",":
+                raise operation_exception(f"Ошибка разбора Json: ожидается ',' или ']', получено '{char}'")
+
+    """
+    Прочитать очередное значение целиком
+    """
+    def value(self):
+        self.__peek()
+        while True:
+            try:
+                result, end = self.__decoder.raw_decode(self.__buffer, self.__position)
+            except json.JSONDecodeError:
+                if self.__eof:
+                    raise operation_exception("Ошибка разбора Json: неполное значение")
+                self.__read()
+                continue
+
+            # Число могло оборваться на границе блока - дочитываем
+            if end == len(self.__buffer) and not self.__eof:
+                self.__read()
+                continue
+
+            self.__position = end
+            return result
+
+    """
+    Пропустить значение. Массивы и объекты обходятся по элементам
+    """
+    def skip(self):
+        char = self.__peek()
+        if char == "[":
+            for _ in self.items():
+                pass
+        elif char == "{":
+            for _ in self.members():
+                self.skip()
+        else:
+            self.value()
+
+    # Следующий значимый символ без сдвига позиции
+    def __peek(self) -> str:
+        while True:
+            while self.__position < len(self.__buffer) and self.__buffer[self.__position] in self.__spaces:
+                self.__position += 1
+            if self.__position < len(self.__buffer):
+                return self.__buffer[self.__position]
+            if self.__eof:
+                raise operation_exception("Ошибка разбора Json: неожиданный конец файла")
+            self.__read()
+
+    # Следующий значимый символ со сдвигом позиции
+    def __next(self) -> str:
+        char = self.__peek()
+        self.__position += 1
+        return char
+
+    def __expect(self, expected: str):
+        char = self.__next()
+        if char != expected:
+            raise operation_exception(f"Ошибка разбора Json: ожидается '{expected}', получено '{char}'")
+
+    # Дочитать блок, отбросив уже разобранную часть буфера
+    def __read(self):
+        chunk = self.__file.read(self.__chunk_size)
+        if not chunk:
+            self.__eof = True
+            return
+        self.__buffer = self.__buffer[self.__position:] + chunk
+        self.__position = 0
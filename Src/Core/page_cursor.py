@@ -0,0 +1,85 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from Src.Core.validator import validator, argument_exception
+
+"""
+Курсор постраничной выборки (keyset).
+Курсор указывает на последний элемент выданной страницы:
+  - при сортировке - ключ сортировки элемента (значения полей и unique_code),
+    следующая страница начинается с элементов, чей ключ больше;
+  - без сортировки - unique_code элемента и его позиция, следующая страница
+    начинается после этого элемента в порядке коллекции.
+Для клиента курсор - непрозрачная строка (base64url от Json). Курсор привязан к полям сортировки.
+"""
+class page_cursor:
+
+    def __init__(self, sorting: list, code: str, key: tuple = None, position: int = 0):
+        validator.validate(sorting, list)
+        validator.validate(code, str)
+        validator.validate(position, int)
+        self.__sorting = sorting
+        self.__code = code
+        self.__key = key
+        self.__position = position
+
+    @property
+    def sorting(self) -> list:
+        return self.__sorting
+
+    """
+    unique_code последнего элемента страницы
+    """
+    @property
+    def code(self) -> str:
+        return self.__code
+
+    """
+    Ключ сортировки последнего элемента (None - выборка без сортировки)
+    """
+    @property
+    def key(self) -> tuple:
+        return self.__key
+
+    """
+    Позиция последнего элемента в выборке без сортировки
+    """
+    @property
+    def position(self) -> int:
+        return self.__position
+
+    """
+    Закодировать курсор в строку
+    """
+    def encode(self) -> str:
+        data = {"s": self.__sorting, "c": self.__code, "p": self.__position}
+        if self.__key is not None:
+            data["k"] = [[rank, value.isoformat() if isinstance(value, datetime) else value]
+                         for rank, value in self.__key[:-1]]
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii").rstrip("=")
+
+    """
+    Разобрать курсор. Курсор должен быть выдан для тех же полей сортировки
+    """
+    @staticmethod
+    def decode(text: str, sorting: list) -> "page_cursor":
+        validator.validate(text, str)
+        validator.validate(sorting, list)
+        try:
+            padding = "=" * (-len(text) % 4)
+            data = json.loads(base64.urlsafe_b64decode(text + padding).decode("utf-8"))
+            code = data["c"]
+            position = data["p"]
+            key = None
+            if "k" in data:
+                key = tuple((rank, datetime.fromisoformat(value) if rank == 2 else value)
+                            for rank, value in data["k"]) + (code,)
+            if data["s"] != sorting:
+                raise argument_exception("Курсор выдан для другой сортировки")
+            return page_cursor(sorting, code, key, position)
+        except argument_exception:
+            raise
+        except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            raise argument_exception(f"Некорректный курсор: {e}")
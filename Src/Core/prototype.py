@@ -2,7 +2,10 @@ from Src.Core.validator import validator
 from Src.Dtos.field_filter_dto import field_filter_dto
 from Src.Core.filter_type import filter_type
 from Src.Core.filter_models import filter_model
-from typing import Any, List
+from Src.Core.validator import argument_exception
+from datetime import datetime, date
+from typing import Any, List, Callable
+import operator
 
 class prototype:
     """
@@ -12,7 +15,8 @@ class prototype:
       - фильтрацию через список field_filter_dto или через объект DTO (у которого есть .filters)
       - вложенные поля ('range.base.name', 'group.name' и т.д.)
       - фильтрацию по name и unique_code
-      - фильтры типа EQUALS / LIKE
+      - фильтры типа EQUALS / LIKE (строки без учета регистра)
+      - фильтры типа GT / GTE / LT / LTE / BETWEEN / IN (с учетом типа: даты, числа, строки)
     """
     __data: list = []
 
@@ -104,6 +108,213 @@ class prototype:
         return prototype(data.get(key, []))
     
 
+    @staticmethod
+    def accessor(path: str) -> Callable[[Any], Any]:
+        """
+        Скомпилировать путь 'range.base.name' в функцию чтения.
+        Путь разбирается один раз, для каждого класса объекта на каждом шаге
+        запоминается способ чтения (attrgetter или dict.get).
+        Семантика совпадает с _get_nested_attr: отсутствующий атрибут дает None.
+        """
+        validator.validate(path, str)
+        heads = tuple(path.split("."))
+        # Способы чтения поля на каждом шаге по классам объектов
+        caches = tuple({} for _ in heads)
+
+        def fan(obj, position: int):
+            results = []
+            for element in obj:
+                r = read(element, position)
+                if r is not None:
+                    results.append(r)
+            return results if results else None
+
+        def fast(obj, position: int):
+            index = position
+            for cache in caches[position:] if position else caches:
+                if obj is None:
+                    return None
+                reader = cache.get(type(obj))
+                if reader is None:
+                    if isinstance(obj, (list, tuple)):
+                        return fan(obj, index)
+                    reader = cache[type(obj)] = prototype.__reader(type(obj), heads[index])
+                obj = reader(obj)
+                index += 1
+            return obj
+
+        def read(obj, position: int = 0):
+            try:
+                return fast(obj, position)
+            except AttributeError:
+                # редкий случай - атрибута нет: медленный путь с getattr по умолчанию
+                return prototype._get_nested_attr(obj, ".".join(heads[position:]))
+
+        return read
+
+    @staticmethod
+    def __reader(obj_type: type, head: str) -> Callable[[Any], Any]:
+        if issubclass(obj_type, dict):
+            return lambda obj: obj.get(head)
+        return operator.attrgetter(head)
+
+    @staticmethod
+    def normalize(value) -> str:
+        """
+        Нормализация значения для сравнения строк (strip + lower)
+        """
+        return str(value).strip().lower()
+
+    @staticmethod
+    def comparable(value):
+        """
+        Значение поля для сравнения по порядку: даты -> datetime, числа -> float,
+        остальное -> нормализованная строка
+        """
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        return prototype.normalize(value)
+
+    @staticmethod
+    def sortable(value) -> tuple:
+        """
+        Ключ сортировки значения поля: (вид, значение). Значения разных видов
+        не сравниваются между собой: пустые, затем числа, даты и строки
+        """
+        if type(value) is str:
+            return (3, value)
+        if value is None:
+            return (0, "")
+        if isinstance(value, (int, float)):
+            return (1, float(value))
+        if isinstance(value, (date, datetime)):
+            return (2, prototype.comparable(value))
+        if isinstance(value, str):
+            return (3, value)
+        return (3, str(value))
+
+    @staticmethod
+    def coerce(value, kind: type):
+        """
+        Привести значение фильтра к виду поля kind (datetime, float или str).
+        Даты задаются в ISO формате ('2024-01-31', '2024-01-31T10:00:00'). None - привести невозможно
+        """
+        if value is None:
+            return None
+        try:
+            if kind is datetime:
+                if isinstance(value, (date, datetime)):
+                    return prototype.comparable(value)
+                if isinstance(value, str):
+                    result = datetime.fromisoformat(value.strip())
+                    # даты моделей без часового пояса
+                    return result if result.tzinfo is None else None
+                return None
+            if kind is float:
+                if isinstance(value, bool):
+                    return None
+                return float(value)
+        except (TypeError, ValueError):
+            return None
+        return prototype.normalize(value)
+
+    @staticmethod
+    def bounds(ff: field_filter_dto) -> tuple:
+        """
+        Значения фильтра сравнения: BETWEEN - (нижняя, верхняя) включительно, IN - набор значений,
+        GT / GTE / LT / LTE - одно значение
+        """
+        value = ff.value
+        if ff.type == filter_type.BETWEEN:
+            if not isinstance(value, (list, tuple)) or len(value) != 2:
+                raise argument_exception(f"Для BETWEEN ожидается пара значений, получено {value}")
+            return tuple(value)
+        if ff.type == filter_type.IN:
+            return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+        return (value,)
+
+    @staticmethod
+    def compile(ff: field_filter_dto) -> Callable[[Any], bool]:
+        """
+        Скомпилировать фильтр в предикат. Значение фильтра нормализуется один раз
+        (для сравнений по порядку - один раз на каждый вид значений поля)
+        """
+        validator.validate(ff, field_filter_dto)
+        read = prototype.accessor(ff.field_name)
+
+        if ff.type in prototype.__ordered:
+            test = prototype.__compile_ordered(ff)
+        else:
+            value = prototype.normalize(ff.value)
+            if ff.type == filter_type.LIKE:
+                def compare(candidate: str) -> bool:
+                    return value in candidate
+            else:
+                # EQUALS и fallback
+                def compare(candidate: str) -> bool:
+                    return candidate == value
+
+            def test(candidate) -> bool:
+                if type(candidate) is not str:
+                    candidate = str(candidate)
+                return compare(candidate.strip().lower())
+
+        def match(candidate) -> bool:
+            if candidate is None:
+                return False
+            if isinstance(candidate, (list, tuple)):
+                return any(match(c) for c in candidate)
+            return test(candidate)
+
+        def predicate(item) -> bool:
+            return match(read(item))
+
+        return predicate
+
+    # Сравнения по порядку и наборы значений
+    __ordered = {
+        filter_type.GT: operator.gt,
+        filter_type.GTE: operator.ge,
+        filter_type.LT: operator.lt,
+        filter_type.LTE: operator.le,
+        filter_type.BETWEEN: None,
+        filter_type.IN: None,
+    }
+
+    @staticmethod
+    def __compile_ordered(ff: field_filter_dto) -> Callable[[Any], bool]:
+        raw = prototype.bounds(ff)
+        compare = prototype.__ordered[ff.type]
+        # вид значения поля -> значения фильтра, приведенные к нему (None - несравнимо)
+        coerced = {}
+
+        def values(kind: type):
+            if kind not in coerced:
+                result = tuple(prototype.coerce(x, kind) for x in raw)
+                if ff.type == filter_type.IN:
+                    result = frozenset(x for x in result if x is not None)
+                elif any(x is None for x in result):
+                    result = None
+                coerced[kind] = result
+            return coerced[kind]
+
+        def test(candidate) -> bool:
+            candidate = prototype.comparable(candidate)
+            bound = values(type(candidate))
+            if bound is None:
+                return False
+            if ff.type == filter_type.IN:
+                return candidate in bound
+            if ff.type == filter_type.BETWEEN:
+                return bound[0] <= candidate <= bound[1]
+            return compare(candidate, bound[0])
+
+        return test
+
     @staticmethod
     def filter(source: "prototype", filters) -> "prototype":
         """
@@ -126,17 +337,13 @@ class prototype:
         if not source.data:
             return source.clone([])
 
-        filtered = []
-        for item in source.data:
-            matched_all = True
-            for ff in filters_list:
-                candidate = prototype._get_nested_attr(item, ff.field_name)
-                # отладочный вывод (при необходимости)
-                print("DEBUG prototype._get_nested_attr:", ff.field_name, "=>", candidate, "ff.value:", ff.value)
-                if not prototype._match_value(candidate, ff):
-                    matched_all = False
-                    break
-            if matched_all:
-                filtered.append(item)
+        items = source.data
+        predicates = [prototype.compile(ff) for ff in filters_list]
+        if not predicates:
+            return source.clone(list(items))
+        if len(predicates) == 1:
+            filtered = list(filter(predicates[0], items))
+        else:
+            filtered = [item for item in items if all(p(item) for p in predicates)]
 
         return source.clone(filtered)
@@ -40,8 +40,9 @@ class validator:
         if not isinstance(value, type_):
             raise argument_exception(f"Некорректный тип!\nОжидается {type_}. Текущий тип {type(value)}")
 
-        # Проверка аргумента
-        if len(str(value).strip()) == 0:
+        # Проверка аргумента. Строковое представление коллекций не бывает пустым,
+        # а его построение для больших списков стоит полного обхода
+        if not isinstance(value, (list, tuple, dict, set)) and len(str(value).strip()) == 0:
             raise argument_exception("Пустой аргумент")
 
         if len_ is not None and len(str(value).strip()) > len_:
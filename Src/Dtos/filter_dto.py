@@ -103,7 +103,11 @@ class filter_dto(abstact_dto):
 
         return inst
 
-    def apply(self, data: list) -> list:
+    # planner - необязательный filter_planner: выбирает кандидатов по индексам репозитория
+    def apply(self, data: list, planner=None) -> list:
+        if planner is not None:
+            return planner.apply(data, self.filters)
+
         proto = prototype(data)
         filtered_proto = prototype.filter(proto, self)
         return filtered_proto.data
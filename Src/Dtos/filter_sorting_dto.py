@@ -1,8 +1,31 @@
 from Src.Dtos.filter_dto import filter_dto
 from typing import List, Dict, Any, Optional
-from Src.Dtos.filter_dto import filter_dto
-from Src.Core.validator import validator
+import heapq
+from datetime import datetime, timedelta
+from Src.Core.validator import validator, argument_exception
 from Src.Core.prototype import prototype
+from Src.Core.page_cursor import page_cursor
+
+_epoch = datetime(1970, 1, 1)
+_second = timedelta(seconds=1)
+
+
+# Значение с обратным порядком сравнения (сортировка по убыванию в составном ключе)
+class _descending:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other) -> bool:
+        return other.value < self.value
+
+    def __gt__(self, other) -> bool:
+        return other.value > self.value
+
 
 class filter_sorting_dto:
     __filters = []
@@ -11,6 +34,18 @@ class filter_sorting_dto:
     def __init__(self):
         self.filters: filter_dto = filter_dto()
         self.sorting: List[str] = []
+        # Постраничная выборка: размер страницы (None - без ограничения), смещение и курсор
+        self.limit: Optional[int] = None
+        self.offset: int = 0
+        self.cursor: Optional[str] = None
+        self.__next_cursor = None
+
+    """
+    Курсор следующей страницы после apply / paginate (None - страниц больше нет)
+    """
+    @property
+    def next_cursor(self) -> Optional[str]:
+        return self.__next_cursor
 
     @staticmethod
     def from_dict(d: Optional[Dict[str, Any]]) -> "filter_sorting_dto":
@@ -33,22 +68,165 @@ class filter_sorting_dto:
         if "sorting" in d and d["sorting"] is not None:
             if not isinstance(d["sorting"], list):
                 raise ValueError("sorting must be a list of field names")
-            inst.sorting = [str(x) for x in d["sorting"]]
+            inst.sorting = [filter_sorting_dto.__sorting_key(x) for x in d["sorting"]]
+
+        # pagination
+        inst.limit = d.get("limit")
+        inst.offset = d.get("offset") or 0
+        inst.cursor = d.get("cursor")
 
         return inst
 
-    def apply(self, data: list) -> list:
+    # Поле сортировки: строка ('name', '-name' - по убыванию) или {"field_name": "name", "descending": true}
+    @staticmethod
+    def __sorting_key(value) -> str:
+        if isinstance(value, dict):
+            field_name = value.get("field_name")
+            validator.validate(field_name, str)
+            return ("-" if value.get("descending") else "") + field_name.strip()
+        return str(value)
+
+    # planner - необязательный filter_planner для фильтрации по индексам репозитория
+    def apply(self, data: list, planner=None) -> list:
         validator.validate(data, list)
-        result = self.filters.apply(data) if self.filters and self.filters.filters else data[:]
+        result = self.filters.apply(data, planner) if self.filters and self.filters.filters else data[:]
+        return self.paginate(result)
+
+    """
+    Отсортировать (если задана сортировка) и выбрать страницу по limit / offset / cursor.
+    Поле сортировки с префиксом '-' сортируется по убыванию. Порядок: по полям сортировки,
+    при равенстве - по unique_code; без сортировки - порядок items.
+    Ключи сортировки вычисляются один раз на элемент, сортировка - за один проход.
+    При заданном limit выбираются только первые offset + limit элементов (куча, O(n log k)).
+    Курсор следующей страницы доступен в next_cursor
+    """
+    def paginate(self, items: list) -> list:
+        validator.validate(items, list)
+        self.__validate_page()
+        cursor = page_cursor.decode(self.cursor, self.sorting) if self.cursor else None
+
+        if self.sorting:
+            key = self.__key()
+            order = self.__order()
+            keys = [key(item) for item in items]
+            compare = keys if order is None else [order(x) for x in keys]
+            positions = range(len(items))
+            if cursor is not None:
+                bound = self.__flat(cursor.key)
+                bound = bound if order is None else order(bound)
+                positions = [i for i in positions if compare[i] > bound]
+            if self.limit is None:
+                positions = sorted(positions, key=compare.__getitem__)
+            else:
+                # на один больше - чтобы узнать, есть ли следующая страница
+                positions = heapq.nsmallest(self.offset + self.limit + 1, positions, key=compare.__getitem__)
+            ordered = [items[i] for i in positions]
+            keys = [keys[i] for i in positions]
+            start = 0
+        else:
+            ordered = items
+            keys = None
+            start = self.__resume(items, cursor) if cursor is not None else 0
 
-        if not self.sorting:
-            return result
+        start += self.offset
+        end = len(ordered) if self.limit is None else min(start + self.limit, len(ordered))
+        page = ordered[start:end]
 
-        for key in reversed(self.sorting):
-            result.sort(key=lambda item: prototype._get_nested_attr(item, key) or "")
+        self.__next_cursor = None
+        if page and end < len(ordered):
+            last = page[-1]
+            if keys is not None:
+                self.__next_cursor = page_cursor(self.sorting, last.unique_code,
+                                                 self.__pairs(keys[end - 1])).encode()
+            else:
+                self.__next_cursor = page_cursor(self.sorting, last.unique_code, None, end - 1).encode()
+        return page
 
+    # Поля сортировки: (путь, по убыванию)
+    def __fields(self) -> list:
+        result = []
+        for key in self.sorting:
+            validator.validate(key, str)
+            descending = key.startswith("-")
+            path = key[1:].strip() if descending else key.strip()
+            validator.validate(path, str)
+            result.append((path, descending))
         return result
 
+    # Ключ сортировки элемента: плоский кортеж (вид, значение) по каждому полю, затем unique_code
+    def __key(self):
+        readers = [prototype.accessor(path) for path, _ in self.__fields()]
+        sortable = prototype.sortable
+        if len(readers) == 1:
+            read = readers[0]
+            return lambda item: sortable(read(item)) + (item.unique_code,)
+        if len(readers) == 2:
+            first, second = readers
+            return lambda item: sortable(first(item)) + sortable(second(item)) + (item.unique_code,)
+
+        def key(item) -> tuple:
+            result = ()
+            for read in readers:
+                result += sortable(read(item))
+            return result + (item.unique_code,)
+
+        return key
+
+    # Ключ сравнения по ключу сортировки (None - совпадает с ним). Поля по убыванию: числа и даты меняют знак,
+    # строки оборачиваются в значение с обратным сравнением
+    def __order(self):
+        descending = [index for index, (_, desc) in enumerate(self.__fields()) if desc]
+        if not descending:
+            return None
+
+        def order(key: tuple) -> tuple:
+            result = list(key)
+            for index in descending:
+                rank, value = key[2 * index], key[2 * index + 1]
+                result[2 * index] = -rank
+                if rank == 1:
+                    result[2 * index + 1] = -value
+                elif rank == 2:
+                    result[2 * index + 1] = -((value - _epoch) / _second)
+                else:
+                    result[2 * index + 1] = _descending(value)
+            return tuple(result)
+
+        return order
+
+    # Ключ сортировки курсора: пары (вид, значение) и unique_code
+    @staticmethod
+    def __pairs(key: tuple) -> tuple:
+        return tuple(zip(key[0:-1:2], key[1:-1:2])) + (key[-1],)
+
+    @staticmethod
+    def __flat(key: tuple) -> tuple:
+        result = ()
+        for pair in key[:-1]:
+            result += tuple(pair)
+        return result + (key[-1],)
+
+    # Позиция, с которой продолжается выборка без сортировки
+    @staticmethod
+    def __resume(items: list, cursor: page_cursor) -> int:
+        position = cursor.position
+        if 0 <= position < len(items) and items[position].unique_code == cursor.code:
+            return position + 1
+        for index, item in enumerate(items):
+            if item.unique_code == cursor.code:
+                return index + 1
+        # элемент курсора удален - продолжаем с его прежней позиции
+        return min(position, len(items))
+
+    def __validate_page(self):
+        if self.limit is not None and (isinstance(self.limit, bool) or not isinstance(self.limit, int)
+                                       or self.limit <= 0):
+            raise argument_exception("limit должен быть положительным целым")
+        if isinstance(self.offset, bool) or not isinstance(self.offset, int) or self.offset < 0:
+            raise argument_exception("offset должен быть неотрицательным целым")
+        if self.cursor is not None:
+            validator.validate(self.cursor, str)
+
 
     # {
     #     "filters":
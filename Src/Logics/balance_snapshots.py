@@ -0,0 +1,178 @@
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from threading import Lock
+from Src.Core.abstract_index import abstract_index
+from Src.Core.validator import validator
+from Src.Logics.transaction_store import transaction_store
+from Src.Models.transaction_model import transaction_model
+
+"""
+Контрольные точки остатков на начало каждого месяца.
+Остаток хранится по ключу (склад, номенклатура, единица) в плотных номерах transaction_store
+и уже пересчитан через коэффициент единицы измерения.
+
+Остаток на дату = ближайшая контрольная точка + транзакции месяца до этой даты.
+Контрольные точки строятся лениво. Транзакция задним числом сбрасывает все точки после своего месяца.
+Подключается к репозиторию после transaction_store.
+Разметка и точки защищены блокировкой: прогрев и отчеты строят точки в рабочих потоках,
+пока обработчики в цикле событий добавляют транзакции.
+"""
+class balance_snapshots(abstract_index):
+
+    def __init__(self, store: transaction_store):
+        validator.validate(store, transaction_store)
+        self.__store = store
+        self.__lock = Lock()
+        self.__reset()
+
+    @property
+    def key(self) -> str:
+        return "transaction_model"
+
+    """
+    Номер месяца: год * 12 + (месяц - 1)
+    """
+    @staticmethod
+    def month_of(value: datetime) -> int:
+        return value.year * 12 + value.month - 1
+
+    """
+    Остатки на начало даты (все движения строго до value).
+    Результат: (склад, номенклатура, единица) -> остаток
+    """
+    def balance(self, value: datetime) -> dict:
+        validator.validate(value, datetime)
+        month = self.month_of(value)
+        with self.__lock:
+            result = dict(self.__checkpoint(month))
+
+            rows = self.__rows.get(month)
+            if rows:
+                limit = transaction_store.to_epoch(value)
+                dates = self.__store.dates
+                for row in rows:
+                    if dates[row] < limit:
+                        self.__add(result, row)
+
+        return result
+
+    """
+    Контрольная точка на начало месяца (все движения до этого месяца)
+    """
+    def checkpoint(self, month: int) -> dict:
+        with self.__lock:
+            return dict(self.__checkpoint(month))
+
+    # Количество построенных контрольных точек
+    @property
+    def count(self) -> int:
+        return len(self.__checkpoints)
+
+    def append(self, item: transaction_model):
+        validator.validate(item, transaction_model)
+        with self.__lock:
+            row = len(self.__store) - 1
+            month = self.month_of(item.date_tr)
+            self.__put(month, row)
+
+            # Транзакция задним числом - точки после её месяца устарели
+            self.__drop_after(month)
+
+    # Строки пачки уже добавлены в transaction_store. Точки сбрасываются один раз
+    # после самого раннего месяца пачки
+    def extend(self, items: list):
+        if len(items) == 0:
+            return
+        months = [self.month_of(item.date_tr) for item in items]
+        with self.__lock:
+            first = len(self.__store) - len(items)
+            for row, month in enumerate(months, first):
+                self.__put(month, row)
+            self.__drop_after(min(months))
+
+    def remove(self, item: transaction_model):
+        # Номера строк сдвинулись - перестраиваем разметку по месяцам
+        with self.__lock:
+            self.__rebuild()
+
+    # Колонки transaction_store к этому моменту уже заменены (строка старой транзакции убрана,
+    # новая добавлена), поэтому одна перестройка учитывает замену. remove + append посчитали бы
+    # новую строку дважды
+    def replace(self, old: transaction_model, item: transaction_model):
+        validator.validate(item, transaction_model)
+        with self.__lock:
+            self.__rebuild()
+
+    def clear(self):
+        with self.__lock:
+            self.__reset()
+
+    # Контрольная точка (под блокировкой)
+    def __checkpoint(self, month: int) -> dict:
+        if not self.__rows or month <= self.__months[0]:
+            return {}
+
+        if month in self.__checkpoints:
+            return self.__checkpoints[month]
+
+        # Ближайшая построенная точка до нужного месяца
+        built = sorted(self.__checkpoints.keys())
+        position = bisect_right(built, month) - 1
+        if position >= 0:
+            current = built[position]
+            totals = dict(self.__checkpoints[current])
+        else:
+            current = self.__months[0]
+            totals = {}
+
+        # Доигрываем месяцы по одному, сохраняя точку на начало каждого следующего
+        start = bisect_right(self.__months, current - 1)
+        for index in range(start, len(self.__months)):
+            moved = self.__months[index]
+            if moved >= month:
+                break
+            for row in self.__rows[moved]:
+                self.__add(totals, row)
+            self.__checkpoints[moved + 1] = dict(totals)
+
+        self.__checkpoints[month] = totals
+        return totals
+
+    # Пустая разметка
+    def __reset(self):
+        # Месяц -> номера строк transaction_store
+        self.__rows = {}
+        # Отсортированный список месяцев, в которых есть движения
+        self.__months = []
+        # Месяц -> остатки на его начало
+        self.__checkpoints = {}
+
+    # Разметка по месяцам заново по колонкам transaction_store
+    def __rebuild(self):
+        self.__reset()
+        for row, value in enumerate(self.__store.dates):
+            self.__put(self.month_of(transaction_store.from_epoch(value)), row)
+
+    # Сбросить точки после месяца
+    def __drop_after(self, month: int):
+        stale = [x for x in self.__checkpoints if x > month]
+        for x in stale:
+            del self.__checkpoints[x]
+
+    # Разместить строку в своём месяце
+    def __put(self, month: int, row: int):
+        rows = self.__rows.get(month)
+        if rows is None:
+            rows = self.__rows[month] = array("q")
+            position = bisect_right(self.__months, month)
+            self.__months.insert(position, month)
+        rows.append(row)
+
+    # Добавить движение строки к остаткам
+    def __add(self, totals: dict, row: int):
+        store = self.__store
+        unit = store.ranges[row]
+        key = (store.storages[row], store.nomenclatures[row], unit)
+        factor = getattr(store.range_of(unit), "value", None) or 1
+        totals[key] = totals.get(key, 0.0) + store.quantities[row] / factor
@@ -1,13 +1,19 @@
+import inspect
+import operator
 from datetime import datetime, date
 from Src.Logics.basic_convertor import basic_converter
 from Src.Logics.datetime_convertor import datetime_converter
 from Src.Logics.reference_conventor import reference_converter
 from Src.Core.abstract_model import abstact_model
 from Src.Logics.structure_convertor import structure_converter
+from Src.Core.common import common
 from Src.Core.validator import argument_exception
 
 class factory_convertor:
 
+    # Планы сериализации по классам: класс -> кортеж (имя поля, функция чтения)
+    __plans = {}
+
     def __init__(self):
         self.__basic = basic_converter()
         self.__datetime = datetime_converter()
@@ -28,21 +34,67 @@ class factory_convertor:
             object: self.__reference
         }
 
+        # Найденные конвертеры по точному типу значения
+        self.__resolved = {}
+
     def create(self, obj):
         if obj is None:
             return None
             # raise argument_exception("Невозможно конвертировать None")
-        for typ, converter in self.__match.items():
-            if isinstance(obj, typ):
-                if typ is date and not isinstance(obj, datetime):
-                    obj = datetime(obj.year, obj.month, obj.day)
+        obj_type = type(obj)
+        resolved = self.__resolved.get(obj_type)
+        if resolved is None:
+            resolved = self.__resolved[obj_type] = self.__resolve(obj_type)
+        typ, converter = resolved
+
+        if typ is date and not isinstance(obj, datetime):
+            obj = datetime(obj.year, obj.month, obj.day)
+
+        if hasattr(converter, "convert"):
+            return converter.convert(obj)
 
-                if hasattr(converter, "convert"):
-                    return converter.convert(obj)
+        if callable(converter):
+            return converter(obj)
 
-                if callable(converter):
-                    return converter(obj)
+        raise TypeError("Неправильный тип конвертера в __match")
 
-                raise TypeError("Неправильный тип конвертера в __match")
+    """
+    План сериализации объекта: список (имя поля, функция чтения).
+    Для классов, у которых поля объявлены на уровне класса (свойства), план строится
+    один раз и переиспользуется. Объекты с публичными атрибутами экземпляра
+    разбираются через common.get_fields каждый раз
+    """
+    def plan(self, obj) -> tuple:
+        attributes = getattr(obj, "__dict__", None)
+        if attributes and any(not name.startswith("_") for name in attributes):
+            return tuple((name, operator.attrgetter(name)) for name in common.get_fields(obj))
+
+        obj_type = type(obj)
+        result = factory_convertor.__plans.get(obj_type)
+        if result is None:
+            result = factory_convertor.__plans[obj_type] = factory_convertor.__compile(obj_type)
+        return result
+
+    # Построить план по классу: свойства читаются напрямую через fget, методы пропускаются
+    @staticmethod
+    def __compile(obj_type: type) -> tuple:
+        result = []
+        for name in dir(obj_type):
+            if name.startswith("_"):
+                continue
+            attribute = inspect.getattr_static(obj_type, name)
+            if isinstance(attribute, property):
+                result.append((name, attribute.fget))
+            elif isinstance(attribute, (staticmethod, classmethod)) or callable(attribute):
+                continue
+            else:
+                result.append((name, operator.attrgetter(name)))
+        return tuple(result)
+
+    # Найти конвертер для типа
+    def __resolve(self, obj_type: type) -> tuple:
+        for typ, converter in self.__match.items():
+            if issubclass(obj_type, typ):
+                return typ, converter
 
         raise argument_exception("Не найден подходящий конвертер")
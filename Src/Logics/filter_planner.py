@@ -0,0 +1,162 @@
+from Src.Core.validator import validator
+from Src.Core.prototype import prototype
+from Src.Core.filter_type import filter_type
+from Src.Dtos.field_filter_dto import field_filter_dto
+from Src.Logics.hash_index import hash_index
+from Src.Logics.sorted_index import sorted_index
+from Src.Logics.trigram_index import trigram_index
+
+"""
+План выполнения фильтра
+  access   - способ получения кандидатов: hash (хеш-индексы), sorted (упорядоченный индекс),
+             hash+sorted, trigram (индекс подстрок), scan (перебор)
+  seeds    - условия, по которым выбраны кандидаты, с оценкой числа элементов и индексом
+  residual - условия, проверяемые на кандидатах
+"""
+class filter_plan:
+
+    def __init__(self, key: str, access: str, seeds: list, residual: list):
+        self.__key = key
+        self.__access = access
+        self.__seeds = seeds
+        self.__residual = residual
+
+    @property
+    def key(self) -> str:
+        return self.__key
+
+    @property
+    def access(self) -> str:
+        return self.__access
+
+    """
+    Условия выбора кандидатов: список (field_filter_dto, оценка числа элементов, индекс)
+    """
+    @property
+    def seeds(self) -> list:
+        return self.__seeds
+
+    @property
+    def residual(self) -> list:
+        return self.__residual
+
+    """
+    Описание плана для отладки
+    """
+    def to_dict(self) -> dict:
+        return {
+            "key": self.__key,
+            "access": self.__access,
+            "seeds": [{"field_name": ff.field_name, "type": ff.type.value, "value": ff.value, "estimate": estimate,
+                       "index": type(index).__name__}
+                      for ff, estimate, index in self.__seeds],
+            "residual": [{"field_name": ff.field_name, "type": ff.type.value, "value": ff.value}
+                         for ff in self.__residual],
+        }
+
+
+"""
+Планировщик фильтров по коллекциям репозитория.
+Кандидаты выбираются по индексам:
+  - EQUALS и IN по проиндексированным путям (коды, ссылки, наименования) - hash_index,
+  - GT / GTE / LT / LTE / BETWEEN / IN по упорядоченным полям (даты, количества) - sorted_index,
+  - LIKE по наименованию - trigram_index.
+Хеш-условия пересекаются все (начиная с самого короткого списка), из упорядоченных берется
+только самое избирательное, если оно меньше хеш-условий: широкий диапазон дешевле проверить на кандидатах.
+Остальные условия проверяются только на кандидатах. Без подходящих индексов - полный перебор.
+"""
+class filter_planner:
+
+    def __init__(self, repo):
+        self.__repo = repo
+
+    """
+    Построить план для коллекции key
+    """
+    def plan(self, key: str, filters: list) -> filter_plan:
+        validator.validate(key, str)
+        validator.validate(filters, list)
+        for ff in filters:
+            validator.validate(ff, field_filter_dto)
+
+        hashes = self.__repo.attached(hash_index, key)
+        ranges = self.__repo.attached(sorted_index, key)
+        trigrams = self.__repo.attached(trigram_index, key)
+
+        seeds = []
+        for ff in filters:
+            if hashes is not None and hashes.supports(ff.field_name) and (
+                    ff.type == filter_type.EQUALS or ff.type == filter_type.IN and hashes.textual(ff.field_name)):
+                seeds.append((ff, len(self.__hash_lookup(hashes, ff)), hashes))
+            elif ranges is not None and ranges.supports(ff):
+                seeds.append((ff, ranges.count(ff), ranges))
+
+        if seeds:
+            seeds.sort(key=lambda x: x[1])
+            driver = seeds[0]
+            seeds = [x for x in seeds if x is driver or isinstance(x[2], hash_index)]
+            residual = [ff for ff in filters if all(ff is not seed for seed, _, _ in seeds)]
+            kinds = {isinstance(index, hash_index) for _, _, index in seeds}
+            access = "hash+sorted" if len(kinds) > 1 else ("hash" if True in kinds else "sorted")
+            return filter_plan(key, access, seeds, residual)
+
+        if trigrams is not None:
+            like = next((ff for ff in filters
+                         if ff.type == filter_type.LIKE and ff.field_name == trigrams.field
+                         and trigrams.supports(ff.value)), None)
+            if like is not None:
+                residual = [ff for ff in filters if ff is not like]
+                return filter_plan(key, "trigram", [(like, trigrams.estimate(like.value), trigrams)], residual)
+
+        return filter_plan(key, "scan", [], list(filters))
+
+    """
+    Выполнить план над коллекцией
+    """
+    def execute(self, plan: filter_plan, data: list) -> list:
+        validator.validate(plan, filter_plan)
+        validator.validate(data, list)
+
+        if plan.access == "trigram":
+            ff, _, index = plan.seeds[0]
+            candidates = index.search(ff.value)
+        elif plan.seeds:
+            postings = []
+            for ff, _, index in plan.seeds:
+                numbers = self.__hash_lookup(index, ff) if isinstance(index, hash_index) else index.lookup(ff)
+                postings.append((numbers, index))
+            postings.sort(key=lambda x: len(x[0]))
+
+            numbers, index = postings[0]
+            for other, _ in postings[1:]:
+                numbers = {k: v for k, v in numbers.items() if k in other}
+                if not numbers:
+                    break
+            candidates = index.items(numbers.values())
+        else:
+            candidates = data
+
+        return prototype.filter(prototype(candidates), plan.residual).data
+
+    """
+    Отфильтровать коллекцию. Индексы используются, только если data - коллекция репозитория
+    """
+    def apply(self, data: list, filters: list) -> list:
+        validator.validate(data, list)
+        key = next((k for k, v in self.__repo.data.items() if v is data), None)
+        if key is None:
+            return prototype.filter(prototype(data), filters).data
+
+        return self.execute(self.plan(key, filters), data)
+
+    # Элементы хеш-индекса для EQUALS (одно значение) или IN (объединение значений)
+    @staticmethod
+    def __hash_lookup(index: hash_index, ff: field_filter_dto) -> dict:
+        if ff.type != filter_type.IN:
+            return index.lookup(ff.field_name, ff.value)
+
+        result = {}
+        for value in prototype.bounds(ff):
+            if value is not None:
+                result.update(index.lookup(ff.field_name, value))
+        return result
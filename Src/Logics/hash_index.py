@@ -0,0 +1,136 @@
+from Src.Core.abstract_index import abstract_index
+from Src.Core.validator import validator, argument_exception
+from Src.Core.prototype import prototype
+
+"""
+Хеш-индекс точных значений по нескольким полям коллекции.
+Поле задается путем, как в фильтрах ('unique_code', 'group.unique_code', 'range.name').
+Для каждого пути хранится: нормализованное значение (strip + lower) -> {id(элемент): номер}.
+Значения нормализуются так же, как при сравнении EQUALS в prototype, поэтому
+найденные элементы не требуют повторной проверки условия.
+Номер элемента задает порядок коллекции (при замене элемент сохраняет номер).
+"""
+class hash_index(abstract_index):
+
+    def __init__(self, key: str, paths: tuple):
+        validator.validate(key, str)
+        validator.validate(paths, tuple)
+        for path in paths:
+            validator.validate(path, str)
+        self.__key = key
+        self.__paths = paths
+        self.__readers = {path: prototype.accessor(path) for path in paths}
+        self.clear()
+
+    @property
+    def key(self) -> str:
+        return self.__key
+
+    """
+    Проиндексированные пути
+    """
+    @property
+    def paths(self) -> tuple:
+        return self.__paths
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    """
+    Путь проиндексирован
+    """
+    def supports(self, path: str) -> bool:
+        return path in self.__values
+
+    """
+    Все значения пути - строки (сравнение строк совпадает со сравнением с учетом типа)
+    """
+    def textual(self, path: str) -> bool:
+        return self.__mixed.get(path, 0) == 0
+
+    """
+    Элементы с заданным значением поля: {id(элемент): номер}
+    """
+    def lookup(self, path: str, value) -> dict:
+        if path not in self.__values:
+            raise argument_exception(f"Путь {path} не проиндексирован")
+        return self.__values[path].get(prototype.normalize(value), {})
+
+    """
+    Элементы по номерам в порядке коллекции
+    """
+    def items(self, numbers) -> list:
+        return [self.__items[number] for number in sorted(numbers)]
+
+    def append(self, item):
+        self.__add(item, self.__counter)
+        self.__counter += 1
+
+    def remove(self, item):
+        entry = self.__entries.pop(id(item), None)
+        if entry is None:
+            return
+        number, values, mixed = entry
+        del self.__items[number]
+        for path in mixed:
+            self.__mixed[path] -= 1
+        for path, keys in values.items():
+            postings = self.__values[path]
+            for value in keys:
+                numbers = postings.get(value)
+                if numbers is None:
+                    continue
+                numbers.pop(id(item), None)
+                if not numbers:
+                    del postings[value]
+
+    # Новый элемент занимает место старого в порядке коллекции
+    def replace(self, old, item):
+        entry = self.__entries.get(id(old))
+        if entry is None:
+            self.append(item)
+            return
+        self.remove(old)
+        self.__add(item, entry[0])
+
+    def clear(self):
+        # путь -> значение -> {id(элемент): номер}
+        self.__values = {path: {} for path in self.__paths}
+        # номер -> элемент
+        self.__items = {}
+        # id(элемент) -> (номер, {путь: значения}, пути с нестроковыми значениями)
+        self.__entries = {}
+        # путь -> число элементов с нестроковыми значениями
+        self.__mixed = {path: 0 for path in self.__paths}
+        self.__counter = 0
+
+    def __add(self, item, number: int):
+        values = {}
+        mixed = []
+        for path, read in self.__readers.items():
+            keys = set()
+            if not self.__collect(read(item), keys):
+                mixed.append(path)
+                self.__mixed[path] += 1
+            values[path] = keys
+            postings = self.__values[path]
+            for value in keys:
+                numbers = postings.get(value)
+                if numbers is None:
+                    numbers = postings[value] = {}
+                numbers[id(item)] = number
+        self.__items[number] = item
+        self.__entries[id(item)] = (number, values, tuple(mixed))
+
+    # Значения поля: список раскрывается поэлементно, None не индексируется.
+    # Возвращает False, если среди значений есть нестроковые
+    def __collect(self, value, keys: set) -> bool:
+        if value is None:
+            return True
+        if isinstance(value, (list, tuple)):
+            textual = True
+            for element in value:
+                textual = self.__collect(element, keys) and textual
+            return textual
+        keys.add(prototype.normalize(value))
+        return isinstance(value, str)
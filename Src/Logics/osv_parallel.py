@@ -0,0 +1,168 @@
+import os
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from threading import Lock
+from Src.Core.validator import validator, argument_exception
+from Src.Logics.transaction_store import transaction_store
+from Src.reposity import reposity
+
+"""
+Параллельный расчет ОСВ по всем складам.
+Транзакции делятся на части по складам (снимок колонок transaction_store). Каждая часть
+агрегируется в отдельном процессе, результаты объединяются в родительском процессе.
+Снимок строится один раз на версию транзакций и справочников и передается процессам как
+плотные массивы, поэтому процессам не нужны модели и репозиторий.
+Пул процессов общий для всех расчетов и создается при первом параллельном расчете.
+"""
+class osv_parallel:
+    # Общий пул процессов
+    __pool: ProcessPoolExecutor = None
+    __pool_workers: int = 0
+    __pool_lock = Lock()
+
+    def __init__(self, repo: reposity, workers: int = None):
+        validator.validate(repo, reposity)
+        self.__repo = repo
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.__version = None
+        self.__partitions = {}
+        self.__factors = {}
+
+    """
+    Число процессов. 1 - расчет в текущем процессе
+    """
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    @workers.setter
+    def workers(self, value: int):
+        validator.validate(value, int)
+        if value < 1:
+            raise argument_exception("Число процессов должно быть положительным")
+        self.__workers = value
+
+    """
+    Остатки и обороты по складам за [dt_start, dt_finish).
+    allowed_numbers - плотные номера разрешенных номенклатур (None - все).
+    Результат: плотный номер склада -> {(номенклатура, единица): [остаток на начало, приход, расход]}
+    (номенклатура и единица - плотные номера репозитория, значения пересчитаны через коэффициент единицы)
+    """
+    def aggregate(self, dt_start: datetime, dt_finish: datetime, allowed_numbers: set = None) -> dict:
+        validator.validate(dt_start, datetime)
+        validator.validate(dt_finish, datetime)
+        partitions = self.__snapshot()
+        lo = transaction_store.to_epoch(dt_start)
+        hi = transaction_store.to_epoch(dt_finish)
+        allowed = frozenset(allowed_numbers) if allowed_numbers is not None else None
+
+        tasks = [(storage,) + columns + (self.__factors, lo, hi, allowed)
+                 for storage, columns in partitions.items()]
+        if self.__workers == 1 or len(tasks) < 2:
+            return dict(map(aggregate_partition, tasks))
+
+        pool = self.__executor(min(self.__workers, len(tasks)))
+        return dict(pool.map(aggregate_partition, tasks))
+
+    """
+    Объединить результаты по складам в общий (все склады)
+    """
+    @staticmethod
+    def merge(results) -> dict:
+        merged = {}
+        for partition in results:
+            for key, (opening, incoming, outgoing) in partition.items():
+                bucket = merged.get(key)
+                if bucket is None:
+                    merged[key] = [opening, incoming, outgoing]
+                    continue
+                bucket[0] += opening
+                bucket[1] += incoming
+                bucket[2] += outgoing
+        return merged
+
+    """
+    Остановить общий пул процессов
+    """
+    @staticmethod
+    def shutdown():
+        with osv_parallel.__pool_lock:
+            if osv_parallel.__pool is not None:
+                osv_parallel.__pool.shutdown()
+                osv_parallel.__pool = None
+                osv_parallel.__pool_workers = 0
+
+    # Снимок колонок по складам. Перестраивается при изменении транзакций или справочников
+    def __snapshot(self) -> dict:
+        store = self.__repo.attached(transaction_store)
+        if store is None:
+            raise argument_exception("Колоночное хранилище транзакций не подключено")
+
+        version = self.__repo.versions(reposity.dependencies(reposity.transaction_key()))
+        if version == self.__version:
+            return self.__partitions
+
+        columns = {}
+        for date, qty, s, n, r in zip(store.dates, store.quantities, store.storages,
+                                      store.nomenclatures, store.ranges):
+            partition = columns.get(s)
+            if partition is None:
+                partition = columns[s] = (array("q"), array("d"), array("q"), array("q"))
+            partition[0].append(date)
+            partition[1].append(qty)
+            partition[2].append(n)
+            partition[3].append(r)
+
+        factors = {}
+        for r in set(store.ranges):
+            unit = store.range_of(r)
+            factors[r] = unit.value if unit and getattr(unit, "value", None) else 1
+
+        self.__partitions = columns
+        self.__factors = factors
+        self.__version = version
+        return columns
+
+    # Общий пул процессов (пересоздается, если процессов нужно больше)
+    @staticmethod
+    def __executor(workers: int) -> ProcessPoolExecutor:
+        with osv_parallel.__pool_lock:
+            if osv_parallel.__pool is None or osv_parallel.__pool_workers < workers:
+                if osv_parallel.__pool is not None:
+                    osv_parallel.__pool.shutdown(wait=False)
+                # spawn: процессы не наследуют потоки и блокировки сервера
+                context = multiprocessing.get_context("spawn")
+                osv_parallel.__pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                osv_parallel.__pool_workers = workers
+            return osv_parallel.__pool
+
+
+"""
+Агрегировать часть транзакций одного склада (выполняется в процессе пула).
+task: (склад, даты, количества, номенклатуры, единицы, коэффициенты единиц, начало, конец, разрешенные номенклатуры)
+Результат: (склад, {(номенклатура, единица): [остаток на начало, приход, расход]})
+"""
+def aggregate_partition(task: tuple) -> tuple:
+    storage, dates, quantities, nomenclatures, ranges, factors, lo, hi, allowed = task
+    result = {}
+    for date, qty, n, r in zip(dates, quantities, nomenclatures, ranges):
+        if date >= hi:
+            continue
+        if allowed is not None and n not in allowed:
+            continue
+
+        bucket = result.get((n, r))
+        if bucket is None:
+            bucket = result[(n, r)] = [0.0, 0.0, 0.0]
+
+        qty = qty / factors[r]
+        if date < lo:
+            bucket[0] += qty
+        elif qty > 0:
+            bucket[1] += qty
+        else:
+            bucket[2] -= qty
+
+    return storage, result
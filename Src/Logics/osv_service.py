@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from fastapi import HTTPException
 from typing import Optional, List, Set
 
@@ -7,6 +7,16 @@ from Src.Logics.factory_convertor import factory_convertor
 from Src.Core.prototype import prototype
 from Src.Dtos.filter_dto import filter_dto
 from Src.Core.filter_models import filter_model
+from Src.reposity import reposity
+from Src.Logics.transaction_store import transaction_store
+from Src.Logics.balance_snapshots import balance_snapshots
+from Src.Logics.turnover_aggregates import turnover_aggregates
+from Src.Logics.sqlite_backend import sqlite_backend
+from Src.Logics.filter_planner import filter_planner
+from Src.Logics.osv_parallel import osv_parallel
+from Src.Logics.osv_vectorized import osv_vectorized
+from Src.Logics.unit_graph import unit_graph
+from Src.Core.validator import operation_exception
 
 ALLOWED_LAST_FIELDS = {"name", "unique_code"}
 
@@ -38,21 +48,234 @@ class OSVReportService:
                     detail=f"Фильтрация разрешена только по name и unique_code, но получено '{f.field_name}'"
                 )
 
-    def generate(self, date_start: str, date_end: str, storage_id: Optional[str],
-                 dto: Optional[filter_dto] = None):
+    @staticmethod
+    def _factor(r) -> float:
+        return r.value if r and getattr(r, "value", None) else 1
 
-        dt_start, dt_end = self._parse_dates(date_start, date_end)
-        self._validate_filters(dto)
+    def _turnover_objects(self, transactions: list, storage_id, storage, dt_start, dt_finish,
+                          allowed_nomenclature_ids) -> dict:
+        """
+        Обороты по списку моделей транзакций за [dt_start, dt_finish).
+        Результат: (код номенклатуры, код единицы) -> [номенклатура, единица, приход, расход]
+        """
+        trans_proto = prototype(transactions)
+        filtered_transactions = [
+            t for t in trans_proto.data
+            if (not storage_id or t.storage is storage)
+               and (dt_start <= t.date_tr < dt_finish)
+        ]
+
+        # фильтр по номенклатурам
+        if allowed_nomenclature_ids is not None:
+            filtered_transactions = [
+                t for t in filtered_transactions
+                if getattr(t.nomenclature, "unique_code", None) in allowed_nomenclature_ids
+            ]
+
+        result = {}
+        for t in filtered_transactions:
+            n = t.nomenclature
+            r = t.range
+            key = (n.unique_code, getattr(r, "unique_code", None))
+            if key not in result:
+                result[key] = [n, r, 0.0, 0.0]
+
+            qty = t.quantity / self._factor(r)
+            if qty > 0:
+                result[key][2] += qty
+            else:
+                result[key][3] += abs(qty)
+
+        return result
+
+    def _nomenclature_numbers(self, store: transaction_store, allowed_nomenclature_ids) -> Optional[Set[int]]:
+        """
+        Перевести коды разрешённых номенклатур в плотные номера хранилища
+        """
+        if allowed_nomenclature_ids is None:
+            return None
+
+        result = set()
+        for code in allowed_nomenclature_ids:
+            number = store.number_of(self.start_service.repo.get(reposity.nomenclature_key(), code))
+            if number is not None:
+                result.add(number)
+        return result
+
+    def _opening_objects(self, transactions: list, storage_id, storage, dt_start,
+                         allowed_nomenclature_ids) -> dict:
+        """
+        Остатки на начало периода по списку моделей транзакций (все движения до dt_start).
+        Результат: (код номенклатуры, код единицы) -> [номенклатура, единица, остаток]
+        """
+        result = {}
+        for t in transactions:
+            if t.date_tr >= dt_start:
+                continue
+            if storage_id and t.storage is not storage:
+                continue
+            n = t.nomenclature
+            if allowed_nomenclature_ids is not None and n.unique_code not in allowed_nomenclature_ids:
+                continue
+
+            r = t.range
+            key = (n.unique_code, getattr(r, "unique_code", None))
+            if key not in result:
+                result[key] = [n, r, 0.0]
+            result[key][2] += t.quantity / self._factor(r)
+
+        return result
+
+    def _opening_snapshots(self, snapshots: balance_snapshots, store: transaction_store, storage_id, storage,
+                           dt_start, allowed_nomenclature_ids) -> dict:
+        """
+        Остатки на начало периода по контрольным точкам. Результат такой же, как у _opening_objects
+        """
+        storage_number = store.number_of(storage) if storage_id else None
+        if storage_id and storage_number is None:
+            return {}
+        allowed_numbers = self._nomenclature_numbers(store, allowed_nomenclature_ids)
+
+        sums = {}
+        for (s, n, r), value in snapshots.balance(dt_start).items():
+            if storage_number is not None and s != storage_number:
+                continue
+            if allowed_numbers is not None and n not in allowed_numbers:
+                continue
+            sums[(n, r)] = sums.get((n, r), 0.0) + value
+
+        result = {}
+        for (n, r), value in sums.items():
+            nomenclature = store.nomenclature_of(n)
+            unit = store.range_of(r)
+            result[(nomenclature.unique_code, unit.unique_code)] = [nomenclature, unit, value]
+
+        return result
+
+    def _turnover_sql(self, backend: sqlite_backend, storage_id, dt_start, dt_finish,
+                      allowed_nomenclature_ids) -> dict:
+        """
+        Обороты с фильтром по датам и складу на стороне SQLite. Результат такой же, как у _turnover_objects
+        """
+        repo = self.start_service.repo
+        result = {}
+        for (n_code, r_code), (incoming, outgoing) in backend.turnover(dt_start, dt_finish, storage_id).items():
+            if allowed_nomenclature_ids is not None and n_code not in allowed_nomenclature_ids:
+                continue
+            n = repo.get(reposity.nomenclature_key(), n_code)
+            r = repo.get(reposity.range_key(), r_code)
+            factor = self._factor(r)
+            result[(n_code, r_code)] = [n, r, incoming / factor, outgoing / factor]
+
+        return result
+
+    def _opening_sql(self, backend: sqlite_backend, storage_id, dt_start, allowed_nomenclature_ids) -> dict:
+        """
+        Остатки на начало периода на стороне SQLite. Результат такой же, как у _opening_objects
+        """
+        repo = self.start_service.repo
+        result = {}
+        for (n_code, r_code), value in backend.balance(dt_start, storage_id).items():
+            if allowed_nomenclature_ids is not None and n_code not in allowed_nomenclature_ids:
+                continue
+            n = repo.get(reposity.nomenclature_key(), n_code)
+            r = repo.get(reposity.range_key(), r_code)
+            result[(n_code, r_code)] = [n, r, value / self._factor(r)]
+
+        return result
+
+    def _turnover_aggregates(self, aggregates: turnover_aggregates, store: transaction_store, storage_id, storage,
+                             dt_start, dt_finish, allowed_nomenclature_ids) -> dict:
+        """
+        Обороты по дневным суммам: стоимость зависит от числа дней и ключей, а не транзакций.
+        Результат такой же, как у _turnover_objects
+        """
+        storage_number = store.number_of(storage) if storage_id else None
+        if storage_id and storage_number is None:
+            return {}
+        allowed_numbers = self._nomenclature_numbers(store, allowed_nomenclature_ids)
+
+        sums = {}
+        day_end = (dt_finish - timedelta(days=1)).date()
+        for (s, n, r), (incoming, outgoing) in aggregates.turnover(dt_start.date(), day_end,
+                                                                   storage_number, allowed_numbers).items():
+            bucket = sums.get((n, r))
+            if bucket is None:
+                bucket = sums[(n, r)] = [0.0, 0.0]
+            bucket[0] += incoming
+            bucket[1] += outgoing
+
+        result = {}
+        for (n, r), (incoming, outgoing) in sums.items():
+            nomenclature = store.nomenclature_of(n)
+            unit = store.range_of(r)
+            result[(nomenclature.unique_code, unit.unique_code)] = [nomenclature, unit, incoming, outgoing]
+
+        return result
+
+    def _turnover_columns(self, store: transaction_store, storage_id, storage, dt_start, dt_finish,
+                          allowed_nomenclature_ids) -> dict:
+        """
+        Обороты по колоночному хранилищу: проход по плотным массивам без обращения к моделям.
+        Результат такой же, как у _turnover_objects
+        """
+        if storage_id:
+            storage_number = store.number_of(storage)
+            if storage_number is None:
+                return {}
+        else:
+            storage_number = None
+
+        allowed_numbers = self._nomenclature_numbers(store, allowed_nomenclature_ids)
+
+        lo = transaction_store.to_epoch(dt_start)
+        hi = transaction_store.to_epoch(dt_finish)
+
+        sums = {}
+        factors = {}
+        for date, qty, s, n, r in zip(store.dates, store.quantities, store.storages,
+                                      store.nomenclatures, store.ranges):
+            if date < lo or date >= hi:
+                continue
+            if storage_number is not None and s != storage_number:
+                continue
+            if allowed_numbers is not None and n not in allowed_numbers:
+                continue
 
+            factor = factors.get(r)
+            if factor is None:
+                factor = factors[r] = self._factor(store.range_of(r))
+
+            bucket = sums.get((n, r))
+            if bucket is None:
+                bucket = sums[(n, r)] = [0.0, 0.0]
+
+            qty = qty / factor
+            if qty > 0:
+                bucket[0] += qty
+            else:
+                bucket[1] -= qty
+
+        result = {}
+        for (n, r), (incoming, outgoing) in sums.items():
+            nomenclature = store.nomenclature_of(n)
+            unit = store.range_of(r)
+            result[(nomenclature.unique_code, unit.unique_code)] = [nomenclature, unit, incoming, outgoing]
+
+        return result
+
+    def _allowed_nomenclatures(self, dto: Optional[filter_dto]) -> Optional[Set[str]]:
+        """
+        Коды номенклатур, разрешённых фильтром (None - фильтр не задан)
+        """
         data = self.start_service.data
-        transactions = data.get("transaction_model", [])
         nomenclatures = data.get("nomenclature_model", [])
 
         allowed_nomenclature_ids: Optional[Set[str]] = None
 
         if dto and dto.filters:
             model_proto = prototype.filter_by_model(dto.model, data)
-            filtered_models = prototype.filter(model_proto, dto).data
+            filtered_models = dto.apply(model_proto.data, filter_planner(self.start_service.repo))
 
             if dto.model == filter_model.NOMENCLATURE:
                 allowed_nomenclature_ids = {m.unique_code for m in filtered_models}
@@ -78,33 +301,233 @@ class OSVReportService:
                     if getattr(n.receipt, "unique_code", None) in receipt_ids
                 }
 
+        return allowed_nomenclature_ids
+
+    def _vectorized(self, engine: osv_vectorized, store: transaction_store, storage_id, storage, dt_start, dt_finish,
+                    allowed_nomenclature_ids) -> tuple:
+        """
+        Остатки и обороты векторизованным расчетом на NumPy. Результат такой же, как у
+        _opening_objects и _turnover_objects
+        """
+        if storage_id:
+            storage_number = store.number_of(storage)
+            if storage_number is None:
+                return {}, {}
+        else:
+            storage_number = None
+        allowed_numbers = self._nomenclature_numbers(store, allowed_nomenclature_ids)
+
+        opening = {}
+        for (n, r), value in engine.opening(dt_start, storage_number, allowed_numbers).items():
+            nomenclature = store.nomenclature_of(n)
+            unit = store.range_of(r)
+            opening[(nomenclature.unique_code, unit.unique_code)] = [nomenclature, unit, value]
+
+        turnover = {}
+        for (n, r), (incoming, outgoing) in engine.turnover(dt_start, dt_finish, storage_number,
+                                                            allowed_numbers).items():
+            nomenclature = store.nomenclature_of(n)
+            unit = store.range_of(r)
+            turnover[(nomenclature.unique_code, unit.unique_code)] = [nomenclature, unit, incoming, outgoing]
+
+        return opening, turnover
+
+    def _unit_target(self, unit: Optional[str]):
+        """
+        Единица отчёта для (номенклатура, единица транзакции):
+          None           - единица транзакции (без пересчёта, как раньше),
+          "base"         - корневая базовая единица,
+          "nomenclature" - единица номенклатуры, если приводится, иначе корневая,
+          unique_code    - заданная единица, если приводится, иначе корневая.
+        Результат: функция (номенклатура, единица) -> единица отчёта, или None без пересчёта
+        """
+        if not unit:
+            return None
+
+        graph = self.start_service.repo.attached(unit_graph) or unit_graph()
+        if unit == "base":
+            return lambda n, r: graph.base(r)
+        if unit == "nomenclature":
+            return lambda n, r: n.range if n.range is not None and graph.compatible(n.range, r) else graph.base(r)
+
+        requested = self.start_service.repo.get(reposity.range_key(), unit)
+        if requested is None:
+            raise HTTPException(status_code=400, detail=f"Не найдена единица измерения {unit}")
+        return lambda n, r: requested if graph.compatible(requested, r) else graph.base(r)
+
+    def _normalize(self, opening: dict, turnover: dict, target) -> tuple:
+        """
+        Пересчитать остатки и обороты в единицы отчёта. Строки одной номенклатуры в разных
+        единицах, приводящихся к одной единице отчёта, объединяются
+        """
+        graph = self.start_service.repo.attached(unit_graph) or unit_graph()
+        units = {}
+
+        def convert(n, r):
+            key = (id(n), id(r))
+            entry = units.get(key)
+            if entry is None:
+                unit = target(n, r)
+                entry = units[key] = (unit, graph.convert(1.0, r, unit), (n.unique_code, unit.unique_code))
+            return entry
+
+        result_opening = {}
+        result_turnover = {}
+        try:
+            for n, r, balance in opening.values():
+                if r is None:
+                    continue
+                unit, factor, key = convert(n, r)
+                bucket = result_opening.setdefault(key, [n, unit, 0.0])
+                bucket[2] += balance * factor
+
+            for n, r, incoming, outgoing in turnover.values():
+                if r is None:
+                    continue
+                unit, factor, key = convert(n, r)
+                bucket = result_turnover.setdefault(key, [n, unit, 0.0, 0.0])
+                bucket[2] += incoming * factor
+                bucket[3] += outgoing * factor
+        except operation_exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return result_opening, result_turnover
+
+    def generate(self, date_start: str, date_end: str, storage_id: Optional[str],
+                 dto: Optional[filter_dto] = None, vectorized: bool = False, unit: Optional[str] = None):
+        """
+        ОСВ по складу (storage_id пустой - по всем складам).
+        vectorized - считать на NumPy (при наличии numpy и колоночного хранилища, иначе обычным способом)
+        unit       - единица отчёта (см. _unit_target), по умолчанию - единица транзакции
+        """
+
+        dt_start, dt_end = self._parse_dates(date_start, date_end)
+        self._validate_filters(dto)
+
+        transactions = self.start_service.data.get("transaction_model", [])
+        allowed_nomenclature_ids = self._allowed_nomenclatures(dto)
+        target = self._unit_target(unit)
+
         # -------------------------------------------------------------------
-        # 2) Фильтруем транзакции → тоже через prototype
+        # 2) Считаем обороты: запросом к SQLite, по дневным суммам или колоночному
+        #    хранилищу, если они подключены, иначе по списку моделей транзакций
         # -------------------------------------------------------------------
-        trans_proto = prototype(transactions)
-        filtered_transactions = [
-            t for t in trans_proto.data
-            if (not storage_id or getattr(t.storage, "unique_code", None) == storage_id)
-               and (dt_start <= t.date_tr <= dt_end)
-        ]
+        # Склад ищем по индексу один раз, дальше сравниваем ссылки
+        storage = self.start_service.repo.get(reposity.storage_key(), storage_id) if storage_id else None
 
-        # фильтр по номенклатурам
-        if allowed_nomenclature_ids is not None:
-            filtered_transactions = [
-                t for t in filtered_transactions
-                if getattr(t.nomenclature, "unique_code", None) in allowed_nomenclature_ids
-            ]
+        # Дата окончания входит в период целиком
+        dt_finish = dt_end + timedelta(days=1)
+
+        backend = self.start_service.repo.backend
+        store = self.start_service.repo.attached(transaction_store)
+        if vectorized and store is not None and osv_vectorized.available():
+            opening, turnover = self._vectorized(osv_vectorized(self.start_service.repo), store, storage_id, storage,
+                                                 dt_start, dt_finish, allowed_nomenclature_ids)
+            return self._report(opening, turnover, allowed_nomenclature_ids, target)
+
+        aggregates = self.start_service.repo.attached(turnover_aggregates)
+        if isinstance(backend, sqlite_backend):
+            turnover = self._turnover_sql(backend, storage_id, dt_start, dt_finish, allowed_nomenclature_ids)
+        elif store is not None and aggregates is not None:
+            turnover = self._turnover_aggregates(aggregates, store, storage_id, storage, dt_start, dt_finish,
+                                                 allowed_nomenclature_ids)
+        elif store is not None:
+            turnover = self._turnover_columns(store, storage_id, storage, dt_start, dt_finish,
+                                              allowed_nomenclature_ids)
+        else:
+            turnover = self._turnover_objects(transactions, storage_id, storage, dt_start, dt_finish,
+                                              allowed_nomenclature_ids)
+
+        # Остатки на начало периода: запросом к SQLite или по контрольным точкам, если они подключены
+        snapshots = self.start_service.repo.attached(balance_snapshots)
+        if isinstance(backend, sqlite_backend):
+            opening = self._opening_sql(backend, storage_id, dt_start, allowed_nomenclature_ids)
+        elif store is not None and snapshots is not None:
+            opening = self._opening_snapshots(snapshots, store, storage_id, storage, dt_start,
+                                              allowed_nomenclature_ids)
+        else:
+            opening = self._opening_objects(transactions, storage_id, storage, dt_start,
+                                            allowed_nomenclature_ids)
+
+        return self._report(opening, turnover, allowed_nomenclature_ids, target)
+
+    def generate_storages(self, date_start: str, date_end: str, dto: Optional[filter_dto] = None,
+                          engine: Optional[osv_parallel] = None, unit: Optional[str] = None) -> dict:
+        """
+        ОСВ по всем складам: транзакции делятся по складам и агрегируются параллельно в процессах
+        (см. osv_parallel), затем объединяются.
+        Результат: {"total": отчёт по всем складам, "storages": [{"storage": склад, "report": отчёт}]},
+        отчёт склада совпадает с generate для этого склада
+        """
+        dt_start, dt_end = self._parse_dates(date_start, date_end)
+        self._validate_filters(dto)
+        allowed_nomenclature_ids = self._allowed_nomenclatures(dto)
+        target = self._unit_target(unit)
+
+        repo = self.start_service.repo
+        store = repo.attached(transaction_store)
+        if store is None:
+            raise HTTPException(status_code=400, detail="Колоночное хранилище транзакций не подключено")
+        engine = engine if engine is not None else osv_parallel(repo)
+
+        partitions = engine.aggregate(dt_start, dt_end + timedelta(days=1),
+                                      self._nomenclature_numbers(store, allowed_nomenclature_ids))
+
+        storages = []
+        for storage in self.start_service.data.get("storage_model", []):
+            number = store.number_of(storage)
+            sums = partitions.get(number, {}) if number is not None else {}
+            storages.append({
+                "storage": self.converter.create(storage),
+                "report": self._report(*self._split(store, sums), allowed_nomenclature_ids, target)
+            })
+
+        total = osv_parallel.merge(partitions.values())
+        return {
+            "total": self._report(*self._split(store, total), allowed_nomenclature_ids, target),
+            "storages": storages
+        }
+
+    @staticmethod
+    def _split(store: transaction_store, sums: dict) -> tuple:
+        """
+        Разделить суммы osv_parallel на остатки и обороты в виде _opening_objects и _turnover_objects
+        """
+        opening = {}
+        turnover = {}
+        for (n, r), (balance, incoming, outgoing) in sums.items():
+            nomenclature = store.nomenclature_of(n)
+            unit = store.range_of(r)
+            key = (nomenclature.unique_code, unit.unique_code)
+            opening[key] = [nomenclature, unit, balance]
+            turnover[key] = [nomenclature, unit, incoming, outgoing]
+        return opening, turnover
+
+    def _report(self, opening: dict, turnover: dict, allowed_nomenclature_ids: Optional[Set[str]],
+                target=None) -> list:
+        """
+        Сформировать отчёт по остаткам на начало и оборотам (target - единица отчёта, см. _unit_target)
+        """
+        nomenclatures = self.start_service.data.get("nomenclature_model", [])
+        if target is not None:
+            opening, turnover = self._normalize(opening, turnover, target)
 
         # -------------------------------------------------------------------
         # 3) Формируем отчёт
         # -------------------------------------------------------------------
         report = {}
 
-        for t in filtered_transactions:
-            n = t.nomenclature
-            r = t.range
-            key = (n.unique_code, getattr(r, "unique_code", None))
+        for key, (n, r, balance) in opening.items():
+            report[key] = {
+                "start_balance": balance,
+                "nomenclature": self.converter.create(n),
+                "unit": self.converter.create(r) if r else None,
+                "incoming": 0.0,
+                "outgoing": 0.0,
+                "end_balance": 0.0
+            }
 
+        for key, (n, r, incoming, outgoing) in turnover.items():
             if key not in report:
                 report[key] = {
                     "start_balance": 0.0,
@@ -114,13 +537,8 @@ class OSVReportService:
                     "outgoing": 0.0,
                     "end_balance": 0.0
                 }
-
-            qty = t.quantity / (r.value if r and getattr(r, "value", None) else 1)
-
-            if qty > 0:
-                report[key]["incoming"] += qty
-            else:
-                report[key]["outgoing"] += abs(qty)
+            report[key]["incoming"] = incoming
+            report[key]["outgoing"] = outgoing
 
         # -------------------------------------------------------------------
         # Добавляем номенклатуры, по которым не было транзакций (пустые записи)
@@ -132,6 +550,11 @@ class OSVReportService:
                 continue
 
             n_range = getattr(n, "range", None)
+            if target is not None and n_range is not None:
+                try:
+                    n_range = target(n, n_range)
+                except operation_exception as e:
+                    raise HTTPException(status_code=400, detail=str(e))
             key = (n.unique_code, getattr(n_range, "unique_code", None))
 
             if key not in report:
@@ -0,0 +1,117 @@
+from datetime import datetime
+from threading import Lock
+from Src.Core.validator import validator, argument_exception
+from Src.Logics.transaction_store import transaction_store
+from Src.reposity import reposity
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+"""
+Векторизованный расчет остатков и оборотов ОСВ на NumPy.
+Колонки transaction_store копируются в массивы NumPy один раз на версию транзакций и справочников.
+Расчет: маска по датам, складу и номенклатурам -> код ключа (номенклатура * M + единица,
+M - число номеров единиц в репозитории) ->
+np.unique (номер группы) -> np.bincount с весами для прихода, расхода и остатка.
+bincount складывает значения в порядке строк, поэтому суммы совпадают с проходом по колонкам.
+NumPy - необязательная зависимость: без нее available() возвращает False.
+"""
+class osv_vectorized:
+    # Снимок колонок: (id хранилища, версии коллекций) -> колонки
+    __snapshot_key = None
+    __snapshot = None
+    __lock = Lock()
+
+    def __init__(self, repo: reposity):
+        validator.validate(repo, reposity)
+        if not osv_vectorized.available():
+            raise argument_exception("Для векторизованного расчета нужен пакет numpy")
+        self.__repo = repo
+        self.__store = repo.attached(transaction_store)
+        if self.__store is None:
+            raise argument_exception("Колоночное хранилище транзакций не подключено")
+
+    """
+    NumPy установлен
+    """
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    """
+    Обороты за [dt_start, dt_finish): {(номенклатура, единица): [приход, расход]}
+    (плотные номера репозитория, значения пересчитаны через коэффициент единицы)
+    """
+    def turnover(self, dt_start: datetime, dt_finish: datetime, storage_number: int = None,
+                 allowed_numbers: set = None) -> dict:
+        validator.validate(dt_start, datetime)
+        validator.validate(dt_finish, datetime)
+        columns = self.__columns()
+        dates = columns["dates"]
+        mask = (dates >= transaction_store.to_epoch(dt_start)) & (dates < transaction_store.to_epoch(dt_finish))
+        keys, groups, values = self.__grouped(columns, mask, storage_number, allowed_numbers)
+
+        incoming = np.bincount(groups, weights=np.where(values > 0, values, 0.0), minlength=len(keys))
+        outgoing = np.bincount(groups, weights=np.where(values > 0, 0.0, -values), minlength=len(keys))
+        return {key: [float(x), float(y)] for key, x, y in zip(self.__decode(keys, columns), incoming, outgoing)}
+
+    """
+    Остатки на начало dt_start (все движения до этой даты): {(номенклатура, единица): остаток}
+    """
+    def opening(self, dt_start: datetime, storage_number: int = None, allowed_numbers: set = None) -> dict:
+        validator.validate(dt_start, datetime)
+        columns = self.__columns()
+        mask = columns["dates"] < transaction_store.to_epoch(dt_start)
+        keys, groups, values = self.__grouped(columns, mask, storage_number, allowed_numbers)
+
+        balance = np.bincount(groups, weights=values, minlength=len(keys))
+        return {key: float(x) for key, x in zip(self.__decode(keys, columns), balance)}
+
+    # Строки по маске, сгруппированные по ключу: (коды ключей, номер группы строки, количество в единицах)
+    def __grouped(self, columns: dict, mask, storage_number: int, allowed_numbers: set) -> tuple:
+        if storage_number is not None:
+            mask &= columns["storages"] == storage_number
+        if allowed_numbers is not None:
+            mask &= np.isin(columns["nomenclatures"], np.fromiter(allowed_numbers, dtype=np.int64))
+
+        ranges = columns["ranges"][mask]
+        codes = columns["nomenclatures"][mask] * columns["size"] + ranges
+        values = columns["quantities"][mask] / columns["factors"][ranges]
+        keys, groups = np.unique(codes, return_inverse=True)
+        return keys, groups, values
+
+    # Коды ключей -> (номенклатура, единица)
+    @staticmethod
+    def __decode(keys, columns: dict) -> list:
+        size = columns["size"]
+        return [(int(code) // size, int(code) % size) for code in keys]
+
+    # Колонки NumPy текущей версии данных
+    def __columns(self) -> dict:
+        key = (id(self.__store), self.__repo.versions(reposity.dependencies(reposity.transaction_key())))
+        with osv_vectorized.__lock:
+            if osv_vectorized.__snapshot_key == key:
+                return osv_vectorized.__snapshot
+
+            store = self.__store
+            columns = {
+                "dates": np.array(store.dates, dtype=np.int64),
+                "quantities": np.array(store.quantities, dtype=np.float64),
+                "storages": np.array(store.storages, dtype=np.int64),
+                "nomenclatures": np.array(store.nomenclatures, dtype=np.int64),
+                "ranges": np.array(store.ranges, dtype=np.int64),
+            }
+            # Номер единицы - смещение в массиве коэффициентов
+            size = max(self.__repo.capacity(reposity.range_key()), 1)
+            factors = np.ones(size, dtype=np.float64)
+            for r in range(size):
+                unit = store.range_of(r)
+                factors[r] = unit.value if unit and getattr(unit, "value", None) else 1
+            columns["size"] = size
+            columns["factors"] = factors
+
+            osv_vectorized.__snapshot_key = key
+            osv_vectorized.__snapshot = columns
+            return columns
@@ -1,6 +1,5 @@
 from Src.Core.abstract_convertor import abstract_convertor
 from Src.Core.validator import argument_exception
-from Src.Core.common import common
 
 
 class reference_converter(abstract_convertor):
@@ -14,16 +13,22 @@ class reference_converter(abstract_convertor):
         if value is None:
             raise argument_exception("Передано пустое значение")
 
-        fields = common.get_fields(value)
-        if not fields:
+        # План полей кэшируется фабрикой по классу объекта
+        plan = self.factory.plan(value)
+        if not plan:
             raise argument_exception("Объект не имеет атрибутов для конвертации")
 
         result = {}
-        for field in fields:
-            temp = getattr(value, field, None)
+        for field, getter in plan:
+            try:
+                temp = getter(value)
+            except AttributeError:
+                continue
             if temp is None or isinstance(temp, (int, float, str, bool)):
                 result[field] = temp
                 continue
+            if callable(temp):
+                continue
             result[field] = self.factory.create(temp)
 
         return result
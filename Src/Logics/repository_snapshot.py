@@ -0,0 +1,203 @@
+import json
+import os
+import struct
+import sys
+from array import array
+from Src.Core.validator import validator, operation_exception
+from Src.Logics.transaction_store import transaction_store
+from Src.Models.range_model import range_model
+from Src.Models.group_model import group_model
+from Src.Models.nomenclature_model import nomenclature_model
+from Src.Models.storage_model import storage_model
+from Src.Models.transaction_model import transaction_model
+from Src.Models.receipt_model import receipt_model
+from Src.Models.receipt_item_model import receipt_item_model
+
+"""
+Бинарный снимок репозитория для быстрого старта.
+
+Формат:
+  заголовок  - сигнатура, версия формата, порядок байт, время изменения и размер исходного файла
+  справочник - Json: таблица кодов и справочные модели, ссылки записаны номерами в таблице кодов
+               (в том числе состав рецептов: номенклатура, единица, количество)
+  транзакции - количество строк и колонки array (дата, количество, склад, номенклатура, единица)
+               в машинном представлении, затем коды транзакций одной строкой
+
+Колонки читаются через array.frombytes без разбора.
+Снимок считается устаревшим, если не совпадает версия, порядок байт или исходный файл изменился.
+"""
+class repository_snapshot:
+    # Версия формата. Увеличивается при любом изменении структуры файла
+    version = 2
+
+    __signature = b"RSNP"
+    __header = struct.Struct("<4sHBdq")
+    __length = struct.Struct("<q")
+
+    def __init__(self, file_name: str):
+        validator.validate(file_name, str)
+        self.__file_name = os.path.abspath(file_name)
+
+    @property
+    def file_name(self) -> str:
+        return self.__file_name
+
+    """
+    Снимок существует и построен из текущей версии исходного файла
+    """
+    def is_actual(self, source_file: str) -> bool:
+        validator.validate(source_file, str)
+        if not os.path.exists(self.__file_name) or not os.path.exists(source_file):
+            return False
+
+        try:
+            with open(self.__file_name, "rb") as file_instance:
+                header = self.__read_header(file_instance)
+        except (OSError, struct.error):
+            return False
+
+        signature, version, byteorder, mtime, size = header
+        return (signature == self.__signature and version == self.version
+                and byteorder == self.__byteorder()
+                and mtime == os.path.getmtime(source_file) and size == os.path.getsize(source_file))
+
+    """
+    Записать снимок репозитория. Пишется во временный файл, затем заменяет старый
+    """
+    def write(self, repo, source_file: str):
+        validator.validate(source_file, str)
+        data = repo.data
+
+        codes = []
+        numbers = {}
+
+        def number(item) -> int:
+            if item is None:
+                return -1
+            return numbers[id(item)]
+
+        def intern(item):
+            numbers[id(item)] = len(codes)
+            codes.append(item.unique_code)
+
+        for key in ("range_model", "group_model", "nomenclature_model", "storage_model"):
+            for item in data.get(key, []):
+                intern(item)
+
+        reference = {
+            "codes": codes,
+            "ranges": [[number(x), x.name, x.value, number(x.base)] for x in data.get("range_model", [])],
+            "groups": [[number(x), x.name] for x in data.get("group_model", [])],
+            "nomenclatures": [[number(x), x.name, number(x.group), number(x.range)]
+                              for x in data.get("nomenclature_model", [])],
+            "storages": [[number(x), x.name, x.address] for x in data.get("storage_model", [])],
+            "receipts": [[x.unique_code, x.name, x.cooking_time, x.portions, list(x.steps),
+                          [[number(c.nomenclature), number(c.range), c.value] for c in x.composition]]
+                         for x in data.get("receipt_model", [])],
+        }
+
+        transactions = data.get("transaction_model", [])
+        columns = (array("q"), array("d"), array("q"), array("q"), array("q"))
+        for item in transactions:
+            columns[0].append(transaction_store.to_epoch(item.date_tr))
+            columns[1].append(item.quantity)
+            columns[2].append(number(item.storage))
+            columns[3].append(number(item.nomenclature))
+            columns[4].append(number(item.range))
+
+        reference_bytes = json.dumps(reference, ensure_ascii=False).encode("utf-8")
+        codes_bytes = "\n".join(x.unique_code for x in transactions).encode("utf-8")
+
+        temp_name = self.__file_name + ".tmp"
+        with open(temp_name, "wb") as file_instance:
+            file_instance.write(self.__header.pack(self.__signature, self.version, self.__byteorder(),
+                                                   os.path.getmtime(source_file), os.path.getsize(source_file)))
+            file_instance.write(self.__length.pack(len(reference_bytes)))
+            file_instance.write(reference_bytes)
+            file_instance.write(self.__length.pack(len(transactions)))
+            for column in columns:
+                column.tofile(file_instance)
+            file_instance.write(self.__length.pack(len(codes_bytes)))
+            file_instance.write(codes_bytes)
+        os.replace(temp_name, self.__file_name)
+
+    """
+    Загрузить снимок в репозиторий
+    """
+    def read(self, repo) -> bool:
+        try:
+            with open(self.__file_name, "rb") as file_instance:
+                self.__read_header(file_instance)
+                reference = json.loads(file_instance.read(self.__read_length(file_instance)).decode("utf-8"))
+                count = self.__read_length(file_instance)
+                columns = (array("q"), array("d"), array("q"), array("q"), array("q"))
+                for column in columns:
+                    column.fromfile(file_instance, count)
+                codes_bytes = file_instance.read(self.__read_length(file_instance))
+        except (OSError, EOFError, ValueError, struct.error) as e:
+            raise operation_exception(f"Невозможно прочитать снимок {self.__file_name}: {e}")
+
+        models = [None] * len(reference["codes"])
+        codes = reference["codes"]
+
+        def model(number: int):
+            return None if number < 0 else models[number]
+
+        bases = []
+        for number, name, value, base in reference["ranges"]:
+            item = range_model.create(name, value, None)
+            item.unique_code = codes[number]
+            models[number] = item
+            repo.append("range_model", item)
+            if base >= 0:
+                bases.append((item, base))
+        for item, base in bases:
+            item.base = model(base)
+
+        for number, name in reference["groups"]:
+            item = group_model()
+            item.name = name
+            item.unique_code = codes[number]
+            models[number] = item
+            repo.append("group_model", item)
+
+        for number, name, group, unit in reference["nomenclatures"]:
+            item = nomenclature_model.create(name, model(group), model(unit))
+            item.unique_code = codes[number]
+            models[number] = item
+            repo.append("nomenclature_model", item)
+
+        for number, name, address in reference["storages"]:
+            item = storage_model.create(name, address)
+            item.unique_code = codes[number]
+            models[number] = item
+            repo.append("storage_model", item)
+
+        transaction_codes = codes_bytes.decode("utf-8").split("\n") if count > 0 else []
+        dates, quantities, storages, nomenclatures, ranges = columns
+        for row in range(count):
+            item = transaction_model.create(models[storages[row]], models[nomenclatures[row]], quantities[row],
+                                            models[ranges[row]], transaction_store.from_epoch(dates[row]))
+            item.unique_code = transaction_codes[row]
+            repo.append("transaction_model", item)
+
+        for code, name, cooking_time, portions, steps, composition in reference["receipts"]:
+            item = receipt_model.create(name, cooking_time, portions)
+            item.unique_code = code
+            item.steps.extend(steps)
+            for nomenclature, unit, value in composition:
+                item.composition.append(receipt_item_model.create(model(nomenclature), model(unit), value))
+            repo.append("receipt_model", item)
+
+        return True
+
+    # Порядок байт машины: 0 - little, 1 - big
+    @staticmethod
+    def __byteorder() -> int:
+        return 0 if sys.byteorder == "little" else 1
+
+    def __read_header(self, file_instance) -> tuple:
+        return self.__header.unpack(file_instance.read(self.__header.size))
+
+    def __read_length(self, file_instance) -> int:
+        return self.__length.unpack(file_instance.read(self.__length.size))[0]
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from threading import Lock
+from Src.Core.validator import validator, argument_exception
+
+"""
+Кеш готовых ответов эндпоинтов чтения с вытеснением давно не используемых (LRU).
+Ключ - кортеж (эндпоинт, тип данных, формат, нормализованные параметры, версии коллекций репозитория),
+значение - тело ответа в байтах. Версии коллекций только растут, поэтому после изменения данных
+старые записи больше не находятся и со временем вытесняются.
+Ограничения: число записей и суммарный размер тел ответов. Ответ больше max_bytes не кешируется.
+"""
+class response_cache:
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+        self.__size = 0
+        self.__max_entries = 0
+        self.__max_bytes = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.reset_stats()
+
+    """
+    Максимальное число записей
+    """
+    @property
+    def max_entries(self) -> int:
+        return self.__max_entries
+
+    @max_entries.setter
+    def max_entries(self, value: int):
+        validator.validate(value, int)
+        if value < 0:
+            raise argument_exception("Число записей кеша не может быть отрицательным")
+        with self.__lock:
+            self.__max_entries = value
+            self.__evict()
+
+    """
+    Максимальный суммарный размер ответов (байт)
+    """
+    @property
+    def max_bytes(self) -> int:
+        return self.__max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        validator.validate(value, int)
+        if value < 0:
+            raise argument_exception("Размер кеша не может быть отрицательным")
+        with self.__lock:
+            self.__max_bytes = value
+            self.__evict()
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    """
+    Получить ответ по ключу (или None). Найденная запись становится самой свежей
+    """
+    def get(self, key: tuple):
+        with self.__lock:
+            value = self.__entries.get(key)
+            if value is None:
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return value
+
+    """
+    Сохранить ответ. Лишние записи вытесняются начиная с самых старых
+    """
+    def put(self, key: tuple, value: bytes):
+        validator.validate(value, bytes)
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__size -= len(old)
+            if len(value) > self.__max_bytes or self.__max_entries == 0:
+                return
+            self.__entries[key] = value
+            self.__size += len(value)
+            self.__evict()
+
+    """
+    Очистить кеш
+    """
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__size = 0
+
+    """
+    Сбросить счетчики попаданий и промахов
+    """
+    def reset_stats(self):
+        self.__hits = 0
+        self.__misses = 0
+
+    """
+    Состояние кеша для мониторинга
+    """
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.__entries),
+            "bytes": self.__size,
+            "max_entries": self.__max_entries,
+            "max_bytes": self.__max_bytes,
+            "hits": self.__hits,
+            "misses": self.__misses,
+        }
+
+    # Вытеснить самые старые записи сверх ограничений
+    def __evict(self):
+        while self.__entries and (len(self.__entries) > self.__max_entries or self.__size > self.__max_bytes):
+            _, value = self.__entries.popitem(last=False)
+            self.__size -= len(value)
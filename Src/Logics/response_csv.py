@@ -18,8 +18,14 @@ class response_csv(abstract_response):
         return str(value)
 
     def build(self, format: str, data: list):
+        return "".join(self.stream(format, data))
+
+    def stream(self, format: str, data: list):
+        """
+        Генератор строк CSV: заголовок, затем по строке на объект
+        """
         if not data:
-            return ""
+            return
 
         conv = factory_convertor()
 
@@ -40,21 +46,20 @@ class response_csv(abstract_response):
         first_prim = primitiveize(conv.create(data[0]))
         if not isinstance(first_prim, dict):
             # если элемент — не dict, представим как одна колонку "value"
-            header = "value\n"
-            rows = ""
-            for obj in data:
+            yield "value\n"
+            yield f"{self._to_cell(first_prim)}\n"
+            for obj in data[1:]:
                 prim = primitiveize(conv.create(obj))
-                rows += f"{self._to_cell(prim)}\n"
-            return header + rows
+                yield f"{self._to_cell(prim)}\n"
+            return
 
         fields = list(first_prim.keys())
-        header = ";".join(fields) + "\n"
+        yield ";".join(fields) + "\n"
 
-        rows = ""
-        for obj in data:
-            prim = primitiveize(conv.create(obj))
+        prim = first_prim
+        for index in range(len(data)):
+            if index > 0:
+                prim = primitiveize(conv.create(data[index]))
             # если структура у следующего элемента отличается — приводим к пустым полям
             cells = [self._to_cell(prim.get(f)) for f in fields]
-            rows += ";".join(cells) + "\n"
-
-        return header + rows
+            yield ";".join(cells) + "\n"
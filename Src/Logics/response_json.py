@@ -1,3 +1,4 @@
+import json
 from Src.Core.abstract_response import abstract_response
 from Src.Logics.factory_convertor import factory_convertor
 
@@ -24,3 +25,12 @@ class response_json(abstract_response):
         #         return str(value)
 
         return [conv.create(x) for x in data]
+
+    # Json массив по частям: каждый объект сериализуется отдельно
+    def stream(self, format: str, data: list):
+        conv = factory_convertor()
+        yield "["
+        for index, item in enumerate(data):
+            prefix = "," if index > 0 else ""
+            yield prefix + json.dumps(conv.create(item), ensure_ascii=False, default=str)
+        yield "]"
@@ -14,8 +14,14 @@ class response_markdown(abstract_response):
         return str(value)
 
     def build(self, format: str, data: list) -> str:
+        return "".join(self.stream(format, data))
+
+    def stream(self, format: str, data: list):
+        """
+        Генератор строк таблицы Markdown: заголовок, разделитель, затем по строке на объект
+        """
         if not data:
-            return ""
+            return
 
         conv = factory_convertor()
 
@@ -36,21 +42,20 @@ class response_markdown(abstract_response):
 
         if not isinstance(first_prim, dict):
             # одиночная колонка
-            header = "| value |\n| --- |\n"
-            rows = ""
-            for obj in data:
+            yield "| value |\n| --- |\n"
+            yield f"| {self._to_cell(first_prim)} |\n"
+            for obj in data[1:]:
                 prim = primitiveize(conv.create(obj))
-                rows += f"| {self._to_cell(prim)} |\n"
-            return header + rows
+                yield f"| {self._to_cell(prim)} |\n"
+            return
 
         fields = list(first_prim.keys())
-        header = "| " + " | ".join(fields) + " |\n"
-        separator = "| " + " | ".join(["---"] * len(fields)) + " |\n"
+        yield "| " + " | ".join(fields) + " |\n"
+        yield "| " + " | ".join(["---"] * len(fields)) + " |\n"
 
-        rows = ""
-        for obj in data:
-            prim = primitiveize(conv.create(obj))
+        prim = first_prim
+        for index in range(len(data)):
+            if index > 0:
+                prim = primitiveize(conv.create(data[index]))
             row_cells = [self._to_cell(prim.get(f)) for f in fields]
-            rows += "| " + " | ".join(row_cells) + " |\n"
-
-        return header + separator + rows
+            yield "| " + " | ".join(row_cells) + " |\n"
@@ -9,21 +9,25 @@ class response_xml(abstract_response):
         if isinstance(value, (str, int, float, bool)):
             return f"{indent}<{tag}>{escape(str(value))}</{tag}>\n"
         if isinstance(value, (list, tuple)):
-            text = ""
-            for v in value:
-                text += self._to_xml_fragment(tag, v, indent)
-            return text
+            return "".join(self._to_xml_fragment(tag, v, indent) for v in value)
         if isinstance(value, dict):
-            text = f"{indent}<{tag}>\n"
+            parts = [f"{indent}<{tag}>\n"]
             for k, v in value.items():
-                text += self._to_xml_fragment(k, v, indent + "  ")
-            text += f"{indent}</{tag}>\n"
-            return text
+                parts.append(self._to_xml_fragment(k, v, indent + "  "))
+            parts.append(f"{indent}</{tag}>\n")
+            return "".join(parts)
         return f"{indent}<{tag}>{escape(str(value))}</{tag}>\n"
 
     def build(self, format: str, data: list) -> str:
+        return "".join(self.stream(format, data))
+
+    def stream(self, format: str, data: list):
+        """
+        Генератор фрагментов XML: открывающий тег, по элементу <item> на объект, закрывающий тег
+        """
         if not data:
-            return "<items></items>"
+            yield "<items></items>"
+            return
 
         conv = factory_convertor()
 
@@ -40,15 +44,15 @@ class response_xml(abstract_response):
             except Exception:
                 return str(value)
 
-        text = "<items>\n"
+        yield "<items>\n"
         for obj in data:
-            text += "  <item>\n"
+            parts = ["  <item>\n"]
             primitive = primitiveize(conv.create(obj))
             if isinstance(primitive, dict):
                 for key, value in primitive.items():
-                    text += self._to_xml_fragment(key, value, indent="    ")
+                    parts.append(self._to_xml_fragment(key, value, indent="    "))
             else:
-                text += self._to_xml_fragment("value", primitive, indent="    ")
-            text += "  </item>\n"
-        text += "</items>"
-        return text
+                parts.append(self._to_xml_fragment("value", primitive, indent="    "))
+            parts.append("  </item>\n")
+            yield "".join(parts)
+        yield "</items>"
@@ -0,0 +1,192 @@
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from Src.Core.abstract_index import abstract_index
+from Src.Core.validator import validator, argument_exception
+from Src.Core.prototype import prototype
+from Src.Core.filter_type import filter_type
+from Src.Dtos.field_filter_dto import field_filter_dto
+
+"""
+Упорядоченный индекс по нескольким полям коллекции для фильтров GT / GTE / LT / LTE / BETWEEN / IN.
+Для каждого пути и вида значения (datetime, float, строка - см. prototype.comparable) хранится
+список строк (значение, номер, элемент), упорядоченный по значению. Диапазон находится
+двоичным поиском (bisect), поэтому запрос не перебирает коллекцию.
+Новые строки копятся отдельно и сортируются вместе со списком при первом запросе после изменений:
+загрузка большого журнала не платит за вставку в середину списка.
+Номер элемента задает порядок коллекции (при замене элемент сохраняет номер).
+"""
+class sorted_index(abstract_index):
+    __value = itemgetter(0)
+
+    def __init__(self, key: str, paths: tuple):
+        validator.validate(key, str)
+        validator.validate(paths, tuple)
+        for path in paths:
+            validator.validate(path, str)
+        self.__key = key
+        self.__paths = paths
+        self.__readers = {path: prototype.accessor(path) for path in paths}
+        self.clear()
+
+    @property
+    def key(self) -> str:
+        return self.__key
+
+    """
+    Проиндексированные пути
+    """
+    @property
+    def paths(self) -> tuple:
+        return self.__paths
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    """
+    Фильтр может быть выполнен индексом
+    """
+    def supports(self, ff: field_filter_dto) -> bool:
+        return ff.field_name in self.__columns and ff.type in self.__ranges
+
+    """
+    Число элементов, удовлетворяющих фильтру (только двоичный поиск)
+    """
+    def count(self, ff: field_filter_dto) -> int:
+        return sum(hi - lo for _, lo, hi in self.__spans(ff))
+
+    """
+    Элементы, удовлетворяющие фильтру: {id(элемент): номер}
+    """
+    def lookup(self, ff: field_filter_dto) -> dict:
+        result = {}
+        for rows, lo, hi in self.__spans(ff):
+            for _, number, item in rows[lo:hi]:
+                result[id(item)] = number
+        return result
+
+    """
+    Элементы по номерам в порядке коллекции
+    """
+    def items(self, numbers) -> list:
+        return [self.__items[number] for number in sorted(numbers)]
+
+    def append(self, item):
+        self.__add(item, self.__counter)
+        self.__counter += 1
+
+    def remove(self, item):
+        entry = self.__entries.pop(id(item), None)
+        if entry is None:
+            return
+        number, values = entry
+        del self.__items[number]
+        for path, kind, value in values:
+            rows = self.__rows(path, kind)
+            position = bisect_left(rows, value, key=self.__value)
+            while rows[position][1] != number:
+                position += 1
+            del rows[position]
+
+    # Новый элемент занимает место старого в порядке коллекции
+    def replace(self, old, item):
+        entry = self.__entries.get(id(old))
+        if entry is None:
+            self.append(item)
+            return
+        self.remove(old)
+        self.__add(item, entry[0])
+
+    def clear(self):
+        # путь -> вид значения -> упорядоченные строки (значение, номер, элемент)
+        self.__columns = {path: {} for path in self.__paths}
+        # путь -> вид значения -> еще не упорядоченные строки
+        self.__pending = {path: {} for path in self.__paths}
+        # номер -> элемент
+        self.__items = {}
+        # id(элемент) -> (номер, [(путь, вид, значение)])
+        self.__entries = {}
+        self.__counter = 0
+
+    # Тип фильтра -> (включать нижнюю границу, включать верхнюю границу) для диапазонов
+    __ranges = {
+        filter_type.GT: (False, None),
+        filter_type.GTE: (True, None),
+        filter_type.LT: (None, False),
+        filter_type.LTE: (None, True),
+        filter_type.BETWEEN: (True, True),
+        filter_type.IN: (True, True),
+    }
+
+    # Участки упорядоченных строк, удовлетворяющие фильтру: (строки, начало, конец)
+    def __spans(self, ff: field_filter_dto) -> list:
+        validator.validate(ff, field_filter_dto)
+        if not self.supports(ff):
+            raise argument_exception(f"Фильтр {ff.type.value} по {ff.field_name} не поддерживается индексом")
+
+        raw = prototype.bounds(ff)
+        include_low, include_high = self.__ranges[ff.type]
+        result = []
+        for kind in set(self.__columns[ff.field_name]) | set(self.__pending[ff.field_name]):
+            rows = self.__rows(ff.field_name, kind)
+            values = [prototype.coerce(x, kind) for x in raw]
+
+            if ff.type == filter_type.IN:
+                for value in sorted(set(x for x in values if x is not None)):
+                    lo = bisect_left(rows, value, key=self.__value)
+                    hi = bisect_right(rows, value, key=self.__value)
+                    if lo < hi:
+                        result.append((rows, lo, hi))
+                continue
+
+            if any(x is None for x in values):
+                continue
+            low = values[0] if include_low is not None else None
+            high = values[-1] if include_high is not None else None
+
+            lo = 0
+            if low is not None:
+                lo = bisect_left(rows, low, key=self.__value) if include_low \
+                    else bisect_right(rows, low, key=self.__value)
+            hi = len(rows)
+            if high is not None:
+                hi = bisect_right(rows, high, key=self.__value) if include_high \
+                    else bisect_left(rows, high, key=self.__value)
+            if lo < hi:
+                result.append((rows, lo, hi))
+
+        return result
+
+    # Упорядоченные строки пути и вида значения (с досортировкой накопленных)
+    def __rows(self, path: str, kind: type) -> list:
+        rows = self.__columns[path].get(kind)
+        if rows is None:
+            rows = self.__columns[path][kind] = []
+        pending = self.__pending[path].pop(kind, None)
+        if pending:
+            rows.extend(pending)
+            rows.sort(key=self.__value)
+        return rows
+
+    def __add(self, item, number: int):
+        values = []
+        for path, read in self.__readers.items():
+            for value in self.__collect(read(item), set()):
+                kind = type(value)
+                pending = self.__pending[path].get(kind)
+                if pending is None:
+                    pending = self.__pending[path][kind] = []
+                pending.append((value, number, item))
+                values.append((path, kind, value))
+        self.__items[number] = item
+        self.__entries[id(item)] = (number, values)
+
+    # Значения поля для сравнения: список раскрывается поэлементно, None не индексируется
+    def __collect(self, value, result: set) -> set:
+        if value is None:
+            return result
+        if isinstance(value, (list, tuple)):
+            for element in value:
+                self.__collect(element, result)
+            return result
+        result.add(prototype.comparable(value))
+        return result
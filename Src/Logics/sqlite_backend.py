@@ -0,0 +1,273 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+from Src.Core.abstract_backend import abstract_backend
+from Src.Core.validator import validator, operation_exception
+from Src.Logics.transaction_store import transaction_store
+from Src.Models.range_model import range_model
+from Src.Models.group_model import group_model
+from Src.Models.nomenclature_model import nomenclature_model
+from Src.Models.storage_model import storage_model
+from Src.Models.transaction_model import transaction_model
+from Src.Models.receipt_model import receipt_model
+from Src.Models.receipt_item_model import receipt_item_model
+
+"""
+Постоянное хранилище репозитория в SQLite.
+Таблица на каждый ключ репозитория, индексы по unique_code,
+(storage_id, date_tr) и nomenclature_id. Дата транзакции хранится
+в секундах от эпохи (как в transaction_store), чтобы диапазоны шли по индексу.
+Состав рецептов - отдельная таблица receipt_item с ключом (receipt_id, position),
+количество хранится в Json, чтобы сохранить тип значения.
+Версия схемы записывается в PRAGMA user_version: база старой схемы считается неактуальной
+и строится заново из файла настроек.
+"""
+class sqlite_backend(abstract_backend):
+
+    # Схема: ключ репозитория -> (колонки, SQL описание колонок)
+    __tables = {
+        "range_model": (
+            ("unique_code", "name", "value", "base_id"),
+            "unique_code TEXT PRIMARY KEY, name TEXT, value INTEGER, base_id TEXT"),
+        "group_model": (
+            ("unique_code", "name"),
+            "unique_code TEXT PRIMARY KEY, name TEXT"),
+        "nomenclature_model": (
+            ("unique_code", "name", "group_id", "range_id"),
+            "unique_code TEXT PRIMARY KEY, name TEXT, group_id TEXT, range_id TEXT"),
+        "storage_model": (
+            ("unique_code", "name", "address"),
+            "unique_code TEXT PRIMARY KEY, name TEXT, address TEXT"),
+        "transaction_model": (
+            ("unique_code", "storage_id", "nomenclature_id", "range_id", "quantity", "date_tr"),
+            "unique_code TEXT PRIMARY KEY, storage_id TEXT, nomenclature_id TEXT, range_id TEXT, "
+            "quantity REAL, date_tr INTEGER"),
+        "receipt_model": (
+            ("unique_code", "name", "cooking_time", "portions", "steps"),
+            "unique_code TEXT PRIMARY KEY, name TEXT, cooking_time TEXT, portions INTEGER, steps TEXT"),
+    }
+
+    # Дополнительные индексы (unique_code проиндексирован первичным ключом)
+    __indexes = (
+        "CREATE INDEX IF NOT EXISTS ix_transaction_storage_date ON transaction_model (storage_id, date_tr)",
+        "CREATE INDEX IF NOT EXISTS ix_transaction_date ON transaction_model (date_tr)",
+        "CREATE INDEX IF NOT EXISTS ix_transaction_nomenclature ON transaction_model (nomenclature_id)",
+        "CREATE INDEX IF NOT EXISTS ix_nomenclature_group ON nomenclature_model (group_id)",
+    )
+
+    # Версия схемы. Увеличивается при любом изменении таблиц
+    __schema = 1
+
+    # Состав рецептов
+    __items = ("receipt_item",
+               "receipt_id TEXT, position INTEGER, nomenclature_id TEXT, range_id TEXT, value TEXT, "
+               "PRIMARY KEY (receipt_id, position)")
+
+    def __init__(self, file_name: str):
+        validator.validate(file_name, str)
+        self.__file_name = os.path.abspath(file_name)
+        try:
+            self.__connection = sqlite3.connect(self.__file_name, check_same_thread=False)
+        except sqlite3.Error as e:
+            raise operation_exception(f"Невозможно открыть базу {self.__file_name}: {e}")
+
+        cursor = self.__connection.cursor()
+        for key, (_, columns) in self.__tables.items():
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {key} ({columns})")
+        for sql in self.__indexes:
+            cursor.execute(sql)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.__items[0]} ({self.__items[1]})")
+        cursor.execute("CREATE TABLE IF NOT EXISTS source (file_name TEXT PRIMARY KEY, mtime REAL)")
+        self.__connection.commit()
+
+    @property
+    def file_name(self) -> str:
+        return self.__file_name
+
+    def save(self, key: str, item):
+        if key not in self.__tables:
+            return
+        columns = self.__tables[key][0]
+        marks = ", ".join("?" * len(columns))
+        self.__connection.execute(
+            f"INSERT OR REPLACE INTO {key} ({', '.join(columns)}) VALUES ({marks})",
+            self.__row(key, item))
+        if key == "receipt_model":
+            self.__save_composition(item)
+
+    def save_many(self, key: str, items: list):
+        if key not in self.__tables:
+            return
+        columns = self.__tables[key][0]
+        marks = ", ".join("?" * len(columns))
+        self.__connection.executemany(
+            f"INSERT OR REPLACE INTO {key} ({', '.join(columns)}) VALUES ({marks})",
+            [self.__row(key, item) for item in items])
+        if key == "receipt_model":
+            for item in items:
+                self.__save_composition(item)
+
+    def delete(self, key: str, item):
+        if key not in self.__tables:
+            return
+        self.__connection.execute(f"DELETE FROM {key} WHERE unique_code = ?", (item.unique_code,))
+        if key == "receipt_model":
+            self.__connection.execute(f"DELETE FROM {self.__items[0]} WHERE receipt_id = ?", (item.unique_code,))
+
+    def clear(self):
+        for key in self.__tables:
+            self.__connection.execute(f"DELETE FROM {key}")
+        self.__connection.execute(f"DELETE FROM {self.__items[0]}")
+        self.__connection.execute("DELETE FROM source")
+        self.__connection.commit()
+
+    def commit(self):
+        self.__connection.commit()
+
+    def close(self):
+        self.__connection.close()
+
+    """
+    Запомнить файл, из которого получены данные
+    """
+    def mark(self, source_file: str):
+        validator.validate(source_file, str)
+        self.__connection.execute("INSERT OR REPLACE INTO source (file_name, mtime) VALUES (?, ?)",
+                                  (source_file, os.path.getmtime(source_file)))
+        self.__connection.execute(f"PRAGMA user_version = {self.__schema}")
+        self.__connection.commit()
+
+    """
+    Данные базы получены из текущей версии файла
+    """
+    def is_actual(self, source_file: str) -> bool:
+        validator.validate(source_file, str)
+        row = self.__connection.execute("SELECT mtime FROM source WHERE file_name = ?",
+                                        (source_file,)).fetchone()
+        schema = self.__connection.execute("PRAGMA user_version").fetchone()[0]
+        return (row is not None and schema == self.__schema and os.path.exists(source_file)
+                and row[0] == os.path.getmtime(source_file))
+
+    """
+    Загрузить данные в репозиторий. Ссылки восстанавливаются через индекс репозитория
+    """
+    def load(self, repo) -> bool:
+        count = self.__connection.execute("SELECT COUNT(*) FROM range_model").fetchone()[0]
+        if count == 0:
+            return False
+
+        # Единицы измерения: сначала все, затем ссылки на базовые
+        bases = []
+        for code, name, value, base_id in self.__select("range_model"):
+            item = range_model.create(name, value, None)
+            item.unique_code = code
+            repo.append("range_model", item)
+            if base_id:
+                bases.append((item, base_id))
+        for item, base_id in bases:
+            item.base = repo.find(base_id)
+
+        for code, name in self.__select("group_model"):
+            item = group_model()
+            item.name = name
+            item.unique_code = code
+            repo.append("group_model", item)
+
+        for code, name, group_id, range_id in self.__select("nomenclature_model"):
+            item = nomenclature_model.create(name, repo.find(group_id), repo.find(range_id))
+            item.unique_code = code
+            repo.append("nomenclature_model", item)
+
+        for code, name, address in self.__select("storage_model"):
+            item = storage_model.create(name, address)
+            item.unique_code = code
+            repo.append("storage_model", item)
+
+        for code, storage_id, nomenclature_id, range_id, quantity, date_tr in self.__select("transaction_model"):
+            item = transaction_model.create(repo.find(storage_id), repo.find(nomenclature_id), quantity,
+                                            repo.find(range_id), transaction_store.from_epoch(date_tr))
+            item.unique_code = code
+            repo.append("transaction_model", item)
+
+        compositions = {}
+        for receipt_id, nomenclature_id, range_id, value in self.__connection.execute(
+                f"SELECT receipt_id, nomenclature_id, range_id, value FROM {self.__items[0]} "
+                f"ORDER BY receipt_id, position"):
+            compositions.setdefault(receipt_id, []).append(
+                receipt_item_model.create(repo.find(nomenclature_id), repo.find(range_id), json.loads(value)))
+
+        for code, name, cooking_time, portions, steps in self.__select("receipt_model"):
+            item = receipt_model.create(name, cooking_time, portions)
+            item.unique_code = code
+            item.steps.extend(json.loads(steps))
+            item.composition.extend(compositions.get(code, []))
+            repo.append("receipt_model", item)
+
+        return True
+
+    """
+    Обороты за [date_start, date_finish) с фильтром по складу на стороне SQL.
+    Результат: (код номенклатуры, код единицы) -> (приход, расход) в единицах транзакции
+    """
+    def turnover(self, date_start: datetime, date_finish: datetime, storage_id: str = None) -> dict:
+        sql = ("SELECT nomenclature_id, range_id, "
+               "SUM(CASE WHEN quantity > 0 THEN quantity ELSE 0 END), "
+               "SUM(CASE WHEN quantity > 0 THEN 0 ELSE -quantity END) "
+               "FROM transaction_model WHERE date_tr >= ? AND date_tr < ?")
+        args = [transaction_store.to_epoch(date_start), transaction_store.to_epoch(date_finish)]
+        if storage_id:
+            sql += " AND storage_id = ?"
+            args.append(storage_id)
+        sql += " GROUP BY nomenclature_id, range_id"
+
+        return {(n, r): (incoming, outgoing) for n, r, incoming, outgoing in self.__connection.execute(sql, args)}
+
+    """
+    Остатки на начало даты (все движения до date_start) с фильтром по складу на стороне SQL.
+    Результат: (код номенклатуры, код единицы) -> остаток в единицах транзакции
+    """
+    def balance(self, date_start: datetime, storage_id: str = None) -> dict:
+        sql = "SELECT nomenclature_id, range_id, SUM(quantity) FROM transaction_model WHERE date_tr < ?"
+        args = [transaction_store.to_epoch(date_start)]
+        if storage_id:
+            sql += " AND storage_id = ?"
+            args.append(storage_id)
+        sql += " GROUP BY nomenclature_id, range_id"
+
+        return {(n, r): value for n, r, value in self.__connection.execute(sql, args)}
+
+    # Переписать состав рецепта
+    def __save_composition(self, item):
+        receipt_id = item.unique_code
+        self.__connection.execute(f"DELETE FROM {self.__items[0]} WHERE receipt_id = ?", (receipt_id,))
+        self.__connection.executemany(
+            f"INSERT INTO {self.__items[0]} (receipt_id, position, nomenclature_id, range_id, value) "
+            f"VALUES (?, ?, ?, ?, ?)",
+            [(receipt_id, position, getattr(x.nomenclature, "unique_code", None),
+              getattr(x.range, "unique_code", None), json.dumps(x.value, ensure_ascii=False))
+             for position, x in enumerate(item.composition)])
+
+    # Все строки таблицы в порядке добавления
+    def __select(self, key: str):
+        columns = self.__tables[key][0]
+        return self.__connection.execute(f"SELECT {', '.join(columns)} FROM {key} ORDER BY rowid")
+
+    # Строка таблицы для модели
+    def __row(self, key: str, item) -> tuple:
+        if key == "range_model":
+            return (item.unique_code, item.name, item.value, getattr(item.base, "unique_code", None))
+        if key == "group_model":
+            return (item.unique_code, item.name)
+        if key == "nomenclature_model":
+            return (item.unique_code, item.name, getattr(item.group, "unique_code", None),
+                    getattr(item.range, "unique_code", None))
+        if key == "storage_model":
+            return (item.unique_code, item.name, item.address)
+        if key == "transaction_model":
+            return (item.unique_code, item.storage.unique_code, item.nomenclature.unique_code,
+                    item.range.unique_code, item.quantity, transaction_store.to_epoch(item.date_tr))
+        if key == "receipt_model":
+            return (item.unique_code, item.name, item.cooking_time, item.portions,
+                    json.dumps(list(item.steps), ensure_ascii=False))
+        raise operation_exception(f"Нет схемы для {key}")
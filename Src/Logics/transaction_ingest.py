@@ -0,0 +1,116 @@
+import json
+from Src.Core.validator import validator, argument_exception
+from Src.Dtos.transaction_dto import transaction_dto
+from Src.Models.transaction_model import transaction_model
+from Src.reposity import reposity
+
+"""
+Пакетная загрузка транзакций.
+Тело запроса - Json массив записей или NDJSON (одна запись в строке), формат записи - как
+в массиве transaction файла настроек (см. transaction_dto).
+Все записи пачки проверяются за один проход: ссылки ищутся в индексах коллекций
+складов, номенклатуры и единиц по коду, повторные коды отклоняются. Если есть хотя бы одна ошибка,
+в репозиторий не попадает ни одна запись. Иначе пачка добавляется одним вызовом reposity.extend:
+колонки, агрегаты и индексы транзакций обновляются один раз на пачку.
+"""
+class transaction_ingest:
+
+    # Максимальное число ошибок в ответе
+    __max_errors = 100
+
+    def __init__(self, repo: reposity):
+        validator.validate(repo, reposity)
+        self.__repo = repo
+
+    """
+    Разобрать тело запроса: Json массив или NDJSON
+    """
+    @staticmethod
+    def parse(body: bytes) -> list:
+        validator.validate(body, bytes)
+        text = body.decode("utf-8").strip()
+        if len(text) == 0:
+            return []
+
+        try:
+            if text.startswith("["):
+                records = json.loads(text)
+            else:
+                records = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise argument_exception(f"Ошибка разбора записей транзакций: {e}")
+
+        if not isinstance(records, list):
+            raise argument_exception("Ожидается массив записей транзакций")
+        return records
+
+    """
+    Проверить и добавить пачку записей.
+    Результат: {"accepted": число добавленных, "errors": [{"row": номер записи, "detail": текст}]}
+    """
+    def ingest(self, records: list) -> dict:
+        items, errors = self.prepare(records)
+        if errors:
+            return {"accepted": 0, "errors": errors}
+
+        self.apply(items)
+        return {"accepted": len(items), "errors": []}
+
+    """
+    Проверить пачку записей без изменения репозитория: (модели транзакций, ошибки).
+    Ошибок в результате не больше max_errors
+    """
+    def prepare(self, records: list) -> tuple:
+        validator.validate(records, list)
+        items, errors = self.__convert(records)
+        return items, errors[:self.__max_errors]
+
+    """
+    Добавить проверенную пачку в репозиторий одним вызовом
+    """
+    def apply(self, items: list):
+        validator.validate(items, list)
+        self.__repo.extend(reposity.transaction_key(), items)
+        self.__repo.commit()
+
+    # Записи -> модели транзакций и список ошибок
+    def __convert(self, records: list) -> tuple:
+        repo = self.__repo
+        storage_key = reposity.storage_key()
+        nomenclature_key = reposity.nomenclature_key()
+        range_key = reposity.range_key()
+        transaction_key = reposity.transaction_key()
+
+        items = []
+        errors = []
+        codes = set()
+        for row, record in enumerate(records):
+            try:
+                if not isinstance(record, dict):
+                    raise argument_exception("Запись должна быть объектом")
+
+                dto = transaction_dto().create(record)
+                if dto.date_tr is None:
+                    raise argument_exception("Не указана дата транзакции")
+                storage = repo.get(storage_key, dto.storage_id)
+                if storage is None:
+                    raise argument_exception(f"Не найден склад с id={dto.storage_id}")
+                nomenclature = repo.get(nomenclature_key, dto.nomenclature_id)
+                if nomenclature is None:
+                    raise argument_exception(f"Не найдена номенклатура с id={dto.nomenclature_id}")
+                unit = repo.get(range_key, dto.range_id)
+                if unit is None:
+                    raise argument_exception(f"Не найдена единица измерения с id={dto.range_id}")
+
+                item = transaction_model.create(storage, nomenclature, dto.quantity, unit, dto.date_tr)
+                if dto.id:
+                    item.unique_code = dto.id
+                code = item.unique_code
+                if code in codes or repo.get(transaction_key, code) is not None:
+                    raise argument_exception(f"Повторный код транзакции {code}")
+                codes.add(code)
+                items.append(item)
+            except Exception as e:
+                errors.append({"row": row, "detail": str(e)})
+
+        return items, errors
@@ -0,0 +1,154 @@
+from array import array
+from datetime import datetime, timedelta
+from Src.Core.abstract_index import abstract_index
+from Src.Core.validator import validator, argument_exception
+from Src.Models.transaction_model import transaction_model
+from Src.reposity import reposity
+
+"""
+Колоночное хранилище транзакций.
+Каждая транзакция - строка в плотных массивах:
+  - date_tr      int64   секунды от 1970-01-01 (без часового пояса)
+  - quantity     float64
+  - storage      int64   плотный номер склада
+  - nomenclature int64   плотный номер номенклатуры
+  - range        int64   плотный номер единицы измерения
+Плотные номера - номера элементов в своих коллекциях репозитория (reposity.number), поэтому
+номер единицы можно сразу использовать как смещение в массиве коэффициентов и т.п.
+Ссылки транзакции должны быть добавлены в репозиторий раньше самой транзакции.
+"""
+class transaction_store(abstract_index):
+    __epoch = datetime(1970, 1, 1)
+
+    # Коллекции, на элементы которых ссылаются колонки (ключ коллекции совпадает с именем класса модели)
+    __references = ("storage_model", "nomenclature_model", "range_model")
+
+    def __init__(self, repo: reposity):
+        validator.validate(repo, reposity)
+        self.__repo = repo
+        self.clear()
+
+    @property
+    def key(self) -> str:
+        return "transaction_model"
+
+    # Колонки
+    @property
+    def dates(self) -> array:
+        return self.__dates
+
+    @property
+    def quantities(self) -> array:
+        return self.__quantities
+
+    @property
+    def storages(self) -> array:
+        return self.__storages
+
+    @property
+    def nomenclatures(self) -> array:
+        return self.__nomenclatures
+
+    @property
+    def ranges(self) -> array:
+        return self.__ranges
+
+    # Количество строк
+    def __len__(self) -> int:
+        return len(self.__dates)
+
+    """
+    Перевести дату в секунды от эпохи
+    """
+    @staticmethod
+    def to_epoch(value: datetime) -> int:
+        validator.validate(value, datetime)
+        return (value - transaction_store.__epoch) // timedelta(seconds=1)
+
+    """
+    Перевести секунды от эпохи в дату
+    """
+    @staticmethod
+    def from_epoch(value: int) -> datetime:
+        return transaction_store.__epoch + timedelta(seconds=value)
+
+    """
+    Плотный номер модели (склада, номенклатуры, единицы) в ее коллекции или None, если модели нет в репозитории
+    """
+    def number_of(self, item) -> int:
+        if item is None:
+            return None
+        key = type(item).__name__
+        if key not in self.__references:
+            return None
+        return self.__repo.number(key, item.unique_code)
+
+    """
+    Склад по плотному номеру
+    """
+    def storage_of(self, number: int):
+        return self.__repo.by_number(reposity.storage_key(), number)
+
+    """
+    Номенклатура по плотному номеру
+    """
+    def nomenclature_of(self, number: int):
+        return self.__repo.by_number(reposity.nomenclature_key(), number)
+
+    """
+    Единица измерения по плотному номеру
+    """
+    def range_of(self, number: int):
+        return self.__repo.by_number(reposity.range_key(), number)
+
+    def append(self, item: transaction_model):
+        validator.validate(item, transaction_model)
+        storage = self.__number(reposity.storage_key(), item.storage)
+        nomenclature = self.__number(reposity.nomenclature_key(), item.nomenclature)
+        unit = self.__number(reposity.range_key(), item.range)
+        self.__dates.append(self.to_epoch(item.date_tr))
+        self.__quantities.append(item.quantity)
+        self.__storages.append(storage)
+        self.__nomenclatures.append(nomenclature)
+        self.__ranges.append(unit)
+        self.__codes.append(item.unique_code)
+
+    # Ссылки всех транзакций пачки проверяются до изменения колонок
+    def extend(self, items: list):
+        for item in items:
+            validator.validate(item, transaction_model)
+        storages = [self.__number(reposity.storage_key(), x.storage) for x in items]
+        nomenclatures = [self.__number(reposity.nomenclature_key(), x.nomenclature) for x in items]
+        units = [self.__number(reposity.range_key(), x.range) for x in items]
+        self.__dates.extend(self.to_epoch(x.date_tr) for x in items)
+        self.__quantities.extend(x.quantity for x in items)
+        self.__storages.extend(storages)
+        self.__nomenclatures.extend(nomenclatures)
+        self.__ranges.extend(units)
+        self.__codes.extend(x.unique_code for x in items)
+
+    def remove(self, item: transaction_model):
+        validator.validate(item, transaction_model)
+        try:
+            row = self.__codes.index(item.unique_code)
+        except ValueError:
+            return
+
+        for column in (self.__dates, self.__quantities, self.__storages,
+                       self.__nomenclatures, self.__ranges, self.__codes):
+            del column[row]
+
+    def clear(self):
+        self.__dates = array("q")
+        self.__quantities = array("d")
+        self.__storages = array("q")
+        self.__nomenclatures = array("q")
+        self.__ranges = array("q")
+        self.__codes = []
+
+    # Плотный номер ссылки транзакции
+    def __number(self, key: str, item) -> int:
+        number = self.__repo.number(key, item.unique_code)
+        if number is None:
+            raise argument_exception(f"Элемент {item.unique_code} не найден в коллекции {key}")
+        return number
@@ -0,0 +1,134 @@
+from Src.Core.abstract_index import abstract_index
+from Src.Core.validator import validator, argument_exception
+from Src.Core.prototype import prototype
+
+"""
+Инвертированный индекс триграмм по текстовому полю коллекции (по умолчанию name).
+Для каждой триграммы нормализованного значения (strip + lower) хранится множество
+порядковых номеров элементов. Поиск подстроки пересекает списки триграмм
+искомой строки, начиная с самого короткого, и проверяет только найденных кандидатов.
+Результат возвращается в порядке добавления элементов в коллекцию.
+"""
+class trigram_index(abstract_index):
+    # Длина n-граммы
+    size = 3
+
+    def __init__(self, key: str, field: str = "name"):
+        validator.validate(key, str)
+        validator.validate(field, str)
+        self.__key = key
+        self.__field = field
+        self.clear()
+
+    @property
+    def key(self) -> str:
+        return self.__key
+
+    """
+    Поле, по которому построен индекс
+    """
+    @property
+    def field(self) -> str:
+        return self.__field
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    """
+    Индекс применим к подстроке: она не короче триграммы
+    """
+    def supports(self, text) -> bool:
+        return text is not None and len(self.normalize(text)) >= self.size
+
+    """
+    Найти элементы, у которых поле содержит подстроку text (без учета регистра)
+    """
+    def search(self, text) -> list:
+        value = self.normalize(text)
+        validator.validate(value, str)
+        if len(value) < self.size:
+            raise argument_exception(f"Подстрока короче {self.size} символов не поддерживается индексом")
+
+        postings = []
+        for gram in self.__grams(value):
+            numbers = self.__postings.get(gram)
+            if not numbers:
+                return []
+            postings.append(numbers)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for numbers in postings[1:]:
+            candidates &= numbers
+            if not candidates:
+                return []
+
+        result = []
+        for number in sorted(candidates):
+            item, text_value = self.__items[number]
+            if value in text_value:
+                result.append(item)
+        return result
+
+    """
+    Оценка числа кандидатов для подстроки: размер самого короткого списка триграмм
+    """
+    def estimate(self, text) -> int:
+        value = self.normalize(text)
+        if len(value) < self.size:
+            return len(self.__items)
+        return min(len(self.__postings.get(gram, ())) for gram in self.__grams(value))
+
+    def append(self, item):
+        self.__add(item, self.__counter)
+        self.__counter += 1
+
+    def remove(self, item):
+        number = self.__numbers.pop(id(item), None)
+        if number is None:
+            return
+        _, text_value = self.__items.pop(number)
+        for gram in self.__grams(text_value):
+            numbers = self.__postings.get(gram)
+            if numbers is not None:
+                numbers.discard(number)
+                if not numbers:
+                    del self.__postings[gram]
+
+    # Новый элемент занимает место старого в порядке коллекции
+    def replace(self, old, item):
+        number = self.__numbers.get(id(old))
+        if number is None:
+            self.append(item)
+            return
+        self.remove(old)
+        self.__add(item, number)
+
+    def clear(self):
+        # триграмма -> множество номеров
+        self.__postings = {}
+        # номер -> (элемент, нормализованное значение поля)
+        self.__items = {}
+        # id(элемент) -> номер
+        self.__numbers = {}
+        self.__counter = 0
+
+    # Нормализация значения так же, как при сравнении в prototype
+    @staticmethod
+    def normalize(value) -> str:
+        if value is None:
+            return ""
+        return prototype.normalize(value)
+
+    def __add(self, item, number: int):
+        text_value = self.normalize(getattr(item, self.__field, None))
+        self.__items[number] = (item, text_value)
+        self.__numbers[id(item)] = number
+        for gram in self.__grams(text_value):
+            numbers = self.__postings.get(gram)
+            if numbers is None:
+                numbers = self.__postings[gram] = set()
+            numbers.add(number)
+
+    def __grams(self, value: str) -> set:
+        return {value[i:i + self.size] for i in range(len(value) - self.size + 1)}
@@ -0,0 +1,95 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from Src.Core.abstract_index import abstract_index
+from Src.Core.validator import validator
+from Src.Logics.transaction_store import transaction_store
+from Src.Models.transaction_model import transaction_model
+
+"""
+Обороты по дням. Ключ - (склад, номенклатура, единица) в плотных номерах transaction_store,
+для каждого ключа хранятся дни с движением и суммы прихода / расхода за день
+(уже пересчитанные через коэффициент единицы измерения).
+Отчет за период складывает дневные суммы вместо прохода по транзакциям.
+Подключается к репозиторию после transaction_store.
+"""
+class turnover_aggregates(abstract_index):
+
+    def __init__(self, store: transaction_store):
+        validator.validate(store, transaction_store)
+        self.__store = store
+        self.clear()
+
+    @property
+    def key(self) -> str:
+        return "transaction_model"
+
+    """
+    Обороты за дни [day_start, day_end] включительно.
+    storage - плотный номер склада (None - все склады),
+    nomenclatures - множество плотных номеров номенклатуры (None - все).
+    Результат: (склад, номенклатура, единица) -> [приход, расход]
+    """
+    def turnover(self, day_start: date, day_end: date, storage: int = None, nomenclatures: set = None) -> dict:
+        validator.validate(day_start, date)
+        validator.validate(day_end, date)
+        first = day_start.toordinal()
+        last = day_end.toordinal()
+
+        result = {}
+        for key, days in self.__days.items():
+            if storage is not None and key[0] != storage:
+                continue
+            if nomenclatures is not None and key[1] not in nomenclatures:
+                continue
+
+            lo = bisect_left(days, first)
+            hi = bisect_right(days, last)
+            if lo == hi:
+                continue
+
+            buckets = self.__buckets[key]
+            incoming = 0.0
+            outgoing = 0.0
+            for day in days[lo:hi]:
+                bucket = buckets[day]
+                incoming += bucket[0]
+                outgoing += bucket[1]
+            result[key] = [incoming, outgoing]
+
+        return result
+
+    def append(self, item: transaction_model):
+        self.__apply(item, 1)
+
+    def remove(self, item: transaction_model):
+        self.__apply(item, -1)
+
+    def clear(self):
+        # Ключ -> отсортированный список дней (ordinal)
+        self.__days = {}
+        # Ключ -> {день: [приход, расход]}
+        self.__buckets = {}
+
+    # Учесть транзакцию в дневной сумме (sign = 1 - добавить, -1 - убрать)
+    def __apply(self, item: transaction_model, sign: int):
+        validator.validate(item, transaction_model)
+        store = self.__store
+        key = (store.number_of(item.storage), store.number_of(item.nomenclature), store.number_of(item.range))
+        day = item.date_tr.toordinal()
+        factor = getattr(item.range, "value", None) or 1
+        qty = item.quantity / factor
+
+        buckets = self.__buckets.get(key)
+        if buckets is None:
+            buckets = self.__buckets[key] = {}
+            self.__days[key] = []
+
+        bucket = buckets.get(day)
+        if bucket is None:
+            bucket = buckets[day] = [0.0, 0.0]
+            insort(self.__days[key], day)
+
+        if qty > 0:
+            bucket[0] += sign * qty
+        else:
+            bucket[1] -= sign * qty
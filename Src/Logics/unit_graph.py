@@ -0,0 +1,117 @@
+from Src.Core.abstract_index import abstract_index
+from Src.Core.validator import validator, argument_exception, operation_exception
+from Src.Models.range_model import range_model
+
+"""
+Граф единиц измерения по ссылкам base (киллограмм -> грамм).
+Для каждой единицы вычисляется корневая базовая единица и накопленный коэффициент:
+  коэффициент(корень) = 1, коэффициент(единица) = value * коэффициент(base).
+Цепочка проходится один раз, результат кешируется для всех единиц на пути; циклы
+обнаруживаются при этом же проходе и тоже запоминаются. Кеш сбрасывается при любом изменении
+коллекции единиц (изменение свойств единицы без замены в репозитории не отслеживается).
+Пересчет количества из одной единицы в другую - O(1) по кешу.
+"""
+class unit_graph(abstract_index):
+
+    def __init__(self):
+        self.clear()
+
+    @property
+    def key(self) -> str:
+        return "range_model"
+
+    """
+    Корневая базовая единица и накопленный коэффициент: (корень, коэффициент)
+    """
+    def resolve(self, unit: range_model) -> tuple:
+        validator.validate(unit, range_model)
+        entry = self.__resolved.get(id(unit))
+        if entry is None or entry[0] is not unit:
+            entry = self.__walk(unit)
+        if entry[1] is None:
+            raise operation_exception(f"Цикл в цепочке базовых единиц для {unit.name}")
+        return entry[1], entry[2]
+
+    """
+    Корневая базовая единица
+    """
+    def base(self, unit: range_model) -> range_model:
+        return self.resolve(unit)[0]
+
+    """
+    Накопленный коэффициент пересчета в корневую единицу
+    """
+    def factor(self, unit: range_model) -> int:
+        return self.resolve(unit)[1]
+
+    """
+    Единицы приводятся к одной корневой единице
+    """
+    def compatible(self, unit: range_model, other: range_model) -> bool:
+        return self.base(unit) is self.base(other)
+
+    """
+    Пересчитать количество из единицы unit в единицу target
+    """
+    def convert(self, value: float, unit: range_model, target: range_model) -> float:
+        root, factor = self.resolve(unit)
+        target_root, target_factor = self.resolve(target)
+        if root is not target_root:
+            raise argument_exception(f"Единицы {unit.name} и {target.name} не приводятся друг к другу")
+        if factor == target_factor:
+            return value
+        return value * factor / target_factor
+
+    """
+    Единицы, попавшие в цикл (или ссылающиеся на цикл), среди уже пройденных
+    """
+    @property
+    def cycles(self) -> list:
+        return [entry[0] for entry in self.__resolved.values() if entry[1] is None]
+
+    def append(self, item):
+        self.__resolved.clear()
+
+    def remove(self, item):
+        self.__resolved.clear()
+
+    def replace(self, old, item):
+        self.__resolved.clear()
+
+    def clear(self):
+        # id(единица) -> (единица, корень или None при цикле, коэффициент)
+        self.__resolved = {}
+
+    def rebuild(self, items: list):
+        validator.validate(items, list)
+        self.clear()
+
+    # Пройти цепочку от unit до корня или до уже вычисленной единицы
+    def __walk(self, unit: range_model) -> tuple:
+        path = []
+        visited = set()
+        current = unit
+        while True:
+            entry = self.__resolved.get(id(current))
+            if entry is not None and entry[0] is current:
+                break
+            if id(current) in visited:
+                entry = (current, None, None)
+                break
+            visited.add(id(current))
+            path.append(current)
+            if current.base is None:
+                entry = (current, current, 1)
+                break
+            current = current.base
+
+        root, factor = entry[1], entry[2]
+        for item in reversed(path):
+            if root is None:
+                self.__resolved[id(item)] = (item, None, None)
+            elif item.base is None:
+                self.__resolved[id(item)] = (item, item, 1)
+            else:
+                factor = item.value * factor
+                self.__resolved[id(item)] = (item, root, factor)
+        return self.__resolved[id(unit)]
@@ -5,7 +5,7 @@ from Src.Core.abstract_dto import abstact_dto
 Модель группы номенклатуры
 """
 class group_model(entity_model):
-   
+    __slots__ = ()
 
     """
     Фабричный метод из Dto
@@ -10,8 +10,12 @@ from Src.reposity import reposity
 Модель номенклатуры
 """
 class nomenclature_model(entity_model):
-    __group: group_model = None
-    __range: range_model = None
+    __slots__ = ("__group", "__range")
+
+    def __init__(self):
+        super().__init__()
+        self.__group = None
+        self.__range = None
 
    
     """
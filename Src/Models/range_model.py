@@ -6,8 +6,12 @@ from Src.Dtos.range_dto import range_dto
 Модель единицы измерения
 """
 class range_model(entity_model):
-    __value:int = 1
-    __base:'range_model' = None
+    __slots__ = ("__value", "__base")
+
+    def __init__(self):
+        super().__init__()
+        self.__value = 1
+        self.__base = None
 
     """
     Значение коэффициента пересчета
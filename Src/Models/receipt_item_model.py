@@ -8,12 +8,26 @@ class receipt_item_model(abstact_model):
     __range:range_model
     __value:int
 
+    # Номенклатура
+    @property
+    def nomenclature(self) -> nomenclature_model:
+        return self.__nomenclature
+
+    # Единица измерения
+    @property
+    def range(self) -> range_model:
+        return self.__range
+
+    # Количество
+    @property
+    def value(self):
+        return self.__value
+
     # Фабричный метод
-    def create(nomenclature:nomenclature_model, range:range_model,  value:int):
+    @staticmethod
+    def create(nomenclature:nomenclature_model, range:range_model,  value:int) -> "receipt_item_model":
         item = receipt_item_model()
         item.__nomenclature = nomenclature
         item.__range = range
         item.__value = value
-
-
-    # TODO: Внимание! Тут нужно добавить свойства
\ No newline at end of file
+        return item
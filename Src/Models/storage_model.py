@@ -5,7 +5,7 @@ from Src.Dtos.storage_dto import storage_dto
 Модель склада (Storage)
 """
 class storage_model(entity_model):
-    __address: str = ""
+    __slots__ = ("__address",)
 
     def __init__(self, name: str = "", address: str = ""):
         super().__init__(name)
@@ -7,16 +7,15 @@ from Src.Core.validator import validator
 from datetime import datetime
 
 class transaction_model(entity_model):
+    # Поля задаются при создании (create / from_dto), до этого чтение дает AttributeError
+    __slots__ = ("__storage", "__nomenclature", "__quantity", "__range", "__date_tr")
 
-    __storage: storage_model
-    __nomenclature: nomenclature_model
-    __quantity: float = 0.0
-    __unique_number: int = 0
-    __range: range_model
-    __date_tr: datetime
+    # Коды транзакций не повторяются - интернирование только увеличит таблицу строк
+    _intern_codes = False
 
     def __init__(self):
-        super().__init__()  # только инициализация базового класса
+        super().__init__()
+        self.__quantity = 0.0
 
     @property
     def storage(self) -> storage_model:
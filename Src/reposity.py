@@ -1,4 +1,9 @@
+from bisect import bisect_left, insort
 from Src.Core.common import common
+from Src.Core.validator import validator, argument_exception
+from Src.Core.abstract_model import abstact_model
+from Src.Core.abstract_index import abstract_index
+from Src.Core.abstract_backend import abstract_backend
 
 """
 Репозиторий данных
@@ -8,10 +13,61 @@ from Src.Core.common import common
 class reposity:
     __data = {}
 
+    # Индексы по коллекциям. Ключ - ключ коллекции, значение - словарь unique_code -> модель
+    __indexes = {}
+
+    # Общий индекс по всем коллекциям unique_code -> модель
+    __global_index = {}
+
+    # Подключенные производные структуры (abstract_index)
+    __attached = []
+
+    # Постоянное хранилище (abstract_backend). None - только память
+    __backend = None
+
+    # Версии коллекций. Ключ - ключ коллекции, значение - номер версии (только растет)
+    __versions = {}
+
+    # Плотные номера элементов. Ключ - ключ коллекции, значение - словарь unique_code -> номер
+    __numbers = {}
+
+    # Элементы по плотным номерам. Ключ - ключ коллекции, значение - список (номер -> элемент или None)
+    __numbered = {}
+
+    # Номера удаленных элементов. Ключ - ключ коллекции, значение - упорядоченный список номеров
+    __removed = {}
+
     @property
     def data(self):
         return self.__data
 
+    """
+    Общий индекс unique_code -> модель (только для чтения)
+    """
+    @property
+    def index(self) -> dict:
+        return self.__global_index
+
+    """
+    Постоянное хранилище. Получает каждое изменение коллекций
+    """
+    @property
+    def backend(self) -> abstract_backend:
+        return reposity.__backend
+
+    @backend.setter
+    def backend(self, value: abstract_backend):
+        if value is not None:
+            validator.validate(value, abstract_backend)
+        reposity.__backend = value
+
+    """
+    Зафиксировать изменения в постоянном хранилище
+    """
+    def commit(self):
+        if reposity.__backend is not None:
+            reposity.__backend.commit()
+
     """
     Ключ для единц измерений
     """
@@ -52,6 +108,20 @@ class reposity:
     def transaction_key():
         return "transaction_model"
 
+    """
+    Коллекции, от которых зависит выдача коллекции key: она сама и коллекции,
+    на элементы которых ссылаются ее элементы
+    """
+    @staticmethod
+    def dependencies(key: str) -> tuple:
+        references = {
+            reposity.nomenclature_key(): (reposity.group_key(), reposity.range_key()),
+            reposity.receipt_key(): (reposity.nomenclature_key(), reposity.group_key(), reposity.range_key()),
+            reposity.transaction_key(): (reposity.storage_key(), reposity.nomenclature_key(),
+                                         reposity.group_key(), reposity.range_key()),
+        }
+        return (key,) + references.get(key, ())
+
     """
     Получить список всех ключей
     Источник: https://github.com/Alyona1619
@@ -73,5 +143,222 @@ class reposity:
 
     def initalize(self):
         keys = reposity.keys()
+        self.__global_index.clear()
         for key in keys:
-            self.__data[key] = []
\ No newline at end of file
+            self.__data[key] = []
+            self.__indexes[key] = {}
+            self.__numbers[key] = {}
+            self.__numbered[key] = []
+            self.__removed[key] = []
+            self.__bump(key)
+        for index in self.__attached:
+            index.clear()
+
+    """
+    Плотный номер элемента коллекции по unique_code (или None).
+    Номер выдается при добавлении кода, сохраняется при замене элемента и не выдается повторно
+    после удаления (повторно добавленный код получает новый номер): номера коллекции -
+    0..capacity(key) - 1, их можно использовать как смещения в массивах.
+    Номера растут в порядке коллекции, поэтому по номеру вычисляется позиция элемента в списке
+    """
+    def number(self, key: str, unique_code: str) -> int:
+        if key not in self.__numbers:
+            raise argument_exception(f"Неизвестный ключ коллекции {key}")
+
+        return self.__numbers[key].get(unique_code)
+
+    """
+    Элемент коллекции по плотному номеру (None - элемент удален или номер не выдавался)
+    """
+    def by_number(self, key: str, number: int):
+        if key not in self.__numbered:
+            raise argument_exception(f"Неизвестный ключ коллекции {key}")
+
+        items = self.__numbered[key]
+        return items[number] if 0 <= number < len(items) else None
+
+    """
+    Число выданных номеров коллекции
+    """
+    def capacity(self, key: str) -> int:
+        if key not in self.__numbered:
+            raise argument_exception(f"Неизвестный ключ коллекции {key}")
+
+        return len(self.__numbered[key])
+
+    """
+    Версия коллекции. Увеличивается при каждом изменении коллекции (в том числе при инициализации)
+    и никогда не уменьшается: по ней можно проверить, что данные не менялись
+    """
+    def version(self, key: str) -> int:
+        if key not in self.__data:
+            raise argument_exception(f"Неизвестный ключ коллекции {key}")
+
+        return self.__versions.get(key, 0)
+
+    """
+    Версии коллекций (по умолчанию - всех): кортеж (ключ, версия)
+    """
+    def versions(self, keys=None) -> tuple:
+        keys = reposity.keys() if keys is None else keys
+        return tuple((key, self.version(key)) for key in keys)
+
+    """
+    Подключить производную структуру. Она строится по текущим данным
+    и дальше обновляется при каждом изменении своей коллекции
+    """
+    def attach(self, index: abstract_index) -> abstract_index:
+        validator.validate(index, abstract_index)
+        if index.key not in self.__data:
+            raise argument_exception(f"Неизвестный ключ коллекции {index.key}")
+
+        self.__attached[:] = [x for x in self.__attached
+                              if type(x) is not type(index) or x.key != index.key]
+        self.__attached.append(index)
+        index.rebuild(self.__data[index.key])
+        return index
+
+    """
+    Получить подключенную структуру по типу и, при необходимости, ключу коллекции (или None)
+    """
+    def attached(self, index_type: type, key: str = None):
+        return next((x for x in self.__attached
+                     if isinstance(x, index_type) and (key is None or x.key == key)), None)
+
+    """
+    Добавить элемент в коллекцию с обновлением индексов.
+    Код должен быть новым для коллекции (элемент с тем же кодом заменяется через replace)
+    """
+    def append(self, key: str, item: abstact_model):
+        self.__check(key, item)
+        if item.unique_code in self.__indexes[key]:
+            raise argument_exception(f"Повторный код {item.unique_code} в коллекции {key}")
+        self.__data[key].append(item)
+        self.__index_item(key, item)
+        self.__bump(key)
+        if reposity.__backend is not None:
+            reposity.__backend.save(key, item)
+
+    """
+    Добавить пачку элементов в коллекцию. Все элементы проверяются до изменения коллекции:
+    при ошибке не добавляется ни один. Подключенные структуры и постоянное хранилище получают
+    одно уведомление на пачку, версия коллекции увеличивается один раз
+    """
+    def extend(self, key: str, items: list):
+        validator.validate(items, list)
+        codes = set()
+        for item in items:
+            self.__check(key, item)
+            code = item.unique_code
+            if code in codes or code in self.__indexes[key]:
+                raise argument_exception(f"Повторный код {code} в коллекции {key}")
+            codes.add(code)
+        if len(items) == 0:
+            return
+
+        self.__data[key].extend(items)
+        for item in items:
+            self.__index_item(key, item, notify=False)
+        for index in self.__attached:
+            if index.key == key:
+                index.extend(items)
+        self.__bump(key)
+        if reposity.__backend is not None:
+            reposity.__backend.save_many(key, items)
+
+    """
+    Заменить элемент коллекции с тем же unique_code (элемент остается на своем месте).
+    Если элемента нет - добавить. Позиция в списке находится по плотному номеру
+    """
+    def replace(self, key: str, item: abstact_model):
+        self.__check(key, item)
+        old = self.__indexes[key].get(item.unique_code)
+        if old is None:
+            self.append(key, item)
+            return
+
+        code = item.unique_code
+        number = self.__numbers[key][code]
+        self.__data[key][self.__position(key, number)] = item
+        self.__numbered[key][number] = item
+        self.__indexes[key][code] = item
+        if self.__global_index.get(code, old) is old:
+            self.__global_index[code] = item
+        for index in self.__attached:
+            if index.key == key:
+                index.replace(old, item)
+        self.__bump(key)
+        if reposity.__backend is not None:
+            reposity.__backend.save(key, item)
+
+    """
+    Удалить элемент коллекции по unique_code. Позиция в списке находится по плотному номеру
+    """
+    def remove(self, key: str, unique_code: str) -> bool:
+        validator.validate(unique_code, str)
+        item = self.get(key, unique_code)
+        if item is None:
+            return False
+
+        number = self.__numbers[key][unique_code]
+        del self.__data[key][self.__position(key, number)]
+        insort(self.__removed[key], number)
+        self.__unindex_item(key, item)
+        self.__bump(key)
+        if reposity.__backend is not None:
+            reposity.__backend.delete(key, item)
+        return True
+
+    """
+    Получить элемент коллекции по unique_code. O(1)
+    """
+    def get(self, key: str, unique_code: str):
+        if key not in self.__indexes:
+            raise argument_exception(f"Неизвестный ключ коллекции {key}")
+
+        return self.__indexes[key].get(unique_code)
+
+    """
+    Получить элемент любой коллекции по unique_code. O(1)
+    """
+    def find(self, unique_code: str):
+        return self.__global_index.get(unique_code)
+
+    # Проверить аргументы операций изменения
+    def __check(self, key: str, item: abstact_model):
+        validator.validate(key, str)
+        validator.validate(item, abstact_model)
+        if key not in self.__data:
+            raise argument_exception(f"Неизвестный ключ коллекции {key}")
+
+    # Увеличить версию коллекции
+    def __bump(self, key: str):
+        self.__versions[key] = self.__versions.get(key, 0) + 1
+
+    # Позиция элемента в списке коллекции по плотному номеру: номер минус число удаленных
+    # элементов с меньшими номерами
+    def __position(self, key: str, number: int) -> int:
+        return number - bisect_left(self.__removed[key], number)
+
+    # Добавить новый элемент (в конец коллекции) в индексы
+    def __index_item(self, key: str, item: abstact_model, notify: bool = True):
+        self.__indexes[key][item.unique_code] = item
+        self.__numbers[key][item.unique_code] = len(self.__numbered[key])
+        self.__numbered[key].append(item)
+        self.__global_index.setdefault(item.unique_code, item)
+        if not notify:
+            return
+        for index in self.__attached:
+            if index.key == key:
+                index.append(item)
+
+    # Убрать удаленный элемент из индексов. Номер остается за кодом, место в списке номеров пустеет
+    def __unindex_item(self, key: str, item: abstact_model):
+        code = item.unique_code
+        del self.__indexes[key][code]
+        self.__numbered[key][self.__numbers[key][code]] = None
+        if self.__global_index.get(code) is item:
+            del self.__global_index[code]
+        for index in self.__attached:
+            if index.key == key:
+                index.remove(item)
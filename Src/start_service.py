@@ -5,8 +5,13 @@ from Src.Models.nomenclature_model import nomenclature_model
 from Src.Models.storage_model import storage_model
 from Src.Models.transaction_model import transaction_model
 from Src.Core.validator import validator, argument_exception, operation_exception
+from Src.Core.json_stream import json_stream
 import os
 import json
+import logging
+import tempfile
+from threading import Lock
+from datetime import datetime
 from Src.Models.receipt_model import receipt_model
 from Src.Models.receipt_item_model import receipt_item_model
 from Src.Dtos.nomenclature_dto import nomenclature_dto
@@ -15,6 +20,15 @@ from Src.Dtos.category_dto import category_dto
 from Src.Dtos.storage_dto import storage_dto
 from Src.Dtos.transaction_dto import transaction_dto
 from Src.Logics.factory_convertor import factory_convertor
+from Src.Logics.transaction_store import transaction_store
+from Src.Logics.balance_snapshots import balance_snapshots
+from Src.Logics.turnover_aggregates import turnover_aggregates
+from Src.Logics.trigram_index import trigram_index
+from Src.Logics.hash_index import hash_index
+from Src.Logics.sorted_index import sorted_index
+from Src.Logics.unit_graph import unit_graph
+from Src.Logics.sqlite_backend import sqlite_backend
+from Src.Logics.repository_snapshot import repository_snapshot
 
 
 class start_service:
@@ -24,15 +38,51 @@ class start_service:
     # Рецепт по умолчанию
     __default_receipt: receipt_model
 
-    # Словарь который содержит загруженные и инициализованные инстансы нужных объектов
-    # Ключ - id записи, значение - abstract_model
-    __cache = {}
-
     # Наименование файла (полный путь)
     __full_file_name: str = ""
 
+    # Файл базы SQLite (полный путь). Пусто - данные только в памяти
+    __database: str = ""
+
+    # Потоковая загрузка файла настроек (load_stream вместо load)
+    __streaming: bool = False
+
+    # Файл бинарного снимка репозитория (полный путь). Пусто - без снимка
+    __snapshot: str = ""
+
     def __init__(self):
+        self.__database = ""
+        self.__streaming = False
+        self.__snapshot = ""
+        # Фрагменты Json последнего сохранения: имя -> (версии коллекций, текст)
+        self.__saved = {}
+        self.__save_lock = Lock()
+        self.__repo.backend = None
         self.__repo.initalize()
+        # Колоночное представление транзакций, остатки на начало месяцев и обороты по дням для отчетов
+        store = self.__repo.attach(transaction_store(self.__repo))
+        self.__repo.attach(balance_snapshots(store))
+        self.__repo.attach(turnover_aggregates(store))
+        # Поиск подстроки по наименованию в справочниках
+        for key in (reposity.nomenclature_key(), reposity.group_key(), reposity.range_key(),
+                    reposity.storage_key(), reposity.receipt_key()):
+            self.__repo.attach(trigram_index(key))
+        # Точный поиск по кодам, наименованиям и ссылкам
+        for key, paths in {
+            reposity.nomenclature_key(): ("unique_code", "name", "group.unique_code", "range.unique_code",
+                                          "group.name", "range.name"),
+            reposity.group_key(): ("unique_code", "name"),
+            reposity.range_key(): ("unique_code", "name", "base.unique_code", "base.name"),
+            reposity.storage_key(): ("unique_code", "name"),
+            reposity.receipt_key(): ("unique_code", "name"),
+            reposity.transaction_key(): ("unique_code", "storage.unique_code", "nomenclature.unique_code",
+                                         "range.unique_code"),
+        }.items():
+            self.__repo.attach(hash_index(key, paths))
+        # Диапазоны по дате и количеству транзакций
+        self.__repo.attach(sorted_index(reposity.transaction_key(), ("date_tr", "quantity")))
+        # Базовые единицы и накопленные коэффициенты единиц измерения
+        self.__repo.attach(unit_graph())
 
     # Singletone
     def __new__(cls):
@@ -56,29 +106,117 @@ class start_service:
         else:
             raise argument_exception(f'Не найден файл настроек {full_file_name}')
 
-    def save_data(self, file_name: str) -> bool:
-        validator.validate(file_name, str)
-        full_path = os.path.abspath(file_name)
+    # Файл базы SQLite
+    @property
+    def database(self) -> str:
+        return self.__database
 
-        try:
-            conv = factory_convertor()  # создаём фабрику один раз
-            result = {}
+    @database.setter
+    def database(self, value: str):
+        validator.validate(value, str)
+        self.__database = os.path.abspath(value).strip()
+
+    # Потоковая загрузка файла настроек
+    @property
+    def streaming(self) -> bool:
+        return self.__streaming
 
-            for key, items in self.__repo.data.items():
-                result[key] = [conv.create(item) for item in items]
+    @streaming.setter
+    def streaming(self, value: bool):
+        validator.validate(value, bool)
+        self.__streaming = value
 
-            # Добавим информацию о default_receipt, если есть
-            if hasattr(self, "_start_service__default_receipt"):
-                result["default_receipt"] = conv.create(self.__default_receipt)
+    # Файл бинарного снимка репозитория
+    @property
+    def snapshot(self) -> str:
+        return self.__snapshot
 
-            # Сохраняем в JSON
-            with open(full_path, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=4)
+    @snapshot.setter
+    def snapshot(self, value: str):
+        validator.validate(value, str)
+        self.__snapshot = os.path.abspath(value).strip()
 
-            return True
+    """
+    Сохранить репозиторий в Json файл.
+    Данные пишутся во временный файл рядом с целевым и заменяют его через os.replace:
+    при сбое остается прежний файл. Каждая коллекция сериализуется в свой фрагмент Json, фрагмент
+    запоминается вместе с версиями коллекции и коллекций, на которые она ссылается
+    (reposity.dependencies). При следующем сохранении неизмененные коллекции берутся из памяти.
+    progress(готово, всего) вызывается после записи каждого фрагмента
+    """
+    def save_data(self, file_name: str, progress=None) -> bool:
+        validator.validate(file_name, str)
+        full_path = os.path.abspath(file_name)
+
+        with self.__save_lock:
+            temp_path = None
+            try:
+                parts = self.__save_parts()
+                total = len(parts)
+                if progress is not None:
+                    progress(0, total)
+
+                handle, temp_path = tempfile.mkstemp(prefix=".save_", suffix=".tmp",
+                                                     dir=os.path.dirname(full_path))
+                with os.fdopen(handle, "w", encoding="utf-8") as f:
+                    f.write("{")
+                    for done, (key, fragment) in enumerate(parts, 1):
+                        f.write("," if done > 1 else "")
+                        f.write("\n    " + json.dumps(key, ensure_ascii=False) + ": " + fragment)
+                        if progress is not None:
+                            progress(done, total)
+                    f.write("\n}" if total > 0 else "}")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                os.chmod(temp_path, self.__file_mode(full_path))
+                os.replace(temp_path, full_path)
+                return True
+
+            except Exception as e:
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise operation_exception(f"Ошибка сохранения данных: {e}")
+
+    # Права сохраняемого файла: как у прежнего файла, для нового - по umask процесса
+    # (mkstemp создает временный файл только для владельца)
+    @staticmethod
+    def __file_mode(full_path: str) -> int:
+        if os.path.exists(full_path):
+            return os.stat(full_path).st_mode & 0o777
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+    # Фрагменты Json для сохранения: [(ключ, текст)]. Сериализуются только коллекции,
+    # версии которых изменились после прошлого сохранения
+    def __save_parts(self) -> list:
+        conv = factory_convertor()
+        sources = [(key, self.__repo.versions(reposity.dependencies(key)), key) for key in self.__repo.data]
+        # Добавим информацию о default_receipt, если есть
+        if hasattr(self, "_start_service__default_receipt"):
+            sources.append(("default_receipt",
+                            self.__repo.versions(reposity.dependencies(reposity.receipt_key())), None))
+
+        parts = []
+        saved = {}
+        for name, versions, key in sources:
+            cached = self.__saved.get(name)
+            if cached is not None and cached[0] == versions:
+                fragment = cached[1]
+            else:
+                # Копия списка: коллекция может меняться во время сохранения. Версия прочитана раньше
+                # копии, поэтому более позднее изменение будет сериализовано при следующем сохранении
+                value = [conv.create(item) for item in list(self.__repo.data[key])] if key is not None \
+                    else conv.create(self.__default_receipt)
+                # Отступ вложенного значения совпадает с json.dump(..., indent=4) всего словаря
+                fragment = json.dumps(value, ensure_ascii=False, indent=4).replace("\n", "\n    ")
+            saved[name] = (versions, fragment)
+            parts.append((name, fragment))
+
+        self.__saved = saved
+        return parts
 
-        except Exception as e:
-            raise operation_exception(f"Ошибка сохранения данных: {e}")
     # Загрузить настройки из Json файла
 
     def load(self) -> bool:
@@ -124,12 +262,69 @@ class start_service:
         except Exception as e:
             raise operation_exception(f"Ошибка загрузки настроек: {e}")
 
+    def load_stream(self) -> bool:
+        """
+        Потоковая загрузка из JSON файла: массивы разбираются по одной записи
+        (разбор -> dto -> модель -> репозиторий) и целиком в память не попадают.
+        Первый проход загружает склады, справочники и рецепт, второй - транзакции,
+        так как в файле они могут идти раньше справочников.
+        Флаг first_start в этом режиме не перезаписывается.
+        """
+        if not self.__full_file_name:
+            raise operation_exception("Не найден файл настроек!")
+
+        try:
+            with open(self.__full_file_name, 'r', encoding='utf-8') as file_instance:
+                reader = json_stream(file_instance)
+                for key in reader.members():
+                    if key == "default_receipt":
+                        self.__stream_receipt(reader)
+                    elif key == "storage":
+                        for record in reader.items():
+                            self.__convert_storage(record)
+                    else:
+                        reader.skip()
+
+            with open(self.__full_file_name, 'r', encoding='utf-8') as file_instance:
+                reader = json_stream(file_instance)
+                for key in reader.members():
+                    if key == "transaction":
+                        for record in reader.items():
+                            self.__convert_transaction(record)
+                    else:
+                        reader.skip()
+
+            return True
+
+        except FileNotFoundError:
+            raise operation_exception(f"Файл настроек не найден: {self.__full_file_name}")
+
+        except Exception as e:
+            raise operation_exception(f"Ошибка загрузки настроек: {e}")
+
+    # Потоковая загрузка рецепта по умолчанию. Справочники идут по одной записи,
+    # небольшие поля рецепта (шаги, состав) собираются и обрабатываются в конце
+    def __stream_receipt(self, reader: json_stream):
+        converters = {
+            "ranges": self.__convert_range,
+            "categories": self.__convert_group,
+            "nomenclatures": self.__convert_nomenclature
+        }
+        header = {}
+        for key in reader.members():
+            if key in converters:
+                for record in reader.items():
+                    converters[key](record)
+            else:
+                header[key] = reader.value()
+
+        self.__convert_receipt(header)
+
     # Сохранить элемент в репозитории
     def __save_item(self, key: str, dto, item):
         validator.validate(key, str)
         item.unique_code = dto.id
-        self.__cache.setdefault(dto.id, item)
-        self.__repo.data[key].append(item)
+        self.__repo.append(key, item)
 
     # Загрузить единицы измерений
     def __convert_ranges(self, data: dict) -> bool:
@@ -139,12 +334,17 @@ class start_service:
             return False
 
         for range in ranges:
-            dto = range_dto().create(range)
-            item = range_model.from_dto(dto, self.__cache)
-            self.__save_item(reposity.range_key(), dto, item)
+            self.__convert_range(range)
 
         return True
 
+    # Загрузить единицу измерения
+    def __convert_range(self, range: dict):
+        validator.validate(range, dict)
+        dto = range_dto().create(range)
+        item = range_model.from_dto(dto, self.__repo.index)
+        self.__save_item(reposity.range_key(), dto, item)
+
     # Загрузить группы номенклатуры
     def __convert_groups(self, data: dict) -> bool:
         validator.validate(data, dict)
@@ -153,12 +353,17 @@ class start_service:
             return False
 
         for category in categories:
-            dto = category_dto().create(category)
-            item = group_model.from_dto(dto, self.__cache)
-            self.__save_item(reposity.group_key(), dto, item)
+            self.__convert_group(category)
 
         return True
 
+    # Загрузить группу номенклатуры
+    def __convert_group(self, category: dict):
+        validator.validate(category, dict)
+        dto = category_dto().create(category)
+        item = group_model.from_dto(dto, self.__repo.index)
+        self.__save_item(reposity.group_key(), dto, item)
+
     # Загрузить номенклатуру
     def __convert_nomenclatures(self, data: dict) -> bool:
         validator.validate(data, dict)
@@ -167,12 +372,17 @@ class start_service:
             return False
 
         for nomenclature in nomenclatures:
-            dto = nomenclature_dto().create(nomenclature)
-            item = nomenclature_model.from_dto(dto, self.__cache)
-            self.__save_item(reposity.nomenclature_key(), dto, item)
+            self.__convert_nomenclature(nomenclature)
 
         return True
 
+    # Загрузить элемент номенклатуры
+    def __convert_nomenclature(self, nomenclature: dict):
+        validator.validate(nomenclature, dict)
+        dto = nomenclature_dto().create(nomenclature)
+        item = nomenclature_model.from_dto(dto, self.__repo.index)
+        self.__save_item(reposity.nomenclature_key(), dto, item)
+
     def __convert_storages(self, data: dict) -> bool:
         validator.validate(data, dict)
         storages = data['storage'] if 'storage' in data else []
@@ -180,12 +390,17 @@ class start_service:
             return False
 
         for storage in storages:
-            dto = storage_dto().create(storage)
-            item = storage_model.from_dto(dto, self.__cache)
-            self.__save_item(reposity.storage_key(), dto, item)
+            self.__convert_storage(storage)
 
         return True
 
+    # Загрузить склад
+    def __convert_storage(self, storage: dict):
+        validator.validate(storage, dict)
+        dto = storage_dto().create(storage)
+        item = storage_model.from_dto(dto, self.__repo.index)
+        self.__save_item(reposity.storage_key(), dto, item)
+
     # Загрузить транзакции
     def __convert_transactions(self, data: dict) -> bool:
         validator.validate(data, dict)
@@ -194,30 +409,43 @@ class start_service:
             return False
 
         for transaction in transactions:
-            # Создаём DTO
-            dto = transaction_dto().create(transaction)
-
-            # Ищем связанные объекты в кэше
-            storage = self.__cache.get(dto.storage_id)
-            nomenclature = self.__cache.get(dto.nomenclature_id)
-            range_obj = self.__cache.get(dto.range_id)
-
-            if not storage:
-                raise operation_exception(f"Не найден склад с id={dto.storage_id} для транзакции {dto.id}")
-            if not nomenclature:
-                raise operation_exception(f"Не найдена номенклатура с id={dto.nomenclature_id} для транзакции {dto.id}")
-            if not range_obj:
-                raise operation_exception(f"Не найдена единица измерения с id={dto.range_id} для транзакции {dto.id}")
-            # Создаём модель транзакции с данными из DTO
-            item = transaction_model.create(storage, nomenclature, dto.quantity,range_obj, dto.date_tr)
-            item.unique_code = dto.id
-
-            # Сохраняем в репозиторий
-            self.__save_item(reposity.transaction_key(), dto, item)
+            self.__convert_transaction(transaction)
 
         return True
 
+    # Загрузить транзакцию
+    def __convert_transaction(self, transaction: dict):
+        validator.validate(transaction, dict)
+        # Создаём DTO
+        dto = transaction_dto().create(transaction)
+
+        # Ищем связанные объекты в индексе репозитория
+        storage = self.__repo.find(dto.storage_id)
+        nomenclature = self.__repo.find(dto.nomenclature_id)
+        range_obj = self.__repo.find(dto.range_id)
+
+        if not storage:
+            raise operation_exception(f"Не найден склад с id={dto.storage_id} для транзакции {dto.id}")
+        if not nomenclature:
+            raise operation_exception(f"Не найдена номенклатура с id={dto.nomenclature_id} для транзакции {dto.id}")
+        if not range_obj:
+            raise operation_exception(f"Не найдена единица измерения с id={dto.range_id} для транзакции {dto.id}")
+        # Создаём модель транзакции с данными из DTO
+        item = transaction_model.create(storage, nomenclature, dto.quantity,range_obj, dto.date_tr)
+        item.unique_code = dto.id
+
+        # Сохраняем в репозиторий
+        self.__save_item(reposity.transaction_key(), dto, item)
+
     def convert(self, data: dict) -> bool:
+        validator.validate(data, dict)
+        self.__convert_ranges(data)
+        self.__convert_groups(data)
+        self.__convert_nomenclatures(data)
+        return self.__convert_receipt(data)
+
+    # Собрать рецепт по умолчанию. Справочники к этому моменту загружены
+    def __convert_receipt(self, data: dict) -> bool:
         validator.validate(data, dict)
         # 1 Созданим рецепт
         cooking_time = data['cooking_time'] if 'cooking_time' in data else ""
@@ -231,10 +459,6 @@ class start_service:
             if step.strip() != "":
                 self.__default_receipt.steps.append(step)
 
-        self.__convert_ranges(data)
-        self.__convert_groups(data)
-        self.__convert_nomenclatures(data)
-
         # Собираем рецепт
         compositions = data['composition'] if 'composition' in data else []
         for composition in compositions:
@@ -242,13 +466,13 @@ class start_service:
             namnomenclature_id = composition['nomenclature_id'] if 'nomenclature_id' in composition else ""
             range_id = composition['range_id'] if 'range_id' in composition else ""
             value = composition['value'] if 'value' in composition else ""
-            nomenclature = self.__cache[namnomenclature_id] if namnomenclature_id in self.__cache else None
-            range = self.__cache[range_id] if range_id in self.__cache else None
+            nomenclature = self.__repo.find(namnomenclature_id)
+            range = self.__repo.find(range_id)
             item = receipt_item_model.create(nomenclature, range, value)
             self.__default_receipt.composition.append(item)
 
         # Сохраняем рецепт
-        self.__repo.data[reposity.receipt_key()].append(self.__default_receipt)
+        self.__repo.append(reposity.receipt_key(), self.__default_receipt)
         return True
 
     """
@@ -259,12 +483,90 @@ class start_service:
     def data(self):
         return self.__repo.data
 
+    """
+    Репозиторий с индексами по unique_code
+    """
+
+    @property
+    def repo(self) -> reposity:
+        return self.__repo
+
     """
     Основной метод для генерации эталонных данных
     """
 
     def start(self):
         self.file_name = "Docs/settings.json"
-        result = self.load()
+        if self.__load_snapshot():
+            return
+
+        result = self.__load_database() if self.__database else self.__load_file()
         if not result:
             raise operation_exception("Невозможно сформировать стартовый набор данных!")
+
+        if self.__snapshot and not self.__database:
+            repository_snapshot(self.__snapshot).write(self.__repo, self.__full_file_name)
+
+    """
+    Прогрев производных структур после загрузки: контрольные точки остатков до текущего месяца
+    """
+
+    def prewarm(self):
+        snapshots = self.__repo.attached(balance_snapshots)
+        if snapshots is not None:
+            snapshots.checkpoint(balance_snapshots.month_of(datetime.now()))
+
+    """
+    Загрузка из бинарного снимка, если он построен из текущей версии файла настроек.
+    При работе с базой SQLite снимок не используется - база сама хранит данные между запусками.
+    Поврежденный снимок пропускается: репозиторий очищается, данные читаются из Json, снимок перезаписывается
+    """
+
+    def __load_snapshot(self) -> bool:
+        if not self.__snapshot or self.__database:
+            return False
+
+        snapshot = repository_snapshot(self.__snapshot)
+        if not snapshot.is_actual(self.__full_file_name):
+            return False
+
+        try:
+            snapshot.read(self.__repo)
+        except Exception as e:
+            # Снимок мог быть прочитан частично - начинаем с пустого репозитория
+            self.__repo.initalize()
+            logging.getLogger(__name__).warning(f"Снимок {snapshot.file_name} не прочитан, загрузка из файла: {e}")
+            return False
+
+        receipts = self.__repo.data[reposity.receipt_key()]
+        if len(receipts) > 0:
+            self.__default_receipt = receipts[0]
+        return True
+
+    """
+    Загрузка через базу SQLite. Если база построена из текущей версии файла настроек,
+    данные читаются из неё без разбора Json. Иначе база строится заново из файла
+    """
+
+    def __load_database(self) -> bool:
+        backend = sqlite_backend(self.__database)
+        self.__repo.backend = None
+
+        if backend.is_actual(self.__full_file_name) and backend.load(self.__repo):
+            receipts = self.__repo.data[reposity.receipt_key()]
+            if len(receipts) > 0:
+                self.__default_receipt = receipts[0]
+            self.__repo.backend = backend
+            return True
+
+        self.__repo.initalize()
+        backend.clear()
+        self.__repo.backend = backend
+        result = self.__load_file()
+        self.__repo.commit()
+        backend.mark(self.__full_file_name)
+        return result
+
+    # Загрузить файл настроек выбранным способом
+    def __load_file(self) -> bool:
+        return self.load_stream() if self.__streaming else self.load()
@@ -9,6 +9,10 @@ from Src.Logics.structure_convertor import structure_converter
 from Src.Logics.factory_convertor import factory_convertor
 from Src.Core.abstract_model import abstact_model
 from Src.Core.validator import argument_exception
+from Src.Core.common import common
+from Src.Models.range_model import range_model
+from Src.Models.group_model import group_model
+from Src.Models.nomenclature_model import nomenclature_model
 
 
 class TestConverters(unittest.TestCase):
@@ -199,6 +203,23 @@ class TestConverters(unittest.TestCase):
         self.assertEqual(result["name"], "Ref")
         self.assertEqual(result["value"], 99)
 
+    def test_factory_convertor_plan_cached_and_equal_fields(self):
+        # Подготовка
+        factory = factory_convertor()
+        unit = range_model.create("грамм", 1, None)
+        item = nomenclature_model.create("Мука", group_model(), unit)
+        other = nomenclature_model.create("Сахар", group_model(), unit)
+
+        # Действие
+        plan = factory.plan(item)
+        result = factory.create(item)
+
+        # Проверка
+        self.assertIs(plan, factory_convertor().plan(other))
+        self.assertEqual([name for name, _ in plan], common.get_fields(item))
+        self.assertEqual(result["name"], "Мука")
+        self.assertEqual(result["range"]["name"], "грамм")
+
     def test_factory_convertor_none_raises(self):
         # Подготовка
         factory = factory_convertor()
@@ -0,0 +1,364 @@
+import io
+import unittest
+from datetime import datetime, timedelta
+from contextlib import redirect_stdout
+from Src.start_service import start_service
+from Src.Core.prototype import prototype
+from Src.Core.filter_type import filter_type
+from Src.Dtos.field_filter_dto import field_filter_dto
+from Src.Dtos.filter_dto import filter_dto
+from Src.Logics.trigram_index import trigram_index
+from Src.Logics.hash_index import hash_index
+from Src.Logics.filter_planner import filter_planner
+from Src.Logics.sorted_index import sorted_index
+from Src.Models.transaction_model import transaction_model
+from Src.Dtos.filter_sorting_dto import filter_sorting_dto
+from Src.Core.validator import argument_exception
+from Src.Models.nomenclature_model import nomenclature_model
+from Src.reposity import reposity
+
+
+# Тесты фильтрации
+class test_filters(unittest.TestCase):
+
+    def setUp(self):
+        self.service = start_service()
+        self.service.file_name = "Docs/settings.json"
+        self.service.load()
+        self.data = self.service.data
+
+    @staticmethod
+    def create_filter(field_name: str, value, type: filter_type) -> field_filter_dto:
+        result = field_filter_dto()
+        result.field_name = field_name
+        result.value = value
+        result.type = type
+        return result
+
+    # Скомпилированный фильтр совпадает с разбором пути на каждом элементе
+    def test_compiled_filter_equals_nested_attr(self):
+        # Подготовка
+        cases = [
+            ("nomenclature_model", "name", "мука", filter_type.LIKE),
+            ("nomenclature_model", "range.name", "кг", filter_type.EQUALS),
+            ("nomenclature_model", "range.base.name", "гр", filter_type.EQUALS),
+            ("nomenclature_model", "group.name", "ИНГРЕДИЕНТЫ ", filter_type.EQUALS),
+            ("range_model", "base.value", "1", filter_type.EQUALS),
+            ("receipt_model", "steps", "духов", filter_type.LIKE),
+        ]
+
+        for key, field_name, value, type in cases:
+            with self.subTest(field_name=field_name):
+                items = self.data[key]
+                ff = self.create_filter(field_name, value, type)
+                expected = [x for x in items
+                            if prototype._match_value(prototype._get_nested_attr(x, field_name), ff)]
+
+                # Действие
+                result = prototype.filter(prototype(items), [ff]).data
+
+                # Проверка
+                self.assertEqual(result, expected)
+
+    # Фильтрация по нескольким условиям и без вывода в консоль
+    def test_filter_dto_apply_without_output(self):
+        # Подготовка
+        dto = filter_dto.from_dict({"filters": [
+            {"field_name": "group.name", "value": "ингредиенты", "type": "EQUALS"},
+            {"field_name": "name", "value": "мука", "type": "LIKE"},
+        ]})
+        output = io.StringIO()
+
+        # Действие
+        with redirect_stdout(output):
+            result = dto.apply(self.data["nomenclature_model"])
+
+        # Проверка
+        self.assertGreater(len(result), 0)
+        self.assertTrue(all("мука" in x.name.lower() for x in result))
+        self.assertEqual(output.getvalue(), "")
+
+    # Индекс триграмм дает тот же результат LIKE, что и полный перебор
+    def test_trigram_index_equals_scan(self):
+        planner = filter_planner(self.service.repo)
+        for key in ("nomenclature_model", "group_model", "range_model", "storage_model", "receipt_model"):
+            index = self.service.repo.attached(trigram_index, key)
+            self.assertIsNotNone(index)
+            for text in ("мук", "МУКА ", "ингр", "кг", "вафли", "яйц", "zzz"):
+                with self.subTest(key=key, text=text):
+                    # Подготовка
+                    dto = filter_dto.from_dict({"filters": [{"field_name": "name", "value": text, "type": "LIKE"}]})
+
+                    # Действие
+                    plan = planner.plan(key, dto.filters)
+                    result = planner.execute(plan, self.data[key])
+
+                    # Проверка
+                    self.assertEqual(plan.access, "trigram" if index.supports(text) else "scan")
+                    self.assertEqual(result, prototype.filter(prototype(self.data[key]), dto).data)
+
+    # Индекс триграмм следует за изменениями репозитория
+    def test_trigram_index_follows_repository(self):
+        # Подготовка
+        repo = self.service.repo
+        key = reposity.nomenclature_key()
+        index = repo.attached(trigram_index, key)
+        first = self.data[key][0]
+        item = nomenclature_model.create("Тестовая крупа", first.group, first.range)
+
+        # Действие / Проверка
+        repo.append(key, item)
+        self.assertEqual(index.search("овая кру"), [item])
+
+        renamed = nomenclature_model.create("Переименованная позиция", first.group, first.range)
+        renamed.unique_code = first.unique_code
+        repo.replace(key, renamed)
+        self.assertEqual(index.search("переимен"), [renamed])
+        self.assertEqual(index.search(first.name), [x for x in self.data[key] if first.name.lower() in x.name.lower()])
+
+        # Порядок результата совпадает с порядком коллекции после замены
+        dto = filter_dto.from_dict({"filters": [{"field_name": "name", "value": "ова", "type": "LIKE"}]})
+        planner = filter_planner(repo)
+        self.assertEqual(planner.apply(self.data[key], dto.filters),
+                         prototype.filter(prototype(self.data[key]), dto).data)
+
+        repo.remove(key, item.unique_code)
+        self.assertEqual(index.search("овая кру"), [])
+
+
+    # План выбирает хеш-индекс для EQUALS по ссылкам и дает тот же результат, что и перебор
+    def test_planner_equals_scan(self):
+        # Подготовка
+        planner = filter_planner(self.service.repo)
+        nomenclature = self.data["nomenclature_model"][0]
+        transaction = self.data["transaction_model"][0]
+        cases = [
+            ("nomenclature_model", [("group.unique_code", nomenclature.group.unique_code, "EQUALS")], "hash"),
+            ("nomenclature_model", [("range.name", "КГ", "EQUALS"), ("name", "мука", "LIKE")], "hash"),
+            ("nomenclature_model", [("unique_code", nomenclature.unique_code.upper(), "EQUALS")], "hash"),
+            ("nomenclature_model", [("name", "мук", "LIKE"), ("range.base.name", "гр", "EQUALS")], "trigram"),
+            ("transaction_model", [("storage.unique_code", transaction.storage.unique_code, "EQUALS"),
+                                   ("nomenclature.unique_code", transaction.nomenclature.unique_code, "EQUALS")],
+             "hash"),
+            ("range_model", [("base.value", "1", "EQUALS")], "scan"),
+            ("group_model", [("name", "нет такой группы", "EQUALS")], "hash"),
+        ]
+
+        for key, conditions, access in cases:
+            with self.subTest(key=key, conditions=conditions):
+                dto = filter_dto.from_dict({"filters": [
+                    {"field_name": f, "value": v, "type": t} for f, v, t in conditions]})
+
+                # Действие
+                plan = planner.plan(key, dto.filters)
+                result = planner.execute(plan, self.data[key])
+
+                # Проверка
+                self.assertEqual(plan.access, access)
+                self.assertEqual(plan.to_dict()["key"], key)
+                self.assertEqual(result, dto.apply(self.data[key]))
+                self.assertEqual(dto.apply(self.data[key], planner), result)
+
+    # Хеш-индекс следует за изменениями репозитория и сохраняет порядок коллекции
+    def test_hash_index_follows_repository(self):
+        # Подготовка
+        repo = self.service.repo
+        key = reposity.nomenclature_key()
+        index = repo.attached(hash_index, key)
+        planner = filter_planner(repo)
+        first = self.data[key][0]
+        item = nomenclature_model.create("Тестовая крупа", first.group, first.range)
+        dto = filter_dto.from_dict({"filters": [
+            {"field_name": "group.unique_code", "value": first.group.unique_code, "type": "EQUALS"}]})
+
+        # Действие / Проверка
+        repo.append(key, item)
+        self.assertEqual(index.items(index.lookup("name", " тестовая КРУПА").values()), [item])
+
+        renamed = nomenclature_model.create("Переименованная позиция", first.group, first.range)
+        renamed.unique_code = first.unique_code
+        repo.replace(key, renamed)
+        self.assertEqual(dto.apply(self.data[key], planner), dto.apply(self.data[key]))
+        self.assertEqual(index.lookup("name", first.name), {})
+
+        repo.remove(key, item.unique_code)
+        self.assertEqual(index.lookup("name", "тестовая крупа"), {})
+        self.assertEqual(dto.apply(self.data[key], planner), dto.apply(self.data[key]))
+
+
+    # Сравнения по порядку учитывают тип поля: даты, числа, строки
+    def test_ordered_filters_compare_by_type(self):
+        # Подготовка
+        items = self.data["transaction_model"]
+        cases = [
+            ("quantity", 1000, "GT", lambda x: x.quantity > 1000),
+            ("quantity", "5000", "GTE", lambda x: x.quantity >= 5000),
+            ("quantity", [-1000, 5000], "BETWEEN", lambda x: -1000 <= x.quantity <= 5000),
+            ("quantity", [5000, "120000", "abc"], "IN", lambda x: x.quantity in (5000, 120000)),
+            ("date_tr", "2025-01-20", "LT", lambda x: x.date_tr < datetime(2025, 1, 20)),
+            ("date_tr", ["2025-01-10", "2025-02-01T00:00:00"], "BETWEEN",
+             lambda x: datetime(2025, 1, 10) <= x.date_tr <= datetime(2025, 2, 1)),
+            ("date_tr", "не дата", "GT", lambda x: False),
+            ("nomenclature.name", "п", "GTE", lambda x: x.nomenclature.name.lower() >= "п"),
+        ]
+
+        for field_name, value, type, expected in cases:
+            with self.subTest(field_name=field_name, type=type):
+                dto = filter_dto.from_dict({"filters": [{"field_name": field_name, "value": value, "type": type}]})
+
+                # Действие
+                result = dto.apply(list(items))
+
+                # Проверка
+                self.assertEqual(result, [x for x in items if expected(x)])
+
+    # Упорядоченный индекс по дате и количеству дает тот же результат, что и перебор
+    def test_sorted_index_equals_scan(self):
+        # Подготовка
+        repo = self.service.repo
+        key = reposity.transaction_key()
+        planner = filter_planner(repo)
+        source = self.data[key][0]
+        start = datetime(2023, 1, 1)
+        for day in range(0, 900, 7):
+            repo.append(key, transaction_model.create(source.storage, source.nomenclature, (day % 50) - 20,
+                                                      source.range, start + timedelta(days=day, hours=day % 24)))
+        added = self.data[key][-1]
+        repo.remove(key, self.data[key][-2].unique_code)
+        replaced = transaction_model.create(source.storage, source.nomenclature, 999, source.range, start)
+        replaced.unique_code = self.data[key][5].unique_code
+        repo.replace(key, replaced)
+
+        cases = [
+            [("date_tr", ["2023-06-01", "2024-06-01"], "BETWEEN")],
+            [("date_tr", "2025-01-10", "GTE"), ("quantity", 0, "LT")],
+            [("quantity", [999, 7, "29"], "IN")],
+            [("date_tr", added.date_tr.isoformat(), "LTE"), ("quantity", 10, "GT"),
+             ("nomenclature.unique_code", source.nomenclature.unique_code, "EQUALS")],
+            [("unique_code", [added.unique_code, replaced.unique_code, "нет"], "IN")],
+        ]
+
+        for conditions in cases:
+            with self.subTest(conditions=conditions):
+                dto = filter_dto.from_dict({"filters": [
+                    {"field_name": f, "value": v, "type": t} for f, v, t in conditions]})
+
+                # Действие
+                plan = planner.plan(key, dto.filters)
+                result = planner.execute(plan, self.data[key])
+
+                # Проверка
+                self.assertNotEqual(plan.access, "scan")
+                self.assertEqual(result, dto.apply(self.data[key]))
+
+        index = repo.attached(sorted_index, key)
+        self.assertEqual(len(index), len(self.data[key]))
+
+
+    # Обойти выборку по курсору страницами заданного размера
+    @staticmethod
+    def read_pages(items: list, sorting: list, limit: int, on_page=None) -> list:
+        result = []
+        cursor = None
+        while True:
+            dto = filter_sorting_dto.from_dict({"sorting": sorting, "limit": limit, "cursor": cursor})
+            page = dto.apply(items)
+            result.extend(page)
+            if on_page is not None:
+                on_page()
+            cursor = dto.next_cursor
+            if cursor is None:
+                return result
+
+    # Страницы по курсору без сортировки повторяют порядок коллекции
+    def test_pages_by_cursor_without_sorting(self):
+        # Подготовка
+        items = self.data["nomenclature_model"]
+
+        # Действие
+        result = self.read_pages(items, [], 2)
+
+        # Проверка
+        self.assertEqual(result, items)
+
+    # Страницы по курсору с сортировкой: устойчивы к добавлению элементов между запросами
+    def test_pages_by_cursor_with_sorting(self):
+        # Подготовка
+        repo = self.service.repo
+        key = reposity.transaction_key()
+        source = self.data[key][0]
+        for day in range(20):
+            repo.append(key, transaction_model.create(source.storage, source.nomenclature, day % 3,
+                                                      source.range, datetime(2024, 1, 1) + timedelta(days=day)))
+        items = self.data[key]
+        expected = sorted(items, key=lambda x: (x.quantity, x.date_tr, x.unique_code))
+        added = []
+
+        def append_first():
+            # элемент с наименьшим ключом попадает на уже выданные страницы и не сдвигает следующие
+            item = transaction_model.create(source.storage, source.nomenclature, -10 ** 6,
+                                            source.range, datetime(2020, 1, 1))
+            repo.append(key, item)
+            added.append(item)
+
+        # Действие
+        result = self.read_pages(items, ["quantity", "date_tr"], 3, append_first)
+
+        # Проверка
+        self.assertEqual(result, expected)
+        self.assertGreater(len(added), 1)
+
+    # Смещение и размер страницы, ошибки курсора
+    def test_offset_limit_and_invalid_cursor(self):
+        # Подготовка
+        items = self.data["nomenclature_model"]
+        dto = filter_sorting_dto.from_dict({"sorting": ["name"], "limit": 2, "offset": 1})
+
+        # Действие
+        page = dto.apply(items)
+
+        # Проверка
+        self.assertEqual(page, sorted(items, key=lambda x: (x.name, x.unique_code))[1:3])
+        self.assertIsNotNone(dto.next_cursor)
+
+        other = filter_sorting_dto.from_dict({"sorting": ["unique_code"], "limit": 2, "cursor": dto.next_cursor})
+        with self.assertRaises(argument_exception):
+            other.apply(items)
+        broken = filter_sorting_dto.from_dict({"limit": 2, "cursor": "не курсор"})
+        with self.assertRaises(argument_exception):
+            broken.apply(items)
+        wrong = filter_sorting_dto.from_dict({"limit": 0})
+        with self.assertRaises(argument_exception):
+            wrong.apply(items)
+
+
+    # Сортировка по нескольким полям с убыванием и выбор первых k совпадают с полной сортировкой
+    def test_sorting_descending_and_top_k(self):
+        # Подготовка
+        repo = self.service.repo
+        key = reposity.transaction_key()
+        source = self.data[key][0]
+        for day in range(40):
+            repo.append(key, transaction_model.create(source.storage, source.nomenclature, day % 4,
+                                                      source.range, datetime(2024, 1, 1) + timedelta(days=day % 9)))
+        items = self.data[key]
+        expected = sorted(items, key=lambda x: x.unique_code)
+        expected.sort(key=lambda x: x.date_tr, reverse=True)
+        expected.sort(key=lambda x: x.quantity)
+
+        sorting = ["quantity", {"field_name": "date_tr", "descending": True}]
+
+        # Действие
+        full = filter_sorting_dto.from_dict({"sorting": sorting}).apply(items)
+        top = filter_sorting_dto.from_dict({"sorting": sorting, "limit": 7, "offset": 2}).apply(items)
+        pages = self.read_pages(items, ["quantity", "-date_tr"], 6)
+
+        # Проверка
+        self.assertEqual([x.quantity for x in full], [x.quantity for x in expected])
+        self.assertEqual(full, expected)
+        self.assertEqual(top, expected[2:9])
+        self.assertEqual(pages, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
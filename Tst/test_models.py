@@ -3,7 +3,11 @@ from Src.Models.company_model import company_model
 import unittest
 from Src.Models.storage_model import storage_model
 import uuid
+import sys
 from Src.Models.nomenclature_model import nomenclature_model
+from Src.Models.transaction_model import transaction_model
+from Src.Models.range_model import range_model
+from Src.Models.group_model import group_model
 
 class test_models(unittest.TestCase):
 
@@ -95,6 +99,29 @@ class test_models(unittest.TestCase):
         # Проверки
         assert item1 == item2
 
+    # Проверить компактные модели: нет словаря экземпляра, код создается при первом обращении
+    def test_compact_models_slots_and_lazy_code(self):
+        # Подготовка
+        models = [transaction_model(), nomenclature_model(), range_model(), storage_model(), group_model()]
+        code = "".join(["ab", "cd"])
+
+        # Действие
+        loaded = group_model()
+        loaded.unique_code = code
+
+        # Проверки
+        for model in models:
+            assert not hasattr(model, "__dict__")
+            assert len(model.unique_code) == 32
+            assert model.unique_code == model.unique_code
+        assert loaded.unique_code == "abcd"
+        assert loaded.unique_code is sys.intern("abcd")
+        assert models[0].quantity == 0.0
+        assert models[2].value == 1 and models[2].base is None
+        assert models[1].group is None and models[1].range is None
+        with self.assertRaises(AttributeError):
+            models[0].storage
+
     
   
 if __name__ == '__main__':
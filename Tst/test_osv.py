@@ -1,7 +1,18 @@
 import unittest
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from Src.start_service import start_service
 from Src.Logics.osv_service import OSVReportService
+from Src.Logics.transaction_store import transaction_store
+from Src.Logics.balance_snapshots import balance_snapshots
+from Src.Logics.turnover_aggregates import turnover_aggregates
+from Src.Logics.osv_parallel import osv_parallel
+from Src.Logics.osv_vectorized import osv_vectorized
+from Src.Logics.unit_graph import unit_graph
+from Src.Models.range_model import range_model
+from Src.Core.validator import operation_exception
+from Src.Models.transaction_model import transaction_model
+from Src.reposity import reposity
 
 class TestOSVReportService(unittest.TestCase):
 
@@ -73,6 +84,284 @@ class TestOSVReportService(unittest.TestCase):
         with self.assertRaises(Exception):
             self.report_service.generate(bad_date_start, bad_date_end, storage_id)
 
+    def test_osv_columns_and_aggregates_equal_objects(self):
+        # Подготовка
+        store = self.service.repo.attached(transaction_store)
+        aggregates = self.service.repo.attached(turnover_aggregates)
+        transactions = self.data.get("transaction_model", [])
+        dt_start, dt_finish = datetime(2025, 1, 1), datetime(2026, 1, 1)
+
+        # Действие
+        by_columns = self.report_service._turnover_columns(store, None, None, dt_start, dt_finish, None)
+        by_aggregates = self.report_service._turnover_aggregates(aggregates, store, None, None,
+                                                                 dt_start, dt_finish, None)
+        by_objects = self.report_service._turnover_objects(transactions, None, None, dt_start, dt_finish, None)
+
+        # Проверка
+        self.assertEqual(len(store), len(transactions))
+        self.assertEqual(by_columns.keys(), by_objects.keys())
+        self.assertEqual(by_aggregates.keys(), by_objects.keys())
+        for key, value in by_objects.items():
+            self.assertEqual(by_columns[key][2:], value[2:])
+            self.assertEqual(by_aggregates[key][2:], value[2:])
+
+    def test_turnover_aggregates_follow_repository(self):
+        # Подготовка
+        storage_id = self.data["storage_model"][0].unique_code
+        source = self.data["transaction_model"][0]
+        item = transaction_model.create(source.storage, source.nomenclature, 3000,
+                                        source.range, datetime(2025, 2, 28, 18, 30))
+
+        # Действие
+        self.service.repo.append(reposity.transaction_key(), item)
+        report = self.report_service.generate("2025-02-01", "2025-02-28", storage_id)
+        self.service.repo.remove(reposity.transaction_key(), item.unique_code)
+        report_removed = self.report_service.generate("2025-02-01", "2025-02-28", storage_id)
+
+        # Проверка
+        incoming = sum(e["incoming"] for e in report)
+        incoming_removed = sum(e["incoming"] for e in report_removed)
+        self.assertAlmostEqual(incoming, 3.0, places=6)
+        self.assertAlmostEqual(incoming_removed, 0.0, places=6)
+
+    def test_transaction_store_follows_repository(self):
+        # Подготовка
+        store = self.service.repo.attached(transaction_store)
+        source = self.data["transaction_model"][0]
+        item = transaction_model.create(source.storage, source.nomenclature, 7,
+                                        source.range, datetime(2025, 3, 1))
+        count = len(store)
+
+        # Действие
+        self.service.repo.append(reposity.transaction_key(), item)
+
+        # Проверка
+        self.assertEqual(len(store), count + 1)
+        self.assertEqual(store.quantities[-1], 7.0)
+        self.assertEqual(transaction_store.from_epoch(store.dates[-1]), datetime(2025, 3, 1))
+        repo = self.service.repo
+        self.assertEqual(store.storages[-1], repo.number(reposity.storage_key(), source.storage.unique_code))
+        self.assertIs(store.nomenclature_of(store.nomenclatures[-1]), source.nomenclature)
+        self.assertIs(store.range_of(store.ranges[-1]), source.range)
+
+        # Действие
+        self.service.repo.remove(reposity.transaction_key(), item.unique_code)
+
+        # Проверка
+        self.assertEqual(len(store), count)
+
+    def test_osv_start_balance_from_previous_movements(self):
+        # Подготовка
+        storage_id = self.data["storage_model"][0].unique_code
+        flour_code = "0c101a7e-5934-4155-83a6-d2c388fcc11a"
+
+        # Действие
+        report = self.report_service.generate("2025-02-01", "2025-02-28", storage_id)
+
+        # Проверка
+        flour_entry = next(e for e in report if e["nomenclature"].get("unique_code") == flour_code)
+        self.assertAlmostEqual(flour_entry["start_balance"], 5.0, places=6)
+        self.assertAlmostEqual(flour_entry["end_balance"], 5.0, places=6)
+
+    def test_balance_snapshots_rebuild_on_backdated_transaction(self):
+        # Подготовка
+        snapshots = self.service.repo.attached(balance_snapshots)
+        transactions = self.data["transaction_model"]
+        source = transactions[0]
+        before = dict(snapshots.balance(datetime(2025, 6, 1)))
+        self.assertTrue(snapshots.count > 0)
+        item = transaction_model.create(source.storage, source.nomenclature, 2000,
+                                        source.range, datetime(2024, 12, 31))
+
+        # Действие
+        self.service.repo.append(reposity.transaction_key(), item)
+        after = snapshots.balance(datetime(2025, 6, 1))
+
+        # Проверка
+        expected = self.report_service._opening_objects(transactions, None, None, datetime(2025, 6, 1), None)
+        self.assertEqual(sum(after.values()), sum(before.values()) + 2.0)
+        self.assertAlmostEqual(sum(after.values()), sum(v[2] for v in expected.values()), places=6)
+
+    def test_balance_snapshots_unchanged_on_replace(self):
+        # Подготовка
+        snapshots = self.service.repo.attached(balance_snapshots)
+        storage_id = self.data["storage_model"][0].unique_code
+        source = self.data["transaction_model"][0]
+        before = dict(snapshots.balance(datetime(2026, 1, 1)))
+        report = self.report_service.generate("2026-01-01", "2026-01-31", storage_id)
+        copy = transaction_model.create(source.storage, source.nomenclature, source.quantity,
+                                        source.range, source.date_tr)
+        copy.unique_code = source.unique_code
+
+        # Действие
+        self.service.repo.replace(reposity.transaction_key(), copy)
+        after = snapshots.balance(datetime(2026, 1, 1))
+
+        # Проверка
+        self.assertEqual(after, before)
+        self.assertReportsEqual(self.report_service.generate("2026-01-01", "2026-01-31", storage_id), report)
+
+    # Проверить построение точек в потоках одновременно с добавлением транзакций
+    def test_balance_snapshots_checkpoint_concurrent_append(self):
+        # Подготовка
+        snapshots = self.service.repo.attached(balance_snapshots)
+        source = self.data["transaction_model"][0]
+        months = [balance_snapshots.month_of(datetime(year, month, 1))
+                  for year in (2024, 2025, 2026) for month in range(1, 13)]
+
+        def build():
+            for month in months:
+                snapshots.checkpoint(month)
+
+        # Действие
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(build) for _ in range(4)]
+            for i in range(200):
+                item = transaction_model.create(source.storage, source.nomenclature, 1,
+                                                source.range, datetime(2025, 1 + i % 12, 1 + i % 28))
+                self.service.repo.append(reposity.transaction_key(), item)
+            for future in futures:
+                future.result()
+        balance = snapshots.balance(datetime(2026, 1, 1))
+
+        # Проверка
+        expected = self.report_service._opening_objects(self.data["transaction_model"],
+                                                        None, None, datetime(2026, 1, 1), None)
+        self.assertAlmostEqual(sum(balance.values()), sum(v[2] for v in expected.values()), places=6)
+
+    # Сравнить отчеты по ключу (номенклатура, единица)
+    def assertReportsEqual(self, result: list, expected: list):
+        def rows(report):
+            return {(x["nomenclature"]["unique_code"], (x["unit"] or {}).get("unique_code")): x for x in report}
+
+        result, expected = rows(result), rows(expected)
+        self.assertEqual(result.keys(), expected.keys())
+        for key, row in expected.items():
+            for field in ("start_balance", "incoming", "outgoing", "end_balance"):
+                self.assertAlmostEqual(result[key][field], row[field], places=6)
+
+    def test_osv_storages_equal_generate(self):
+        # Подготовка
+        date_start, date_end = "2025-01-15", "2025-02-28"
+        storages = self.data["storage_model"]
+
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                # Действие
+                result = self.report_service.generate_storages(
+                    date_start, date_end, engine=osv_parallel(self.service.repo, workers))
+
+                # Проверка
+                self.assertReportsEqual(result["total"], self.report_service.generate(date_start, date_end, None))
+                self.assertEqual(len(result["storages"]), len(storages))
+                for storage, part in zip(storages, result["storages"]):
+                    self.assertEqual(part["storage"]["unique_code"], storage.unique_code)
+                    self.assertReportsEqual(part["report"],
+                                            self.report_service.generate(date_start, date_end, storage.unique_code))
+        osv_parallel.shutdown()
+
+    def test_osv_parallel_snapshot_follows_repository(self):
+        # Подготовка
+        engine = osv_parallel(self.service.repo, 1)
+        dt_start, dt_finish = datetime(2025, 1, 1), datetime(2026, 1, 1)
+        before = osv_parallel.merge(engine.aggregate(dt_start, dt_finish).values())
+        source = self.data["transaction_model"][0]
+        item = transaction_model.create(source.storage, source.nomenclature, 7, source.range, datetime(2025, 3, 1))
+
+        # Действие
+        self.service.repo.append(reposity.transaction_key(), item)
+        after = osv_parallel.merge(engine.aggregate(dt_start, dt_finish).values())
+
+        # Проверка
+        self.assertAlmostEqual(sum(x[1] - x[2] for x in after.values()) - sum(x[1] - x[2] for x in before.values()),
+                               7 / (source.range.value or 1), places=6)
+
+    @unittest.skipUnless(osv_vectorized.available(), "numpy не установлен")
+    def test_osv_vectorized_equal_generate(self):
+        # Подготовка
+        store = self.service.repo.attached(transaction_store)
+        engine = osv_vectorized(self.service.repo)
+        dt_start, dt_finish = datetime(2025, 1, 1), datetime(2026, 1, 1)
+        storage_id = self.data["storage_model"][0].unique_code
+
+        # Действие
+        by_columns = self.report_service._turnover_columns(store, None, None, dt_start, dt_finish, None)
+        by_vectors = engine.turnover(dt_start, dt_finish)
+
+        # Проверка
+        self.assertEqual(len(by_vectors), len(by_columns))
+        for (n, r), value in by_vectors.items():
+            key = (store.nomenclature_of(n).unique_code, store.range_of(r).unique_code)
+            self.assertEqual(by_columns[key][2:], value)
+        for sid in (storage_id, None):
+            self.assertReportsEqual(self.report_service.generate("2025-01-15", "2025-02-28", sid, vectorized=True),
+                                    self.report_service.generate("2025-01-15", "2025-02-28", sid))
+
+    def test_unit_graph_resolve_chain_and_cycle(self):
+        # Подготовка
+        graph = unit_graph()
+        gramm = range_model.create("грамм", 1, None)
+        kilo = range_model.create("киллограмм", 1000, gramm)
+        tonne = range_model.create("тонна", 1000, kilo)
+        first = range_model.create("первая", 2, None)
+        second = range_model.create("вторая", 3, first)
+        first.base = second
+
+        # Действие / Проверка
+        self.assertEqual(graph.resolve(tonne), (gramm, 1000000))
+        self.assertEqual(graph.factor(kilo), 1000)
+        self.assertEqual(graph.convert(2.5, tonne, kilo), 2500)
+        self.assertTrue(graph.compatible(tonne, gramm))
+        with self.assertRaises(operation_exception):
+            graph.factor(second)
+        self.assertEqual({x.name for x in graph.cycles}, {"первая", "вторая"})
+
+    def test_unit_graph_invalidated_on_change(self):
+        # Подготовка
+        graph = self.service.repo.attached(unit_graph)
+        gramm = range_model.create("грамм", 1, None)
+        kilo = range_model.create("киллограмм", 1000, gramm)
+        self.service.repo.append(reposity.range_key(), kilo)
+        self.assertEqual(graph.factor(kilo), 1000)
+        other = range_model.create("киллограмм", 1000, range_model.create("грамм", 1, None))
+        other.unique_code = kilo.unique_code
+
+        # Действие
+        kilo.base = None
+        self.service.repo.replace(reposity.range_key(), other)
+
+        # Проверка
+        self.assertEqual(graph.factor(kilo), 1)
+        self.assertEqual(graph.factor(other), 1000)
+
+    def test_osv_normalized_to_base_unit(self):
+        # Подготовка
+        flour_code = "0c101a7e-5934-4155-83a6-d2c388fcc11a"
+        gramm_code = "adb7510f-687d-428f-a697-26e53d3f65b7"
+        flour = self.service.repo.get(reposity.nomenclature_key(), flour_code)
+        gramm = self.service.repo.get(reposity.range_key(), gramm_code)
+        source = next(t for t in self.data["transaction_model"] if t.nomenclature is flour)
+        item = transaction_model.create(source.storage, flour, 300, gramm, datetime(2025, 1, 20))
+        self.service.repo.append(reposity.transaction_key(), item)
+        storage_id = source.storage.unique_code
+
+        # Действие
+        legacy = self.report_service.generate("2025-01-01", "2025-02-28", storage_id)
+        by_base = self.report_service.generate("2025-01-01", "2025-02-28", storage_id, unit="base")
+        by_nomenclature = self.report_service.generate("2025-01-01", "2025-02-28", storage_id, unit="nomenclature")
+
+        # Проверка
+        legacy_rows = [x for x in legacy if x["nomenclature"]["unique_code"] == flour_code]
+        base_rows = [x for x in by_base if x["nomenclature"]["unique_code"] == flour_code]
+        nomenclature_rows = [x for x in by_nomenclature if x["nomenclature"]["unique_code"] == flour_code]
+        self.assertEqual(len(legacy_rows), 2)
+        self.assertEqual(len(base_rows), 1)
+        self.assertEqual(base_rows[0]["unit"]["unique_code"], gramm_code)
+        self.assertAlmostEqual(base_rows[0]["incoming"], 5300)
+        self.assertEqual(len(nomenclature_rows), 1)
+        self.assertEqual(nomenclature_rows[0]["unit"]["unique_code"], flour.range.unique_code)
+        self.assertAlmostEqual(nomenclature_rows[0]["incoming"], 5.3)
+
 
 if __name__ == "__main__":
     unittest.main()
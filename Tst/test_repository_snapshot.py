@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+from Src.reposity import reposity
+from Src.start_service import start_service
+from Src.Logics.repository_snapshot import repository_snapshot
+
+
+# Набор тестов для бинарного снимка репозитория
+class test_repository_snapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.folder.name, "repository.snp")
+
+    def tearDown(self):
+        start_service()
+        self.folder.cleanup()
+
+    # Повторный старт читает снимок и получает те же данные
+    def test_equals_snapshot_restart(self):
+        # Подготовка
+        start = start_service()
+        start.snapshot = self.snapshot
+        start.start()
+        expected = {key: [x.unique_code for x in items] for key, items in start.data.items()}
+        quantities = [x.quantity for x in start.data[reposity.transaction_key()]]
+        composition = [(x.nomenclature.unique_code, x.range.unique_code, x.value)
+                       for x in start.data[reposity.receipt_key()][0].composition]
+
+        # Действие
+        restart = start_service()
+        restart.snapshot = self.snapshot
+        actual = repository_snapshot(self.snapshot).is_actual(restart.file_name)
+        restart.start()
+
+        # Проверка
+        assert actual
+        assert {key: [x.unique_code for x in items] for key, items in restart.data.items()} == expected
+        assert [x.quantity for x in restart.data[reposity.transaction_key()]] == quantities
+        kg = restart.repo.find("a33dd457-36a8-4de6-b5f1-40afa6193346")
+        assert kg.base is restart.repo.find("adb7510f-687d-428f-a697-26e53d3f65b7")
+        receipt = restart.data[reposity.receipt_key()][0]
+        assert len(composition) > 0
+        assert [(x.nomenclature.unique_code, x.range.unique_code, x.value) for x in receipt.composition] == composition
+        assert receipt.composition[0].nomenclature is restart.repo.find(composition[0][0])
+
+    # Поврежденный снимок пропускается: данные читаются из файла, снимок перезаписывается
+    def test_corrupted_snapshot_fallback(self):
+        # Подготовка
+        start = start_service()
+        start.snapshot = self.snapshot
+        start.start()
+        expected = self.contents(start.repo)
+        with open(self.snapshot, "r+b") as file_instance:
+            file_instance.truncate(os.path.getsize(self.snapshot) // 2)
+
+        # Действие
+        restart = start_service()
+        restart.snapshot = self.snapshot
+        actual = repository_snapshot(self.snapshot).is_actual(restart.file_name)
+        with self.assertLogs("Src.start_service", level="WARNING"):
+            restart.start()
+
+        # Проверка
+        assert actual
+        assert self.contents(restart.repo) == expected
+        assert len(restart.data[reposity.receipt_key()][0].composition) > 0
+        rebuilt = start_service()
+        repository_snapshot(self.snapshot).read(rebuilt.repo)
+        assert self.contents(rebuilt.repo) == expected
+
+    # Содержимое репозитория по коллекциям. Коды рецептов выдаются при каждой загрузке из файла,
+    # поэтому рецепты сравниваются по названию
+    @staticmethod
+    def contents(repo) -> dict:
+        return {key: [x.name if key == reposity.receipt_key() else x.unique_code for x in items]
+                for key, items in repo.data.items()}
+
+    # Снимок устаревает при изменении исходного файла
+    def test_stale_snapshot_after_source_change(self):
+        # Подготовка
+        source = os.path.join(self.folder.name, "settings.json")
+        shutil.copyfile("Docs/settings.json", source)
+        start = start_service()
+        start.start()
+        snapshot = repository_snapshot(self.snapshot)
+        snapshot.write(start.repo, source)
+        assert snapshot.is_actual(source)
+
+        # Действие
+        stat = os.stat(source)
+        os.utime(source, (stat.st_atime, stat.st_mtime + 10))
+
+        # Проверка
+        assert not snapshot.is_actual(source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from Src.Logics.response_cache import response_cache
+from Src.Core.validator import argument_exception
+
+
+class test_response_cache(unittest.TestCase):
+
+    # Проверить попадания, промахи и вытеснение самой старой записи
+    def test_evict_response_cache_lru(self):
+        # Подготовка
+        cache = response_cache(max_entries=2)
+        cache.put(("a",), b"1")
+        cache.put(("b",), b"2")
+
+        # Действие
+        first = cache.get(("a",))
+        cache.put(("c",), b"3")
+
+        # Проверка
+        assert first == b"1"
+        assert cache.get(("b",)) is None
+        assert cache.get(("a",)) == b"1"
+        assert cache.get(("c",)) == b"3"
+        assert cache.hits == 3
+        assert cache.misses == 1
+        assert len(cache) == 2
+
+    # Проверить ограничение суммарного размера ответов
+    def test_evict_response_cache_bytes(self):
+        # Подготовка
+        cache = response_cache(max_entries=10, max_bytes=10)
+
+        # Действие
+        cache.put(("a",), b"12345")
+        cache.put(("b",), b"12345")
+        cache.put(("c",), b"1")
+        cache.put(("d",), b"12345678901")
+
+        # Проверка
+        assert cache.get(("a",)) is None
+        assert cache.get(("d",)) is None
+        assert cache.size == 6
+        assert cache.stats()["entries"] == 2
+
+        # Действие
+        cache.max_bytes = 1
+
+        # Проверка
+        assert len(cache) == 1
+        assert cache.get(("c",)) == b"1"
+
+    # Проверить ошибку при отрицательном ограничении
+    def test_throw_response_cache_negative_limit(self):
+        # Подготовка
+        cache = response_cache()
+
+        # Действие / Проверка
+        with self.assertRaises(argument_exception):
+            cache.max_entries = -1
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -152,5 +152,21 @@ class TestResponseFormats(unittest.TestCase):
                     elif fmt == "xml":
                         ET.fromstring(result)
 
+    # ==== Потоковое формирование ====
+    def test_stream_matches_build(self):
+        data = [self.nomenclature1, self.nomenclature2]
+        for response in (response_csv(), response_markdown(), response_xml()):
+            with self.subTest(response=type(response).__name__):
+                parts = response.stream("csv", data)
+                self.assertFalse(isinstance(parts, (str, list)))
+                self.assertEqual("".join(parts), response.build("csv", data))
+                self.assertEqual("".join(response.stream("csv", [])), response.build("csv", []))
+
+    def test_stream_json_is_valid_array(self):
+        data = [self.nomenclature1, self.nomenclature2]
+        result = json.loads("".join(response_json().stream("json", data)))
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0]["name"], "Товар 1")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
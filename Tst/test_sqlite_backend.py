@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from Src.reposity import reposity
+from Src.start_service import start_service
+from Src.Logics.osv_service import OSVReportService
+from Src.Logics.sqlite_backend import sqlite_backend
+
+
+# Набор тестов для хранилища репозитория в SQLite
+class test_sqlite_backend(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.folder.name, "repository.db")
+
+    def tearDown(self):
+        start_service()
+        self.folder.cleanup()
+
+    # Данные из Json попадают в базу, повторный старт читает базу
+    def test_equals_sqlite_restart(self):
+        # Подготовка
+        start = start_service()
+        start.database = self.database
+        start.start()
+        expected = {key: len(items) for key, items in start.data.items()}
+
+        # Действие
+        restart = start_service()
+        restart.database = self.database
+        backend = sqlite_backend(self.database)
+        actual = backend.is_actual(restart.file_name)
+        restart.start()
+
+        # Проверка
+        assert actual
+        assert {key: len(items) for key, items in restart.data.items()} == expected
+        kg = restart.repo.find("a33dd457-36a8-4de6-b5f1-40afa6193346")
+        assert kg.base.unique_code == "adb7510f-687d-428f-a697-26e53d3f65b7"
+
+    # Состав рецепта сохраняется в базе и восстанавливается при повторном старте
+    def test_equals_sqlite_receipt_composition(self):
+        # Подготовка
+        start = start_service()
+        start.database = self.database
+        start.start()
+        receipt = start.data[reposity.receipt_key()][0]
+        expected = [(x.nomenclature.unique_code, x.range.unique_code, x.value) for x in receipt.composition]
+
+        # Действие
+        restart = start_service()
+        restart.database = self.database
+        actual = sqlite_backend(self.database).is_actual(restart.file_name)
+        restart.start()
+
+        # Проверка
+        assert actual
+        restored = restart.data[reposity.receipt_key()][0]
+        assert len(expected) > 0
+        assert restored.unique_code == receipt.unique_code
+        assert [(x.nomenclature.unique_code, x.range.unique_code, x.value) for x in restored.composition] == expected
+        assert restored.composition[0].nomenclature is restart.repo.find(expected[0][0])
+
+    # Отчет ОСВ через SQL совпадает с отчетом по памяти
+    def test_equals_sqlite_osv(self):
+        # Подготовка
+        start = start_service()
+        start.start()
+        storage_id = start.data[reposity.storage_key()][0].unique_code
+        expected = OSVReportService(start).generate("2025-01-12", "2025-02-28", storage_id)
+
+        start = start_service()
+        start.database = self.database
+        start.start()
+
+        # Действие
+        result = OSVReportService(start).generate("2025-01-12", "2025-02-28", storage_id)
+
+        # Проверка
+        assert isinstance(start.repo.backend, sqlite_backend)
+        key = lambda x: (x["nomenclature"]["unique_code"], x["unit"]["unique_code"])
+        assert sorted(result, key=key) == sorted(expected, key=key)
+
+
+if __name__ == '__main__':
+    unittest.main()
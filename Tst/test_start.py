@@ -1,6 +1,12 @@
 from Src.reposity import reposity
 from Src.start_service import start_service
+from Src.Models.group_model import group_model
+from Src.Core.json_stream import json_stream
+from Src.Core.validator import operation_exception, argument_exception
 import unittest
+import json
+import os
+import tempfile
 
 # Набор тестов для проверки работы статового сервиса
 class test_start(unittest.TestCase):
@@ -48,7 +54,223 @@ class test_start(unittest.TestCase):
         # Действие
         repo.initalize() 
 
+    # Проверить поиск по индексу unique_code после загрузки
+    def test_equals_reposity_get_by_code(self):
+        # Подготовка
+        start = start_service()
+        start.start()
+        storage = start.data[reposity.storage_key()][0]
+
+        # Действие
+        result = start.repo.get(reposity.storage_key(), storage.unique_code)
+
+        # Проверка
+        assert result is storage
+        assert start.repo.find(storage.unique_code) is storage
+
+    # Проверить согласованность индекса при замене и удалении
+    def test_consistent_reposity_replace_remove(self):
+        # Подготовка
+        repo = reposity()
+        repo.initalize()
+        item = group_model.create("Первая")
+        repo.append(reposity.group_key(), item)
+        other = group_model.create("Вторая")
+        other.unique_code = item.unique_code
+
+        # Действие
+        repo.replace(reposity.group_key(), other)
+
+        # Проверка
+        assert repo.get(reposity.group_key(), item.unique_code) is other
+        assert len(repo.data[reposity.group_key()]) == 1
+
+        # Действие
+        result = repo.remove(reposity.group_key(), item.unique_code)
+
+        # Проверка
+        assert result
+        assert repo.get(reposity.group_key(), item.unique_code) is None
+        assert repo.find(item.unique_code) is None
+        assert len(repo.data[reposity.group_key()]) == 0
+
+    # Проверить ошибку при добавлении элемента с уже существующим кодом
+    def test_throw_reposity_append_duplicate(self):
+        # Подготовка
+        repo = reposity()
+        repo.initalize()
+        item = group_model.create("Первая")
+        repo.append(reposity.group_key(), item)
+        other = group_model.create("Вторая")
+        other.unique_code = item.unique_code
+        version = repo.version(reposity.group_key())
+
+        # Действие / Проверка
+        with self.assertRaises(argument_exception):
+            repo.append(reposity.group_key(), other)
+        assert repo.data[reposity.group_key()] == [item]
+        assert repo.get(reposity.group_key(), item.unique_code) is item
+        assert repo.version(reposity.group_key()) == version
+
+    # Проверить, что версия коллекции растет при каждом изменении и только у измененной коллекции
+    def test_increase_reposity_version(self):
+        # Подготовка
+        repo = reposity()
+        repo.initalize()
+        item = group_model.create("Первая")
+        other = group_model.create("Вторая")
+        other.unique_code = item.unique_code
+        versions = [repo.version(reposity.group_key())]
+        storage = repo.version(reposity.storage_key())
+
+        # Действие
+        repo.append(reposity.group_key(), item)
+        versions.append(repo.version(reposity.group_key()))
+        repo.replace(reposity.group_key(), other)
+        versions.append(repo.version(reposity.group_key()))
+        repo.remove(reposity.group_key(), item.unique_code)
+        versions.append(repo.version(reposity.group_key()))
+        repo.initalize()
+        versions.append(repo.version(reposity.group_key()))
+
+        # Проверка
+        assert versions == sorted(set(versions))
+        assert repo.version(reposity.storage_key()) == storage + 1
+        assert dict(repo.versions())[reposity.group_key()] == versions[-1]
+        assert reposity.group_key() in reposity.dependencies(reposity.nomenclature_key())
+
+    # Проверить плотные номера: выдаются подряд, сохраняются при замене, не переиспользуются после удаления
+    # и задают позицию элемента в списке коллекции
+    def test_dense_reposity_numbers(self):
+        # Подготовка
+        repo = reposity()
+        repo.initalize()
+        first = group_model.create("Первая")
+        second = group_model.create("Вторая")
+        other = group_model.create("Первая (новая)")
+        other.unique_code = first.unique_code
+
+        # Действие
+        repo.append(reposity.group_key(), first)
+        repo.append(reposity.group_key(), second)
+        repo.replace(reposity.group_key(), other)
+        repo.remove(reposity.group_key(), second.unique_code)
+        third = group_model.create("Третья")
+        repo.append(reposity.group_key(), third)
+
+        # Проверка
+        assert repo.number(reposity.group_key(), first.unique_code) == 0
+        assert repo.number(reposity.group_key(), second.unique_code) == 1
+        assert repo.number(reposity.group_key(), third.unique_code) == 2
+        assert repo.by_number(reposity.group_key(), 0) is other
+        assert repo.by_number(reposity.group_key(), 1) is None
+        assert repo.by_number(reposity.group_key(), 2) is third
+        assert repo.capacity(reposity.group_key()) == 3
+        assert repo.number(reposity.storage_key(), first.unique_code) is None
 
+        # Действие: повторно добавленный код получает новый номер, замена находит свое место в списке
+        repo.append(reposity.group_key(), second)
+        renamed = group_model.create("Третья (новая)")
+        renamed.unique_code = third.unique_code
+        repo.replace(reposity.group_key(), renamed)
+
+        # Проверка
+        assert repo.number(reposity.group_key(), second.unique_code) == 3
+        assert repo.by_number(reposity.group_key(), 1) is None
+        assert [x.name for x in repo.data[reposity.group_key()]] == ["Первая (новая)", "Третья (новая)", "Вторая"]
+
+
+    # Проверить, что потоковая загрузка дает те же данные, что и обычная
+    def test_equals_start_service_load_stream(self):
+        # Подготовка
+        start = start_service()
+        start.start()
+        expected = {key: [x.unique_code for x in items] for key, items in start.data.items()
+                    if key != reposity.receipt_key()}
+
+        # Действие
+        start = start_service()
+        start.streaming = True
+        start.start()
+
+        # Проверка
+        result = {key: [x.unique_code for x in items] for key, items in start.data.items()
+                  if key != reposity.receipt_key()}
+        assert result == expected
+        assert len(start.data[reposity.receipt_key()]) == 1
+
+    # Проверить разбор файла маленькими блоками
+    def test_equals_json_stream_small_chunks(self):
+        # Подготовка
+        with open("Docs/settings.json", encoding="utf-8") as file_instance:
+            expected = json.load(file_instance)
+
+        # Действие
+        result = {}
+        with open("Docs/settings.json", encoding="utf-8") as file_instance:
+            reader = json_stream(file_instance, 7)
+            for key in reader.members():
+                if key == "transaction":
+                    result[key] = list(reader.items())
+                else:
+                    result[key] = reader.value()
+
+        # Проверка
+        assert result == expected
+
+    # Проверить сохранение через временный файл и повторное сохранение после изменений
+    def test_equals_start_service_save_data(self):
+        # Подготовка
+        start = start_service()
+        start.start()
+        folder = tempfile.TemporaryDirectory()
+        file_name = os.path.join(folder.name, "data.json")
+        steps = []
+
+        # Действие
+        start.save_data(file_name, lambda done, total: steps.append((done, total)))
+        with open(file_name, encoding="utf-8") as file_instance:
+            first = json.load(file_instance)
+        group = group_model()
+        group.name = "Напитки"
+        start.repo.append(reposity.group_key(), group)
+        start.save_data(file_name)
+        with open(file_name, encoding="utf-8") as file_instance:
+            second = json.load(file_instance)
+
+        # Проверка
+        assert steps[0] == (0, len(first)) and steps[-1] == (len(first), len(first))
+        assert os.listdir(folder.name) == ["data.json"]
+        assert len(first[reposity.transaction_key()]) == len(start.data[reposity.transaction_key()])
+        assert len(second[reposity.group_key()]) == len(first[reposity.group_key()]) + 1
+        assert second[reposity.storage_key()] == first[reposity.storage_key()]
+        start.repo.remove(reposity.group_key(), group.unique_code)
+        folder.cleanup()
+
+    # Проверить, что ошибка сохранения не портит прежний файл
+    def test_keep_start_service_save_data_on_error(self):
+        # Подготовка
+        start = start_service()
+        start.start()
+        folder = tempfile.TemporaryDirectory()
+        file_name = os.path.join(folder.name, "data.json")
+        start.save_data(file_name)
+        with open(file_name, encoding="utf-8") as file_instance:
+            expected = file_instance.read()
+
+        def fail(done, total):
+            if done > 1:
+                raise OSError("Нет места на диске")
+
+        # Действие
+        with self.assertRaises(operation_exception):
+            start.save_data(file_name, fail)
+
+        # Проверка
+        with open(file_name, encoding="utf-8") as file_instance:
+            assert file_instance.read() == expected
+        assert os.listdir(folder.name) == ["data.json"]
+        folder.cleanup()
 
           
 if __name__ == '__main__':
@@ -0,0 +1,107 @@
+import unittest
+import json
+from datetime import datetime
+from Src.start_service import start_service
+from Src.Logics.transaction_ingest import transaction_ingest
+from Src.Logics.transaction_store import transaction_store
+from Src.Logics.balance_snapshots import balance_snapshots
+from Src.Logics.osv_service import OSVReportService
+from Src.Core.validator import argument_exception
+from Src.reposity import reposity
+
+
+# Набор тестов для пакетной загрузки транзакций
+class test_transaction_ingest(unittest.TestCase):
+
+    def setUp(self):
+        # Подготовка: загрузка данных через start_service (без запуска сервера)
+        self.service = start_service()
+        self.service.file_name = "Docs/settings.json"
+        self.service.load()
+        self.repo = self.service.repo
+        self.ingest = transaction_ingest(self.repo)
+
+    # Запись транзакции со ссылками на первую транзакцию файла настроек
+    def record(self, code: str, quantity: float, date_tr: str = "2025-03-10 12:00:00") -> dict:
+        source = self.service.data[reposity.transaction_key()][0]
+        return {
+            "id": code,
+            "date_tr": date_tr,
+            "storage_id": source.storage.unique_code,
+            "nomenclature_id": source.nomenclature.unique_code,
+            "range_id": source.range.unique_code,
+            "quantity": quantity
+        }
+
+    # Проверить разбор Json массива и NDJSON
+    def test_parse_transaction_ingest_formats(self):
+        # Подготовка
+        records = [self.record("a1", 1), self.record("a2", 2)]
+        array_body = json.dumps(records).encode("utf-8")
+        ndjson_body = "\n".join(json.dumps(x) for x in records).encode("utf-8") + b"\n"
+
+        # Действие
+        from_array = transaction_ingest.parse(array_body)
+        from_ndjson = transaction_ingest.parse(ndjson_body)
+
+        # Проверка
+        assert from_array == records
+        assert from_ndjson == records
+        assert transaction_ingest.parse(b"  ") == []
+        with self.assertRaises(argument_exception):
+            transaction_ingest.parse(b"{\"id\": ")
+
+    # Проверить добавление пачки одним изменением коллекции
+    def test_append_transaction_ingest_batch(self):
+        # Подготовка
+        store = self.repo.attached(transaction_store)
+        snapshots = self.repo.attached(balance_snapshots)
+        storage_id = self.service.data[reposity.transaction_key()][0].storage.unique_code
+        report_service = OSVReportService(self.service)
+        before = report_service.generate("2025-03-01", "2025-03-31", storage_id)
+        snapshots.checkpoint(balance_snapshots.month_of(datetime(2025, 6, 1)))
+        count = len(store)
+        version = self.repo.version(reposity.transaction_key())
+        records = [self.record(f"batch-{i}", 1000) for i in range(50)]
+
+        # Действие
+        result = self.ingest.ingest(records)
+
+        # Проверка
+        assert result == {"accepted": 50, "errors": []}
+        assert len(store) == count + 50
+        assert self.repo.version(reposity.transaction_key()) == version + 1
+        assert self.repo.get(reposity.transaction_key(), "batch-49") is not None
+        after = report_service.generate("2025-03-01", "2025-03-31", storage_id)
+        incoming = sum(e["incoming"] for e in after) - sum(e["incoming"] for e in before)
+        self.assertAlmostEqual(incoming, 50.0, places=6)
+        balance = snapshots.balance(datetime(2025, 6, 1))
+        expected = report_service._opening_objects(self.service.data[reposity.transaction_key()],
+                                                   None, None, datetime(2025, 6, 1), None)
+        self.assertAlmostEqual(sum(balance.values()), sum(v[2] for v in expected.values()), places=6)
+
+    # Проверить, что пачка с ошибкой не добавляется целиком
+    def test_reject_transaction_ingest_batch(self):
+        # Подготовка
+        store = self.repo.attached(transaction_store)
+        count = len(store)
+        version = self.repo.version(reposity.transaction_key())
+        existing = self.service.data[reposity.transaction_key()][0].unique_code
+        bad_storage = self.record("bad-2", 1)
+        bad_storage["storage_id"] = "unknown"
+        records = [self.record("ok-1", 1), bad_storage, self.record("ok-1", 1),
+                   self.record(existing, 1), self.record("bad-date", 1, "10.03.2025")]
+
+        # Действие
+        result = self.ingest.ingest(records)
+
+        # Проверка
+        assert result["accepted"] == 0
+        assert [x["row"] for x in result["errors"]] == [1, 2, 3, 4]
+        assert len(store) == count
+        assert self.repo.version(reposity.transaction_key()) == version
+        assert self.repo.get(reposity.transaction_key(), "ok-1") is None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,69 +1,316 @@
 import uvicorn
 import json
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+import asyncio
+import hashlib
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Depends, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from Src.Logics.factory_entities import factory_entities
 from Src.start_service import start_service
+from Src.reposity import reposity
 from Src.Logics.osv_service import OSVReportService
 from Src.Dtos.filter_dto import filter_dto
+from Src.Dtos.filter_sorting_dto import filter_sorting_dto
+from Src.Core.validator import argument_exception
 from Src.Logics.factory_convertor import factory_convertor
-# Инициализация сервисов
-app = FastAPI(title="Recipe API")
-
+from Src.Logics.filter_planner import filter_planner
+from Src.Logics.response_cache import response_cache
+from Src.Logics.osv_parallel import osv_parallel
+from Src.Logics.transaction_ingest import transaction_ingest
+# Инициализация сервисов. Данные загружаются в фоне после старта приложения
 start_service_instance = start_service()
-start_service_instance.start()
 
 factory = factory_entities()
 converter = factory_convertor()
 
+# Кеш готовых ответов эндпоинтов чтения (ограничения задаются свойствами max_entries / max_bytes)
+cache = response_cache(max_entries=256, max_bytes=64 * 1024 * 1024)
+
+# Параллельный расчет ОСВ по складам (хранит снимок транзакций между запросами)
+osv_engine = osv_parallel(start_service_instance.repo)
+
+# Пакетная загрузка транзакций
+ingest = transaction_ingest(start_service_instance.repo)
+
+# Метка запуска процесса для ETag: версии коллекций начинаются заново при каждом запуске
+instance_tag = uuid.uuid4().hex
+
+# Задания сохранения репозитория: job_id -> состояние (хранятся последние max_save_jobs)
+save_jobs = OrderedDict()
+max_save_jobs = 64
+save_tasks = set()
+
+# Состояние прогрева: LOADING -> READY или FAILED
+warmup = {"status": "LOADING", "detail": ""}
+
+
+async def save_job(job: dict):
+    """
+    Выполнение задания сохранения в отдельном потоке с обновлением хода выполнения
+    """
+    def progress(done: int, total: int):
+        job["done"] = done
+        job["total"] = total
+
+    try:
+        await asyncio.to_thread(start_service_instance.save_data, job["file"], progress)
+        job["status"] = "DONE"
+    except Exception as e:
+        job["status"] = "FAILED"
+        job["detail"] = str(e)
+
+
+async def warm_up():
+    """
+    Загрузка данных и прогрев вспомогательных структур вне цикла событий
+    """
+    try:
+        await asyncio.to_thread(start_service_instance.start)
+        warmup["status"] = "READY"
+        await asyncio.to_thread(start_service_instance.prewarm)
+    except Exception as e:
+        warmup["status"] = "FAILED"
+        warmup["detail"] = str(e)
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    task = asyncio.create_task(warm_up())
+    yield
+    task.cancel()
+    osv_parallel.shutdown()
+
+
+app = FastAPI(title="Recipe API", lifespan=lifespan)
+
+
+def require_ready():
+    """
+    Зависимость для эндпоинтов с данными: до окончания загрузки - 503
+    """
+    if warmup["status"] != "READY":
+        raise HTTPException(status_code=503, detail=f"Data is {warmup['status'].lower()}",
+                            headers={"Retry-After": "1"})
+
+
+def paginate(items: list, limit: Optional[int], offset: int, cursor: Optional[str],
+             sorting: list = None) -> tuple:
+    """
+    Выбрать страницу данных. Возвращает (страница, курсор следующей страницы)
+    """
+    page = filter_sorting_dto()
+    page.sorting = sorting or []
+    page.limit = limit
+    page.offset = offset
+    page.cursor = cursor
+    try:
+        return page.paginate(items), page.next_cursor
+    except argument_exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def osv_filters(filters: str) -> Optional[filter_dto]:
+    """
+    Разобрать filters отчета ОСВ (Json-объект или массив условий). Пустая строка - без фильтра
+    """
+    if not filters:
+        return None
+    try:
+        filters_dict = json.loads(filters)
+    except json.JSONDecodeError:
+        raise HTTPException(400, "filters должен быть корректным JSON")
+
+    # Собираем filter_dto из JSON
+    if isinstance(filters_dict, list):
+        filters_dict = {"filters": filters_dict}
+    return filter_dto.from_dict(filters_dict)
+
+
+def normalize_filters(dto: Optional[filter_dto], sorting: list = None) -> str:
+    """
+    Нормализованная запись фильтров для ключей кеша и ETag:
+    одинаковые условия в разной записи и порядке дают одну строку
+    """
+    if dto is None:
+        return json.dumps([None, [], sorting or []])
+    conditions = sorted(json.dumps([ff.field_name, ff.type.value, ff.value], ensure_ascii=False, default=str)
+                        for ff in dto.filters)
+    return json.dumps([str(getattr(dto.model, "value", dto.model)), conditions, sorting or []], ensure_ascii=False)
+
+
+def versioned(key: tuple, collection: str) -> tuple:
+    """
+    Ключ запроса с версиями коллекций, от которых зависит выдача collection:
+    любое их изменение дает новый ключ
+    """
+    return key + (start_service_instance.repo.versions(reposity.dependencies(collection)),)
+
+
+def entity_tag(key: tuple) -> str:
+    """
+    Сильный ETag по ключу запроса с версиями коллекций
+    """
+    digest = hashlib.sha256(repr((instance_tag,) + key).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def not_modified(request: Request, tag: str) -> Optional[Response]:
+    """
+    Ответ 304, если клиент прислал совпадающий If-None-Match (иначе None).
+    Только для GET и HEAD: для остальных методов совпадение означало бы 412 (RFC 9110, 13.1.2),
+    поэтому POST-запросы If-None-Match не проверяют и просто получают ETag
+    """
+    if request.method not in ("GET", "HEAD"):
+        return None
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = [x.strip() for x in header.split(",")]
+    # для If-None-Match теги сравниваются без учета признака W/
+    if "*" in tags or tag in (x[2:] if x.startswith("W/") else x for x in tags):
+        return Response(status_code=304, headers={"ETag": tag})
+    return None
+
+
+def cached(request: Request, key: tuple, collection: str, build) -> Response:
+    """
+    Ответ из кеша или построенный build() (содержимое Json) и сохраненный в кеш.
+    Ответ помечается ETag; при совпадении If-None-Match в GET - 304 без построения ответа
+    """
+    key = versioned(key, collection)
+    tag = entity_tag(key)
+    response = not_modified(request, tag)
+    if response is not None:
+        return response
+
+    body = cache.get(key)
+    if body is None:
+        body = JSONResponse(content=build()).body
+        cache.put(key, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": tag})
+
+
 # Проверка доступности API
 @app.get("/api/accessibility")
 async def api_accessibility():
     return {"status": "SUCCESS"}
 
+# Состояние кеша ответов
+@app.get("/api/cache")
+async def api_cache():
+    return cache.stats()
+
+# Очистить кеш ответов и сбросить счетчики
+@app.delete("/api/cache")
+async def api_cache_clear():
+    cache.clear()
+    cache.reset_stats()
+    return cache.stats()
+
+# Готовность данных
+@app.get("/api/readiness")
+async def api_readiness():
+    status_code = 200 if warmup["status"] == "READY" else 503
+    return JSONResponse(status_code=status_code, content=warmup)
+
 # Получить данные в заданном формате
-@app.get("/api/data/{data_type}/{format}")
-async def get_data_formatted(data_type: str, format: str):
+@app.get("/api/data/{data_type}/{format}", dependencies=[Depends(require_ready)])
+async def get_data_formatted(
+    request: Request,
+    data_type: str,
+    format: str,
+    limit: Optional[int] = Query(None, ge=1, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Смещение от начала (или от курсора)"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы")
+):
     if data_type not in start_service_instance.data:
         raise HTTPException(status_code=400, detail=f"Data type '{data_type}' not loaded")
     if format not in factory.get_all_formats():
         raise HTTPException(status_code=400, detail="Wrong format")
 
-    try:
+    def build() -> dict:
         data = start_service_instance.data[data_type]
-        logic_class = factory.create(format)
-        logic_instance = logic_class()
-        result = logic_instance.build(format, data)
+        paged = limit is not None or offset > 0 or cursor is not None
+        if paged:
+            data, next_cursor = paginate(data, limit, offset, cursor)
 
-        return JSONResponse(content={"result": result})
+        try:
+            logic_class = factory.create(format)
+            logic_instance = logic_class()
+            result = logic_instance.build(format, data)
+
+            content = {"result": result}
+            if paged:
+                content["next_cursor"] = next_cursor
+            return content
+
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return cached(request, ("data", data_type, format, limit, offset, cursor), data_type, build)
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
+# Типы содержимого для выгрузки
+export_media_types = {
+    "csv": "text/csv",
+    "markdown": "text/markdown",
+    "xml": "application/xml",
+    "json": "application/json",
+}
 
-@app.get("/api/receipts")
-async def get_receipts():
+# Выгрузить данные в заданном формате потоком (без сборки ответа в памяти)
+@app.get("/api/export/{data_type}/{format}", dependencies=[Depends(require_ready)])
+async def export_data(data_type: str, format: str):
+    if data_type not in start_service_instance.data:
+        raise HTTPException(status_code=400, detail=f"Data type '{data_type}' not loaded")
+    if format not in factory.get_all_formats():
+        raise HTTPException(status_code=400, detail="Wrong format")
+
+    data = list(start_service_instance.data[data_type])
+    logic_instance = factory.create(format)()
+    media_type = export_media_types.get(format, "text/plain")
+
+    return StreamingResponse(logic_instance.stream(format, data), media_type=f"{media_type}; charset=utf-8")
+
+
+@app.get("/api/receipts", dependencies=[Depends(require_ready)])
+async def get_receipts(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Смещение от начала (или от курсора)"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы")
+):
     key = "receipt_model"
     if key not in start_service_instance.data:
         raise HTTPException(status_code=404, detail="No receipts found")
 
-    receipts = start_service_instance.data[key]
+    def build() -> dict:
+        receipts = start_service_instance.data[key]
+        paged = limit is not None or offset > 0 or cursor is not None
+        if paged:
+            receipts, next_cursor = paginate(receipts, limit, offset, cursor)
 
-    response_class = factory.create("json")
-    response_instance = response_class()
-    result = response_instance.build("json", receipts)
+        response_class = factory.create("json")
+        response_instance = response_class()
+        result = response_instance.build("json", receipts)
+
+        if paged:
+            return {"receipts": result, "next_cursor": next_cursor}
+        return {"receipts": result}
 
-    return {"receipts": result}
+    return cached(request, ("receipts", key, "json", limit, offset, cursor), key, build)
 
 # Получить конкретный рецепт по уникальному коду
-@app.get("/api/receipts/code/{unique_code}")
+@app.get("/api/receipts/code/{unique_code}", dependencies=[Depends(require_ready)])
 async def get_receipt_by_code(unique_code: str):
-    key = "receipt_model"
+    key = reposity.receipt_key()
     if key not in start_service_instance.data or len(start_service_instance.data[key]) == 0:
         raise HTTPException(status_code=404, detail="No receipts available")
 
-    receipts = start_service_instance.data[key]
-    recipe = next((r for r in receipts if getattr(r, "unique_code", None) == unique_code), None)
+    recipe = start_service_instance.repo.get(key, unique_code)
 
     if not recipe:
         raise HTTPException(status_code=404, detail=f"Receipt with code {unique_code} not found")
@@ -74,37 +321,66 @@ async def get_receipt_by_code(unique_code: str):
 
     return {"receipt": result}
 
-@app.post("/api/repository/save")
+@app.post("/api/repository/save", dependencies=[Depends(require_ready)])
 async def save_repository():
     """
-    Сохраняет репозиторий данных в файл default_data.json
+    Запускает сохранение репозитория в файл default_data.json вне цикла событий.
+    Возвращает задание сохранения (202): ход выполнения - GET /api/repository/save/{job_id}
     """
-    try:
-        start_service_instance.save_data("default_data.json")
-        return JSONResponse(
-            status_code=200,
-            content={"detail": "Repository successfully saved to file"}
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
+    job = {"job_id": uuid.uuid4().hex, "status": "RUNNING", "file": "default_data.json",
+           "done": 0, "total": 0, "detail": ""}
+    save_jobs[job["job_id"]] = job
+    while len(save_jobs) > max_save_jobs:
+        save_jobs.popitem(last=False)
+
+    task = asyncio.create_task(save_job(job))
+    save_tasks.add(task)
+    task.add_done_callback(save_tasks.discard)
+    return JSONResponse(status_code=202, content=job)
+
+@app.get("/api/repository/save/{job_id}")
+async def save_repository_status(job_id: str):
+    """
+    Состояние задания сохранения: RUNNING -> DONE или FAILED, done / total - записанные коллекции
+    """
+    job = save_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Save job '{job_id}' not found")
+    return job
 
-@app.get("/api/report/osv")
+@app.get("/api/report/osv", dependencies=[Depends(require_ready)])
 async def get_osv_report(
+    request: Request,
     date_start: str = Query(..., description="Дата начала периода, формат YYYY-MM-DD"),
     date_end: str = Query(..., description="Дата окончания периода, формат YYYY-MM-DD"),
-    storage_id: str = Query(..., description="Идентификатор склада (unique_code)")
+    storage_id: str = Query(..., description="Идентификатор склада (unique_code)"),
+    vectorized: bool = Query(False, description="Считать на NumPy"),
+    unit: str = Query("", description="Единица отчета: base, nomenclature или unique_code единицы")
 ):
+    # Отчет зависит от транзакций и всех справочников, на которые они ссылаются
+    tag = entity_tag(versioned(("osv", date_start, date_end, storage_id, normalize_filters(None), vectorized,
+                                unit),
+                               reposity.transaction_key()))
+    response = not_modified(request, tag)
+    if response is not None:
+        return response
 
     service = OSVReportService(start_service_instance)
-    report_data = service.generate(date_start, date_end, storage_id)
-    return JSONResponse(content=report_data)
+    report_data = service.generate(date_start, date_end, storage_id, vectorized=vectorized, unit=unit or None)
+    return JSONResponse(content=report_data, headers={"ETag": tag})
 
-@app.post("/api/filter_by_model/{domain_type}")
+@app.post("/api/filter_by_model/{domain_type}", dependencies=[Depends(require_ready)])
 async def filter_by_model(
+    request: Request,
     domain_type: str,
-    filters: str = Query("", description="JSON-массив filters для filter_dto")
+    filters: str = Query("", description="JSON-массив filters для filter_dto (или объект с filters и sorting)"),
+    explain: bool = Query(False, description="Вернуть план выполнения фильтра"),
+    limit: Optional[int] = Query(None, ge=1, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Смещение от начала (или от курсора)"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы")
 ):
     domain_type = domain_type.lower()
+    sorting = []
 
     if domain_type not in start_service_instance.data:
         raise HTTPException(status_code=400, detail=f"Domain type '{domain_type}' not loaded")
@@ -122,6 +398,12 @@ async def filter_by_model(
             if "model" not in parsed or not parsed["model"]:
                 parsed["model"] = domain_type
 
+            sorting = parsed.get("sorting") or []
+            if not isinstance(sorting, list):
+                raise HTTPException(status_code=400, detail="sorting должен быть списком полей")
+            # Строка ('name', '-name') или {"field_name": "name", "descending": true}
+            sorting = filter_sorting_dto.from_dict({"sorting": sorting}).sorting
+
             dto = filter_dto.from_dict(parsed)
         else:
             dto = filter_dto()
@@ -129,22 +411,40 @@ async def filter_by_model(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Ошибка построения filter_dto: {e}")
 
-    try:
-        filtered = dto.apply(data_list)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Ошибка применения фильтров: {e}")
+    def build() -> dict:
+        try:
+            planner = filter_planner(start_service_instance.repo)
+            plan = planner.plan(domain_type, dto.filters)
+            filtered = planner.execute(plan, data_list)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Ошибка применения фильтров: {e}")
 
-    filtered_dicts = [converter.create(x) for x in filtered]
+        paged = limit is not None or offset > 0 or cursor is not None or len(sorting) > 0
+        if paged:
+            filtered, next_cursor = paginate(filtered, limit, offset, cursor, sorting)
 
-    return JSONResponse(content={"result": filtered_dicts})
+        filtered_dicts = [converter.create(x) for x in filtered]
 
+        content = {"result": filtered_dicts}
+        if paged:
+            content["next_cursor"] = next_cursor
+        if explain:
+            content["plan"] = plan.to_dict()
+        return content
 
-@app.post("/api/report/osv")
+    return cached(request, ("filter_by_model", domain_type, "json", normalize_filters(dto, sorting),
+                            explain, limit, offset, cursor), domain_type, build)
+
+
+@app.post("/api/report/osv", dependencies=[Depends(require_ready)])
 async def osv_report(
+    request: Request,
     date_start: str = Query(..., description="Дата начала периода YYYY-MM-DD"),
     date_end: str = Query(..., description="Дата окончания периода YYYY-MM-DD"),
     storage_id: str = Query(..., description="Unique_code склада"),
-    filters: str = Query("", description="JSON-словарь filters для filter_dto")
+    filters: str = Query("", description="JSON-словарь filters для filter_dto"),
+    vectorized: bool = Query(False, description="Считать на NumPy"),
+    unit: str = Query("", description="Единица отчета: base, nomenclature или unique_code единицы")
 ):
     """
     filters должен быть строкой, содержащей JSON:
@@ -157,30 +457,78 @@ async def osv_report(
     """
 
     try:
-        dto = None
-
-        if filters:
-            try:
-                filters_dict = json.loads(filters)
-            except json.JSONDecodeError:
-                raise HTTPException(400, "filters должен быть корректным JSON")
+        dto = osv_filters(filters)
 
-            # Собираем filter_dto из JSON
-            if isinstance(filters_dict, list):
-                filters_dict = {"filters": filters_dict}
-            dto = filter_dto.from_dict(filters_dict)
+        tag = entity_tag(versioned(("osv", date_start, date_end, storage_id, normalize_filters(dto), vectorized,
+                                    unit),
+                                   reposity.transaction_key()))
+        response = not_modified(request, tag)
+        if response is not None:
+            return response
 
         service = OSVReportService(start_service_instance)
         result = service.generate(
             date_start=date_start,
             date_end=date_end,
             storage_id=storage_id,
-            dto=dto
+            dto=dto,
+            vectorized=vectorized,
+            unit=unit or None
         )
-        return result
+        return JSONResponse(content=result, headers={"ETag": tag})
+
+    except Exception as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+
+@app.get("/api/report/osv/storages", dependencies=[Depends(require_ready)])
+async def osv_report_storages(
+    request: Request,
+    date_start: str = Query(..., description="Дата начала периода YYYY-MM-DD"),
+    date_end: str = Query(..., description="Дата окончания периода YYYY-MM-DD"),
+    filters: str = Query("", description="JSON-словарь filters для filter_dto"),
+    unit: str = Query("", description="Единица отчета: base, nomenclature или unique_code единицы")
+):
+    """
+    ОСВ по всем складам: общий отчет и отчеты складов. Склады считаются параллельно в процессах
+    """
+    try:
+        dto = osv_filters(filters)
+
+        tag = entity_tag(versioned(("osv_storages", date_start, date_end, normalize_filters(dto), unit),
+                                   reposity.transaction_key()))
+        response = not_modified(request, tag)
+        if response is not None:
+            return response
+
+        service = OSVReportService(start_service_instance)
+        result = await asyncio.to_thread(service.generate_storages, date_start, date_end, dto, osv_engine,
+                                       unit or None)
+        return JSONResponse(content=result, headers={"ETag": tag})
 
+    except HTTPException:
+        raise
     except Exception as ex:
         raise HTTPException(status_code=400, detail=str(ex))
 
+@app.post("/api/transactions/ingest", dependencies=[Depends(require_ready)])
+async def ingest_transactions(request: Request):
+    """
+    Пакетная загрузка транзакций: Json массив или NDJSON (application/x-ndjson).
+    Пачка проверяется целиком вне цикла событий; при ошибках не добавляется ни одна запись (422)
+    """
+    body = await request.body()
+    try:
+        records = await asyncio.to_thread(transaction_ingest.parse, body)
+        items, errors = await asyncio.to_thread(ingest.prepare, records)
+        if errors:
+            return JSONResponse(status_code=422, content={"accepted": 0, "errors": errors})
+
+        # Добавление - в цикле событий, чтобы эндпоинты чтения не видели пачку частично
+        ingest.apply(items)
+        return {"accepted": len(items), "errors": []}
+
+    except argument_exception as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="localhost", port=8080, reload=True)